@@ -0,0 +1,115 @@
+# analise.py
+
+"""
+Análises da aba "Análise Avançada", calculadas uma vez por versão dos dados.
+
+A chave é a impressão digital (hash) das colunas usadas do DataFrame de
+estatísticas: o mesmo df (mesmos dados e odds) reaproveita sharpe, PCA,
+correlação, descritivas e as figuras Plotly já montadas, inclusive entre
+sessões. O cache é um LRU limitado a MAX_ENTRADAS versões.
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.express as px
+from sklearn.decomposition import PCA # type: ignore
+
+from utils import impressao_digital
+from instrumentacao import span, contar
+
+METRICAS = ['expectedScore', 'media_vitoria', 'media_derrota', 'media_confronto', 'sharpe']
+COLUNAS = ['playerName', 'teamName', 'region', 'role', 'price', 'custo_beneficio',
+           'expectedScore', 'media_vitoria', 'media_derrota', 'media_confronto']
+MAX_ENTRADAS = 8
+
+_cache = OrderedDict()
+_trava = threading.Lock()
+
+
+def _calcular(df: pd.DataFrame) -> dict:
+    df = df[[c for c in COLUNAS if c in df.columns]].copy()
+    # Sharpe ratio simplificado
+    df['sharpe'] = df['expectedScore'] / (df['media_derrota'] + 1e-6)
+
+    with span("analise.pca"):
+        coords = PCA(n_components=2).fit_transform(df[METRICAS].fillna(0))
+        df['PC1'], df['PC2'] = coords[:, 0], coords[:, 1]
+    corr = df[METRICAS].corr()
+    desc = df[METRICAS].describe().T[['mean', 'std', 'min', 'max']]
+    top_cb = df.nlargest(10, 'custo_beneficio')
+    region_role = df.groupby(['region', 'role'])['expectedScore'].mean().reset_index()
+    top20 = df.nlargest(20, 'expectedScore')
+
+    with span("analise.figuras"):
+        figuras = {
+            "bolha": px.scatter(
+                df, x='price', y='expectedScore', size='custo_beneficio', color='role',
+                hover_name='playerName',
+                title='Preço vs ExpectedScore (bolha ~ Custo-benefício)'
+            ),
+            "top_custo_beneficio": px.bar(
+                top_cb, x='playerName', y='custo_beneficio', color='role',
+                hover_data=['teamName'],
+                title='Top 10 Jogadores por Custo-benefício'
+            ),
+            "pca": px.scatter(
+                df, x='PC1', y='PC2', color='role', hover_name='playerName',
+                title='PCA 2D das Métricas Principais'
+            ),
+            "correlacao": px.imshow(
+                corr, text_auto=True, aspect='auto',
+                title='Matriz de Correlação das Métricas'
+            ),
+            "boxplot": px.box(
+                df, x='region', y='expectedScore', color='role',
+                title='ExpectedScore por Região e Posição'
+            ),
+            "sunburst": px.sunburst(
+                region_role, path=['region', 'role'], values='expectedScore',
+                title='ExpectedScore Médio por Região e Posição'
+            ),
+            "treemap": px.treemap(
+                top20, path=['region', 'teamName', 'playerName'], values='expectedScore',
+                title='Top 20 Jogadores por Região/Time'
+            ),
+        }
+
+    # radar: só a tabela jogador -> métricas; a figura depende da seleção
+    radar = df.drop_duplicates('playerName').set_index('playerName')[METRICAS]
+    jogadores = df['playerName'].sort_values(key=lambda x: x.str.lower()).unique().tolist()
+    return {
+        "df": df,
+        "correlacao": corr,
+        "descritivas": desc,
+        "radar": radar,
+        "jogadores": jogadores,
+        "figuras": figuras,
+    }
+
+
+def analise(df: pd.DataFrame) -> dict:
+    """Análises de `df`, do cache se a mesma versão já foi calculada. Não alterar o retorno."""
+    chave = impressao_digital(df, COLUNAS)
+    with _trava:
+        if chave in _cache:
+            _cache.move_to_end(chave)
+            contar("analise.cache_acertos")
+            return _cache[chave]
+    contar("analise.cache_faltas")
+    with span("analise.calcular"):
+        resultado = _calcular(df)
+    with _trava:
+        _cache[chave] = resultado
+        while len(_cache) > MAX_ENTRADAS:
+            _cache.popitem(last=False)
+    return resultado
+
+
+def figura_radar(resultado: dict, jogador: str):
+    values = resultado["radar"].loc[jogador].tolist()
+    return px.line_polar(
+        r=values, theta=METRICAS, line_close=True, markers=True,
+        title=f'Métricas de {jogador}'
+    )
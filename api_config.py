@@ -5,32 +5,104 @@ import json
 import pandas as pd
 from pathlib import Path
 
+from instrumentacao import span, contar
+
 CACHE_DIR = "cache"
 Path(CACHE_DIR).mkdir(exist_ok=True)
 
-def carregar_json_cache(nome_arquivo):
-    caminho = os.path.join(CACHE_DIR, nome_arquivo)
+# Estatísticas da temporada: "player-stats.json" no cache atual,
+# "season.json" nos dumps por rodada (cache/Rodada_N)
+ARQUIVOS_TEMPORADA = ["player-stats.json", "season.json"]
+
+def carregar_json_cache(nome_arquivo, diretorio=CACHE_DIR):
+    caminho = os.path.join(diretorio, nome_arquivo)
     if not os.path.exists(caminho):
         raise FileNotFoundError(f"Arquivo não encontrado: {caminho}")
     with open(caminho, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def carregar_todos_os_players_cache():
+def carregar_temporada_cache(diretorio=CACHE_DIR):
+    for nome_arquivo in ARQUIVOS_TEMPORADA:
+        if os.path.exists(os.path.join(diretorio, nome_arquivo)):
+            return carregar_json_cache(nome_arquivo, diretorio)
+    raise FileNotFoundError(f"Arquivo não encontrado: {os.path.join(diretorio, ARQUIVOS_TEMPORADA[0])}")
+
+def listar_players_cache(diretorio=CACHE_DIR):
+    return sorted(
+        nome for nome in os.listdir(diretorio)
+        if nome.startswith("player-") and nome.endswith(".json") and nome not in ARQUIVOS_TEMPORADA
+    )
+
+def listar_fontes(diretorio=CACHE_DIR):
+    """Arquivos JSON de origem de uma rodada: mercado, temporada e jogadores."""
+    fontes = [n for n in ["market.json"] + ARQUIVOS_TEMPORADA if os.path.exists(os.path.join(diretorio, n))]
+    return fontes + listar_players_cache(diretorio)
+
+def carregar_todos_os_players_cache(diretorio=CACHE_DIR):
     players = []
-    for nome_arquivo in os.listdir(CACHE_DIR):
-        if nome_arquivo.startswith("player-") and nome_arquivo.endswith(".json"):
-            caminho = os.path.join(CACHE_DIR, nome_arquivo)
-            with open(caminho, "r", encoding="utf-8") as f:
-                try:
-                    player_data = json.load(f)
-                    players.append(player_data.get("data", {}))  # <- Aqui já pegamos direto "data"
-                except Exception as e:
-                    print(f"[ERRO] Falha ao carregar {nome_arquivo}: {e}")
+    for nome_arquivo in listar_players_cache(diretorio):
+        caminho = os.path.join(diretorio, nome_arquivo)
+        with open(caminho, "r", encoding="utf-8") as f:
+            try:
+                player_data = json.load(f)
+                players.append(player_data.get("data", {}))  # <- Aqui já pegamos direto "data"
+            except Exception as e:
+                print(f"[ERRO] Falha ao carregar {nome_arquivo}: {e}")
     return players
 
-def integrate_data():
-    market_raw = carregar_json_cache("market.json")
-    season_raw = carregar_json_cache("player-stats.json")
+# times da região Sul (por trecho do nome); os demais são Norte
+TIMES_SUL = ["FURIA", "Isurus", "Fluxo", "paiN", "LOUD", "Vivo", "Leviatán", "RED"]
+TIME_DESCONHECIDO = "Desconhecido"
+
+def regiao_do_time(team_name):
+    return "Sul" if any(r in team_name for r in TIMES_SUL) else "Norte"
+
+def indexar_times(teams_data):
+    """teamId -> (nome, região), resolvido uma vez por rodada em vez de por jogador."""
+    times = {}
+    for t in teams_data:
+        if t.get("id") not in times:
+            times[t.get("id")] = (t["name"], regiao_do_time(t["name"]))
+    return times
+
+def montar_linha(jogador, estat, detalhes, times):
+    """
+    Linha integrada de um jogador: mercado + estatísticas da temporada + detalhes.
+    `times` vem de indexar_times(market["teams"]).
+    """
+    pro_id = jogador.get("proPlayerId")
+    player_info = detalhes.get("player", {})
+    recent_matches = detalhes.get("recentMatches", [])
+    upcoming_matches = detalhes.get("upcomingMatches", [])
+    games = detalhes.get("games", [])
+
+    team_id = jogador.get("teamId")
+    team_name, region = times.get(team_id) or (TIME_DESCONHECIDO, regiao_do_time(TIME_DESCONHECIDO))
+
+    return {
+        "proPlayerId": pro_id,
+        "playerName": jogador.get("summonerName") or player_info.get("name", "Desconhecido"),
+        "teamName": team_name,
+        "price": jogador.get("price", 0),
+        "role": jogador.get("role", ""),
+        "teamId": team_id,
+        "teamOdd": None,
+        "region": region,
+        "averageRoundScore": estat.get("averageRoundScore", 0),
+        "maxRoundScore": estat.get("maxRoundScore", 0),
+        "minRoundScore": estat.get("minRoundScore", 0),
+        "lastRoundScore": estat.get("lastRoundScore", 0),
+        "lastRoundPrice": estat.get("lastRoundPrice", 0),
+        "recentMatches": recent_matches,
+        "upcomingMatches": upcoming_matches,
+        "games": games,
+    }
+
+def montar_linhas(diretorio=CACHE_DIR):
+    """Lê os JSON de uma rodada e monta uma linha (dict) por jogador do mercado."""
+    with span("ler_mercado"):
+        market_raw = carregar_json_cache("market.json", diretorio)
+        season_raw = carregar_temporada_cache(diretorio)
 
     market = market_raw.get("data", {})
     season = season_raw.get("data", {})
@@ -38,64 +110,53 @@ def integrate_data():
     round_players = market.get("roundPlayers", [])
     teams_data = market.get("teams", [])
     stats_data = season.get("players", [])
+    contar("mercado.jogadores", len(round_players))
 
-    print(">> market_raw keys:", market_raw.keys())
-    print(">> market_data keys:", market.keys())
-    print(">> Tamanho de roundPlayers:", len(round_players))
-
-    players_detalhes = carregar_todos_os_players_cache()
-    print(">> Total de players_detalhes:", len(players_detalhes))
-    for i, p in enumerate(players_detalhes[:3]):
-        print(f"Detalhe {i}: keys ->", p.keys())
+    with span("ler_jogadores"):
+        players_detalhes = carregar_todos_os_players_cache(diretorio)
+    contar("arquivos_jogador.lidos", len(players_detalhes))
 
     stats_map = {p["proPlayerId"]: p for p in stats_data if p.get("proPlayerId")}
+    times = indexar_times(teams_data)
     detalhes_map = {p.get("player", {}).get("id"): p for p in players_detalhes if p.get("player", {}).get("id")}
 
     rows = []
     for jogador in round_players:
         pro_id = jogador.get("proPlayerId")
-        estat = stats_map.get(pro_id, {})
         detalhes = detalhes_map.get(pro_id)
 
         if not detalhes:
             print(f"[AVISO] Sem detalhes para jogador {pro_id}")
+            contar("jogadores.sem_detalhes")
             continue
 
-        player_info = detalhes.get("player", {})
-        recent_matches = detalhes.get("recentMatches", [])
-        upcoming_matches = detalhes.get("upcomingMatches", [])
-        games = detalhes.get("games", [])
-
-        team_id = jogador.get("teamId")
-        team_name = next((t["name"] for t in teams_data if t.get("id") == team_id), "Desconhecido")
-
-        region = "Sul" if any(r in team_name for r in ["FURIA", "Isurus", "Fluxo", "paiN", "LOUD", "Vivo", "Leviatán", "RED"]) else "Norte"
-
-        row = {
-            "proPlayerId": pro_id,
-            "playerName": jogador.get("summonerName") or player_info.get("name", "Desconhecido"),
-            "teamName": team_name,
-            "price": jogador.get("price", 0),
-            "role": jogador.get("role", ""),
-            "teamId": team_id,
-            "teamOdd": None,
-            "region": region,
-            "averageRoundScore": estat.get("averageRoundScore", 0),
-            "maxRoundScore": estat.get("maxRoundScore", 0),
-            "minRoundScore": estat.get("minRoundScore", 0),
-            "lastRoundScore": estat.get("lastRoundScore", 0),
-            "lastRoundPrice": estat.get("lastRoundPrice", 0),
-            "recentMatches": recent_matches,
-            "upcomingMatches": upcoming_matches,
-            "games": games,
-        }
-
-        rows.append(row)
-
-    df = pd.DataFrame(rows)
-    if df.empty:
-        print("[ERRO] DataFrame final está vazio! Verifique os dados de entrada.")
-    else:
-        print("[DEBUG] Colunas do DataFrame final:", df.columns.tolist())
+        rows.append(montar_linha(jogador, stats_map.get(pro_id, {}), detalhes, times))
+
+    contar("jogadores.carregados", len(rows))
+    return rows, market
+
+def integrate_data(diretorio=CACHE_DIR, recompilar_snapshot=True):
+    """
+    Monta o DataFrame integrado de uma rodada a partir dos JSON. Se o
+    diretório tem um snapshot colunar (ver snapshot.py) compilado de fontes
+    que mudaram, recompila-o com as linhas já lidas. Para o ModeloRodada,
+    snapshot.carregar_modelo lê o snapshot direto nas tabelas do modelo.
+    """
+    with span("integrate_data", diretorio=diretorio):
+        antigo = False
+        if recompilar_snapshot:
+            from snapshot import ANTIGO, estado_snapshot, compilar_snapshot
+            estado, assinatura = estado_snapshot(diretorio)
+            antigo = estado == ANTIGO
+
+        with span("montar_linhas"):
+            rows, market = montar_linhas(diretorio)
+        if antigo:
+            with span("compilar_snapshot"):
+                compilar_snapshot(diretorio, (rows, market), assinatura)
+            contar("snapshot.recompilados")
+        df = pd.DataFrame(rows)
+        if df.empty:
+            print("[ERRO] DataFrame final está vazio! Verifique os dados de entrada.")
 
     return df, market
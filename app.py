@@ -1,112 +1,144 @@
+import os
 import streamlit as st
 import pandas as pd
-import json
-import os
 import plotly.express as px
-from api_config import integrate_data
-from utils import calcular_estatisticas, montar_time_otimo
+from cache_incremental import CacheIncremental
+from utils import consultar_fronteira
+from cache_solucoes import CacheSolucoes, SOLUCOES_DIR
+from simulacao import simular_escalacoes, escalacoes_do_otimizador
+from portfolio import montar_portfolio, portfolio_tabela, exposicao
+from analise import analise, figura_radar
+from instrumentacao import PERFIS, iniciar_execucao, finalizar_execucao, span, contar
+from configuracoes import (
+    SETTINGS_FILE, HISTORICO_FILE, carregar_settings, salvar_settings, ler_historico, diff_odds
+)
+from sessao import BaseCompartilhada, OverlaySessao
 from sklearn.cluster import KMeans # type: ignore
 from sklearn.preprocessing import StandardScaler # type: ignore
-from sklearn.decomposition import PCA # type: ignore
-from datetime import datetime
 
 # Configuração da página
 st.set_page_config(page_title="Cartola LoL", layout="wide")
 st.title("📊 Cartola FC - League of Legends")
 
+# Instrumentação do rerun (painel e perfil ligados no expander Debug da sidebar)
+iniciar_execucao("rerun", PERFIS if st.session_state.get("debug_perfil") else ())
+
 # Carrega dados e configurações
-SETTINGS_FILE = "settings.json"
-@st.cache_data(ttl=3600)
+@st.cache_resource
 def carregar_dados():
-    return integrate_data()
+    # compartilhado entre sessões; a cada rerun só relê o que mudou em cache/
+    contar("cache.recurso_criado")
+    return CacheIncremental().carregar()
 
-def load_settings():
-    if os.path.exists(SETTINGS_FILE):
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    return {}
+@st.cache_resource(max_entries=2)
+def carregar_base(versao, _modelo, _medias):
+    # parte independente das odds, uma por versão dos dados, lida por todas as sessões
+    return BaseCompartilhada(_modelo.jogadores, _medias, versao)
 
-def save_settings(orcamento, odds):
-    settings = load_settings()
-    historico = settings.get("historico", [])
-    historico.append({
-        "timestamp": datetime.now().isoformat(timespec='seconds'),
-        "orcamento": orcamento,
-        "odds": odds
-    })
-    with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-        json.dump({
-            "orcamento": orcamento,
-            "odds": odds,
-            "historico": historico
-        }, f, indent=2)
+@st.cache_data(max_entries=2)
+def carregar_historico(tamanho, mtime_ns):
+    # (tamanho, mtime) do log como chave: só relê depois de uma gravação
+    return ler_historico(SETTINGS_FILE)
+
+def assinatura_historico():
+    try:
+        st_log = os.stat(os.path.join(os.path.dirname(SETTINGS_FILE), HISTORICO_FILE))
+    except FileNotFoundError:
+        return 0, 0
+    return st_log.st_size, st_log.st_mtime_ns
+
+@st.cache_resource
+def carregar_solucoes():
+    # soluções do otimizador: LRU compartilhado entre sessões + disco entre processos
+    return CacheSolucoes(SOLUCOES_DIR)
 
 # Inicialização dos dados
-if "df" not in st.session_state:
-    df_raw, _ = carregar_dados()
-    if df_raw.empty:
-        st.error("Nenhum dado disponível.")
-        st.stop()
-    settings = load_settings()
-    st.session_state.orcamento = settings.get("orcamento", 25.0)
-    for col, default in [("teamOdd",2.0),("region","Outra"),("teamName","Desconhecido")]:
-        df_raw[col] = df_raw.get(col, default)
-    st.session_state.odds = settings.get("odds") or {team:2.0 for team in df_raw["teamName"].unique()}
-    st.session_state.regioes = {
-        team: df_raw[df_raw["teamName"]==team]["region"].iloc[0]
-        for team in df_raw["teamName"].unique()
-    }
-    df_raw["teamOdd"] = df_raw["teamName"].map(st.session_state.odds)
-    st.session_state.df = calcular_estatisticas(df_raw)
+with span("cache"):
+    cache = carregar_dados()
+    if cache.mudou():
+        cache.recarregar()
+    versao_dados, modelo_cache, medias_cache = cache.estado()
+
+base = carregar_base(versao_dados, modelo_cache, medias_cache)
+if len(base) == 0:
+    st.error("Nenhum dado disponível.")
+    st.stop()
+
+# a sessão guarda só o overlay (odds, orçamento e colunas que dependem das odds)
+overlay = st.session_state.get("overlay")
+if overlay is None or overlay.base is not base:
+    if overlay is None:
+        settings = carregar_settings(SETTINGS_FILE)
+        orcamento = settings.get("orcamento", 25.0)
+        odds = settings.get("odds") or {team:2.0 for team in base.nomes_times}
+    else:
+        orcamento, odds = overlay.orcamento, overlay.odds
+    with span("overlay"):
+        overlay = st.session_state.overlay = OverlaySessao(base, odds, orcamento)
+else:
+    contar("sessao.estatisticas_reaproveitadas")
+df_sessao = overlay.tabela()
 
 # Sidebar: Parâmetros e Odds
 with st.sidebar:
     st.markdown("## ⚙️ Parâmetros")
     novo_orc = st.number_input(
         "Orçamento (💰)", 1.0, 100.0,
-        value=st.session_state.orcamento, step=0.1, format="%.2f"
+        value=overlay.orcamento, step=0.1, format="%.2f"
     )
     st.markdown("---")
     st.markdown("### 🤝 Ajuste de Odds por Confronto")
     novas_odds = {}
-    df_local = st.session_state.df
-    opp_map = df_local.groupby("teamName")["oponente"].first().to_dict()
-    matchups = {}
-    for team, opp in opp_map.items():
-        if opp:
-            key = tuple(sorted([team, opp]))
-            matchups.setdefault(key, []).append(team)
     for region_label in ["Norte","Sul"]:
         with st.expander(f"Confrontos {region_label}", expanded=False):
-            for t1, t2 in sorted(matchups.keys()):
-                if st.session_state.regioes.get(t1) == region_label or st.session_state.regioes.get(t2) == region_label:
+            for t1, t2 in modelo_cache.confrontos.pares:
+                if base.regioes.get(t1) == region_label or base.regioes.get(t2) == region_label:
                     st.write(f"**{t1}** vs **{t2}**")
                     odd1 = st.number_input(f"{t1} odd", 1.01, 10.0,
-                                            st.session_state.odds.get(t1,2.0), 0.01,
+                                            overlay.odds.get(t1,2.0), 0.01,
                                             format="%.2f", key=f"odd_{t1}")
                     odd2 = st.number_input(f"{t2} odd", 1.01, 10.0,
-                                            st.session_state.odds.get(t2,2.0), 0.01,
+                                            overlay.odds.get(t2,2.0), 0.01,
                                             format="%.2f", key=f"odd_{t2}")
                     novas_odds[t1] = odd1
                     novas_odds[t2] = odd2
     if st.button("Aplicar Ajustes"):
-        st.session_state.orcamento = novo_orc
-        st.session_state.odds.update(novas_odds)
-        df_upd = st.session_state.df.copy()
-        df_upd["teamOdd"] = df_upd["teamName"].map(st.session_state.odds)
-        st.session_state.df = calcular_estatisticas(df_upd)
-        save_settings(st.session_state.orcamento, st.session_state.odds)
+        overlay.orcamento = novo_orc
+        overlay.atualizar_odds({**overlay.odds, **novas_odds})
+        df_sessao = overlay.tabela()
+        salvar_settings(overlay.orcamento, overlay.odds, SETTINGS_FILE)
+
+    with st.expander("🕑 Histórico de Odds", expanded=False):
+        # o corpo do expander roda mesmo fechado: o log só é lido sob demanda
+        if st.checkbox("Comparar com ajustes anteriores", key="historico_aberto"):
+            historico = carregar_historico(*assinatura_historico())
+            if not historico:
+                st.caption("Nenhum ajuste salvo ainda.")
+            else:
+                i = st.selectbox(
+                    "Comparar o estado atual com", range(len(historico) - 1, -1, -1),
+                    format_func=lambda i: historico[i]["timestamp"], key="historico_momento"
+                )
+                antes = historico[i]
+                mudancas = diff_odds(antes, {"odds": overlay.odds}, historico=historico)
+                if mudancas:
+                    st.dataframe(pd.DataFrame(
+                        [(t, a, d) for t, (a, d) in mudancas.items()], columns=["Time", "Antes", "Agora"]
+                    ), hide_index=True, use_container_width=True)
+                else:
+                    st.caption("Odds iguais às atuais.")
 
 # Layout em Tabs
-tab1, tab2, tab3, tab4, tab5 = st.tabs([
-    "Jogadores", "Times Ideais", "Monte Seu Time", "Base Completa", "Análise Avançada"
+tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs([
+    "Jogadores", "Times Ideais", "Monte Seu Time", "Base Completa", "Análise Avançada",
+    "Simulação"
 ])
 
-with tab1:
+with tab1, span("aba.jogadores"):
     st.header("🏆 Top 20 por Posição")
     cols = st.columns(2)
     for i, pos in enumerate(["top","jungle","mid","bottom","support"]):
-        dfp = st.session_state.df[st.session_state.df.role == pos]
+        dfp = df_sessao[df_sessao.role == pos]
         top = dfp.nlargest(20, "expectedScore").rename(columns={
             "playerName":"Jogador","price":"Preço","teamOdd":"Odds",
             "expectedScore":"Pts Esperados","custo_beneficio":"Pts/Preço",
@@ -118,28 +150,38 @@ with tab1:
                 height=212, hide_index=True
             )
 
-with tab2:
+with tab2, span("aba.times_ideais"):
     st.header("⭐ Times Ideais")
-    geral = montar_time_otimo(
-        st.session_state.df, "expectedScore", st.session_state.orcamento
-    )[0]
-    df_g = pd.DataFrame(geral[0]).rename(columns={
-        "playerName":"Jogador","teamName":"Time","role":"Posição",
-        "price":"Preço","expectedScore":"Pts Esperados","custo_beneficio":"Pts/Preço"
-    })
-    with st.expander("Time Ideal Geral", expanded=True):
-        st.dataframe(
-            df_g[["Jogador","Time","Posição","Preço","Pts Esperados","Pts/Preço"]],
-            height=212, hide_index=True
-        )
-        c1, c2, c3 = st.columns(3)
-        c1.metric("Custo", f"{geral[1]:.2f}")
-        c2.metric("Pts Esperados", f"{geral[2]:.2f}")
-        c3.metric("Eficiência", f"{geral[3]:.2f}")
+    solucoes = carregar_solucoes()
+    geral = solucoes.montar_time_otimo(
+        df_sessao, "expectedScore", overlay.orcamento
+    )
+    if not geral:
+        st.warning(f"Nenhuma escalação cabe no orçamento de {overlay.orcamento:.2f}.")
+    else:
+        geral = geral[0]
+        df_g = pd.DataFrame(geral[0]).rename(columns={
+            "playerName":"Jogador","teamName":"Time","role":"Posição",
+            "price":"Preço","expectedScore":"Pts Esperados","custo_beneficio":"Pts/Preço"
+        })
+        with st.expander("Time Ideal Geral", expanded=True):
+            st.dataframe(
+                df_g[["Jogador","Time","Posição","Preço","Pts Esperados","Pts/Preço"]],
+                height=212, hide_index=True
+            )
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Custo", f"{geral[1]:.2f}")
+            c2.metric("Pts Esperados", f"{geral[2]:.2f}")
+            c3.metric("Eficiência", f"{geral[3]:.2f}")
     for region_label in ["Norte","Sul"]:
-        sub = st.session_state.df[st.session_state.df.region == region_label]
-        if sub.empty: continue
-        best = montar_time_otimo(sub, "expectedScore", st.session_state.orcamento)[0]
+        if not (df_sessao.region == region_label).any(): continue
+        best = solucoes.montar_time_otimo(
+            df_sessao, "expectedScore", overlay.orcamento, regiao=region_label
+        )
+        if not best:
+            st.info(f"Sem escalação viável só com times da região {region_label}.")
+            continue
+        best = best[0]
         df_r = pd.DataFrame(best[0]).rename(columns={
             "playerName":"Jogador","teamName":"Time","role":"Posição",
             "price":"Preço","expectedScore":"Pts Esperados","custo_beneficio":"Pts/Preço"
@@ -154,14 +196,72 @@ with tab2:
             rc2.metric("Pts", f"{best[2]:.2f}")
             rc3.metric("Eff", f"{best[3]:.2f}")
 
-with tab3:
+    with st.expander("Fronteira Orçamento x Pontos", expanded=False):
+        fronteira = solucoes.fronteira_eficiente(df_sessao, "expectedScore")
+        if fronteira.empty:
+            st.info("Nenhuma escalação possível com os jogadores disponíveis (alguma posição sem jogador).")
+        else:
+            fig_fr = px.line(
+                fronteira, x="custo", y="pts", markers=True, line_shape="hv",
+                hover_data={"eff": ":.2f"},
+                title="Pontos Esperados Máximos por Orçamento"
+            )
+            fig_fr.add_vline(x=overlay.orcamento, line_dash="dash")
+            st.plotly_chart(fig_fr, use_container_width=True)
+            custo_min, custo_max = float(fronteira["custo"].min()), float(fronteira["custo"].max())
+            # um ponto só: não há faixa para o slider
+            orc_fr = custo_min if custo_min == custo_max else st.slider(
+                "Orçamento", custo_min, custo_max,
+                float(min(max(overlay.orcamento, custo_min), custo_max)),
+                step=0.1, key="orc_fronteira"
+            )
+            ponto = consultar_fronteira(fronteira, orc_fr)
+            df_f = pd.DataFrame(ponto["time_"]).rename(columns={
+                "playerName":"Jogador","teamName":"Time","role":"Posição",
+                "price":"Preço","expectedScore":"Pts Esperados","custo_beneficio":"Pts/Preço"
+            })
+            st.dataframe(
+                df_f[["Jogador","Time","Posição","Preço","Pts Esperados","Pts/Preço"]],
+                height=212, hide_index=True
+            )
+            fc1, fc2, fc3 = st.columns(3)
+            fc1.metric("Custo", f"{ponto['custo']:.2f}")
+            fc2.metric("Pts", f"{ponto['pts']:.2f}")
+            fc3.metric("Eff", f"{ponto['eff']:.2f}")
+
+    with st.expander("Portfólio de Escalações", expanded=False):
+        pc1, pc2, pc3, pc4 = st.columns(4)
+        n_port = pc1.number_input("Escalações", 1, 300, 50, step=10, key="port_n")
+        min_dif = pc2.number_input("Jogadores diferentes (mín.)", 1, 5, 2, key="port_dif")
+        exp_jog = pc3.slider("Exposição máx. por jogador", 0.05, 1.0, 0.5, step=0.05, key="port_exp_jog")
+        exp_time = pc4.slider("Exposição máx. por time", 0.05, 1.0, 1.0, step=0.05, key="port_exp_time")
+        if st.button("Gerar Portfólio"):
+            st.session_state.portfolio = montar_portfolio(
+                df_sessao, "expectedScore", overlay.orcamento, n=int(n_port), min_diferentes=int(min_dif),
+                exposicao_jogador=exp_jog, exposicao_time=exp_time
+            )
+        if st.session_state.get("portfolio"):
+            tabela_port = portfolio_tabela(st.session_state.portfolio)
+            if len(tabela_port) < n_port:
+                st.warning(f"Só {len(tabela_port)} escalações viáveis com essas restrições.")
+            st.dataframe(tabela_port, hide_index=True, use_container_width=True)
+            st.download_button(
+                "Baixar CSV", tabela_port.to_csv(index=False).encode("utf-8"),
+                file_name="portfolio.csv", mime="text/csv"
+            )
+            st.dataframe(exposicao(st.session_state.portfolio).rename(columns={
+                "playerName":"Jogador","teamName":"Time","role":"Posição",
+                "escalacoes":"Escalações","exposicao":"Exposição"
+            }), hide_index=True, use_container_width=True, height=250)
+
+with tab3, span("aba.monte_seu_time"):
     st.header("🛠 Monte Seu Time")
     cols3 = st.columns(5)
     roles = ["top","jungle","mid","bottom","support"]
     picks = {}
     for i, pos in enumerate(roles):
         opts = sorted(
-            st.session_state.df[st.session_state.df.role==pos].playerName.unique(),
+            df_sessao[df_sessao.role==pos].playerName.unique(),
             key=lambda x: x.lower()
         )
         picks[pos] = cols3[i].selectbox(
@@ -170,8 +270,8 @@ with tab3:
             key=f"pick_{pos}"
         )
     if all(picks.values()):
-        df_c = st.session_state.df[
-            st.session_state.df.playerName.isin(picks.values())
+        df_c = df_sessao[
+            df_sessao.playerName.isin(picks.values())
         ].rename(columns={
             "playerName":"Jogador","teamName":"Time","role":"Posição",
             "price":"Preço","expectedScore":"Pts Esperados","custo_beneficio":"Pts/Preço"
@@ -191,9 +291,9 @@ with tab3:
     else:
         st.info("Escolha um jogador para cada posição.")
 
-with tab4:
+with tab4, span("aba.base_completa"):
     st.header("📋 Base Completa")
-    df_full = st.session_state.df.rename(columns={
+    df_full = df_sessao.rename(columns={
         "playerName":"Jogador","role":"Posição","teamName":"Time",
         "price":"Preço","teamOdd":"Odds","expectedScore":"Pts Esperados",
         "custo_beneficio":"Pts/Preço","maxRoundScore":"Máx Histórico",
@@ -208,93 +308,49 @@ with tab4:
         ]], height=212, hide_index=True
     )
 
-with tab5:
+with tab5, span("aba.analise_avancada"):
     st.header("📊 Análise Avançada e Insights")
-    df = st.session_state.df.copy()
-
-    # 0) Sharpe ratio simplificado
-    df['sharpe'] = df['expectedScore'] / (df['media_derrota'] + 1e-6)
-
-    # 1) Bolha: Preço vs ExpectedScore (custo-benefício como tamanho)
-    col1, col2 = st.columns(2)
-    fig1 = px.scatter(
-        df, x='price', y='expectedScore', size='custo_beneficio', color='role',
-        hover_name='playerName',
-        title='Preço vs ExpectedScore (bolha ~ Custo-benefício)'
-    )
-    col1.plotly_chart(fig1, use_container_width=True)
+    # st.tabs roda o corpo de todas as abas a cada rerun; as análises só são
+    # montadas com a aba "aberta" e vêm do cache enquanto o df não mudar
+    if not st.toggle("Mostrar análises", key="analise_aberta"):
+        st.caption("Ative para calcular PCA, correlações e gráficos (ficam em cache por versão dos dados).")
+    else:
+        resultado = analise(df_sessao)
+        figuras = resultado["figuras"]
 
-    # 2) Top 10 por Custo-benefício
-    top_cb = df.nlargest(10, 'custo_beneficio')
-    fig2 = px.bar(
-        top_cb, x='playerName', y='custo_beneficio', color='role',
-        hover_data=['teamName'],
-        title='Top 10 Jogadores por Custo-benefício'
-    )
-    col2.plotly_chart(fig2, use_container_width=True)
+        # 1) Bolha: Preço vs ExpectedScore (custo-benefício como tamanho)
+        # 2) Top 10 por Custo-benefício
+        col1, col2 = st.columns(2)
+        col1.plotly_chart(figuras["bolha"], use_container_width=True)
+        col2.plotly_chart(figuras["top_custo_beneficio"], use_container_width=True)
 
-    # 3) Radar Chart (métricas do jogador)
-    metrics = ['expectedScore','media_vitoria','media_derrota','media_confronto','sharpe']
-    player_sel = st.selectbox(
-        "Selecione um Jogador para Radar Chart:",
-        [''] + df['playerName'].sort_values(key=lambda x: x.str.lower()).unique().tolist(),
-        key='radar'
-    )
-    if player_sel:
-        row = df[df['playerName']==player_sel].iloc[0]
-        values = [row[m] for m in metrics]
-        fig3 = px.line_polar(
-            r=values, theta=metrics, line_close=True, markers=True,
-            title=f'Métricas de {player_sel}'
+        # 3) Radar Chart (métricas do jogador) — trocar o jogador não recalcula o resto
+        player_sel = st.selectbox(
+            "Selecione um Jogador para Radar Chart:",
+            [''] + resultado["jogadores"],
+            key='radar'
         )
-        st.plotly_chart(fig3, use_container_width=True)
+        if player_sel:
+            st.plotly_chart(figura_radar(resultado, player_sel), use_container_width=True)
 
-    # 4) PCA 2D das métricas
-    PCA_feats = metrics
-    pca = PCA(n_components=2)
-    coords = pca.fit_transform(df[PCA_feats].fillna(0))
-    df['PC1'], df['PC2'] = coords[:,0], coords[:,1]
-    fig4 = px.scatter(
-        df, x='PC1', y='PC2', color='role', hover_name='playerName',
-        title='PCA 2D das Métricas Principais'
-    )
-    st.plotly_chart(fig4, use_container_width=True)
+        # 4) PCA 2D das métricas
+        st.plotly_chart(figuras["pca"], use_container_width=True)
 
-    # 5) Heatmap de correlação
-    corr = df[PCA_feats].corr()
-    fig5 = px.imshow(
-        corr, text_auto=True, aspect='auto',
-        title='Matriz de Correlação das Métricas'
-    )
-    st.plotly_chart(fig5, use_container_width=True)
+        # 5) Heatmap de correlação
+        st.plotly_chart(figuras["correlacao"], use_container_width=True)
 
-    # 6) Estatísticas descritivas resumidas
-    st.markdown("### Estatísticas Descritivas")
-    desc = df[PCA_feats].describe().T[['mean','std','min','max']]
-    st.dataframe(desc, use_container_width=True)
+        # 6) Estatísticas descritivas resumidas
+        st.markdown("### Estatísticas Descritivas")
+        st.dataframe(resultado["descritivas"], use_container_width=True)
 
-    # 7) Boxplot por Região e Posição
-    fig6 = px.box(
-        df, x='region', y='expectedScore', color='role',
-        title='ExpectedScore por Região e Posição'
-    )
-    st.plotly_chart(fig6, use_container_width=True)
+        # 7) Boxplot por Região e Posição
+        st.plotly_chart(figuras["boxplot"], use_container_width=True)
 
-    # 8) Sunburst (Região -> Posição)
-    region_role = df.groupby(['region','role'])['expectedScore'].mean().reset_index()
-    fig7 = px.sunburst(
-        region_role, path=['region','role'], values='expectedScore',
-        title='ExpectedScore Médio por Região e Posição'
-    )
-    st.plotly_chart(fig7, use_container_width=True)
+        # 8) Sunburst (Região -> Posição)
+        st.plotly_chart(figuras["sunburst"], use_container_width=True)
 
-    # 9) Treemap Top 20
-    top20 = df.nlargest(20,'expectedScore')
-    fig8 = px.treemap(
-        top20, path=['region','teamName','playerName'], values='expectedScore',
-        title='Top 20 Jogadores por Região/Time'
-    )
-    st.plotly_chart(fig8, use_container_width=True)
+        # 9) Treemap Top 20
+        st.plotly_chart(figuras["treemap"], use_container_width=True)
 
     st.markdown("---")
     st.markdown(
@@ -305,4 +361,57 @@ with tab5:
         "\n- **Correlação**: identifica relações fortes entre variáveis."
         "\n- **Análise Regional**: compara consistência Norte vs Sul."
         "\n- **Sunburst/Treemap**: hierarquia e variabilidade de top performers."
-    )
\ No newline at end of file
+    )
+with tab6, span("aba.simulacao"):
+    st.header("🎲 Simulação Monte Carlo")
+    sc1, sc2, sc3 = st.columns(3)
+    n_cand = sc1.number_input("Escalações candidatas", 1, 500, 50, step=10)
+    n_sims = sc2.number_input("Simulações", 1_000, 500_000, 100_000, step=10_000)
+    limiar = sc3.number_input("Limiar de pontos (X)", 0.0, 500.0, 80.0, step=5.0)
+    if st.button("Simular"):
+        candidatos = carregar_solucoes().montar_time_otimo(
+            df_sessao, "expectedScore", overlay.orcamento, k=int(n_cand)
+        )
+        if not candidatos:
+            st.warning("Nenhuma escalação viável com esse orçamento para simular.")
+        else:
+            sim = simular_escalacoes(
+                df_sessao, escalacoes_do_otimizador(candidatos),
+                n_sims=int(n_sims), limiares=(limiar,),
+                partidas=modelo_cache.partidas, jogos=modelo_cache.jogos
+            )
+            sim = sim.sort_values("media", ascending=False).rename(columns={
+                "jogadores":"Escalação","custo":"Custo","pts_esperados":"Pts Esperados",
+                "media":"Média Simulada","desvio":"Desvio",f"P(>{limiar:g})":f"P(> {limiar:g})"
+            })
+            st.dataframe(sim, hide_index=True, use_container_width=True)
+            fig_sim = px.scatter(
+                sim, x="Desvio", y="Média Simulada", color=f"P(> {limiar:g})",
+                hover_name="Escalação", title="Média vs Desvio das Escalações Simuladas"
+            )
+            st.plotly_chart(fig_sim, use_container_width=True)
+
+# Debug: spans e contadores deste rerun
+registro = finalizar_execucao()
+with st.sidebar.expander("🔧 Debug", expanded=False):
+    st.checkbox("Mostrar instrumentação", key="debug_painel")
+    st.checkbox("Capturar perfil (cProfile + tracemalloc)", key="debug_perfil",
+                help="Grava um perfil por rerun em perfis/")
+    if st.session_state.debug_painel and registro is not None:
+        st.metric("Rerun", f"{registro.duracao_ms:.0f} ms")
+        mc1, mc2 = st.columns(2)
+        mc1.metric("Memória da sessão", f"{overlay.memoria() / 1024:.1f} KB")
+        mc2.metric("Base compartilhada", f"{base.memoria() / 1024:.1f} KB")
+        spans = pd.DataFrame([
+            {"Etapa": "· " * s["profundidade"] + s["nome"], "ms": s.get("duracao_ms")}
+            for s in registro.spans
+        ])
+        if not spans.empty:
+            st.dataframe(spans, hide_index=True, use_container_width=True)
+        if registro.contadores:
+            st.dataframe(
+                pd.DataFrame(registro.contadores.items(), columns=["Contador", "Valor"]),
+                hide_index=True, use_container_width=True
+            )
+        for arquivo in registro.arquivos_perfil:
+            st.caption(arquivo)
@@ -0,0 +1,339 @@
+# backtest.py
+
+"""
+Backtest histórico: o expectedScore prevê a pontuação da rodada? As
+escalações do otimizador batem referências simples?
+
+Para cada rodada passada r (indiceRodada das partidas), as entradas são
+remontadas como estavam antes dela:
+  - partidas e jogos: só os de rodadas < r, do HistoricoRodadas (todos os
+    dumps cache/Rodada_N juntos, sem duplicatas)
+  - averageRoundScore, maxRoundScore...: refeitos dessas partidas
+  - próximo oponente: o adversário do time na rodada r
+  - preços: do market.json do dump da rodada (Rodada_{r+1}), senão o
+    previousRoundPrice do dump seguinte, senão o preço atual
+  - odds: settings.json do dump da rodada, senão o histórico de ajustes
+    (configuracoes.estado_em), senão 2.0 para todos
+
+Com isso rodam calcular_medias, calcular_estatisticas e montar_time_otimo,
+e tudo é comparado com o realizado: a pontuação da rodada de cada jogador
+(média das partidas dele na rodada; 0 se não jogou). Saem duas tabelas:
+  - erros: MAE, RMSE, viés e correlação de Spearman de cada preditor
+    (expectedScore, base_exp sem o peso de confronto, averageRoundScore)
+    nos jogadores que jogaram a rodada
+  - escalacoes: pontos previstos e realizados da escalação de cada
+    estratégia (otimizador em cada preditor, média de escalações
+    aleatórias no orçamento e o oráculo, otimizado no realizado), e o
+    resumo com a média de cada estratégia sobre as rodadas
+
+Cada (rodada, combinação da grade de parâmetros) é uma tarefa; as
+tarefas rodam num pool de processos, com a base enviada uma vez por
+processo (como em cenarios.py).
+
+Uso:
+    python backtest.py --processos 4
+    python backtest.py --grade peso_forma=0,0.2,0.4 max_por_time=0,2 --saida backtest
+"""
+
+import os
+import sys
+import argparse
+import itertools
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from api_config import CACHE_DIR, carregar_json_cache
+from historico_rodadas import HistoricoRodadas, PADRAO_RODADA
+from snapshot import carregar_modelo
+from utils import POSICOES, calcular_medias, calcular_estatisticas, montar_time_otimo
+from pontuacao import COLUNAS_TEMPORADA, _por_rodada
+from forma import FormaJogadores, aplicar_forma
+from configuracoes import SETTINGS_FILE, carregar_settings, estado_em, ler_historico
+
+RODADA_MINIMA = 1  # rodadas antes desta não têm histórico para prever
+ODD_NEUTRA = 2.0
+N_ALEATORIAS = 2000
+PREDITORES = ["expectedScore", "base_exp", "averageRoundScore"]
+GRADE_PADRAO = {"peso_forma": [0.0], "max_por_time": [0]}
+
+
+def _mercados(raiz, historico):
+    """rodada -> {"precos", "anteriores", "odds"} dos dumps cache/Rodada_N."""
+    mercados = {}
+    for diretorio in historico.diretorios_rodada():
+        if not PADRAO_RODADA.match(os.path.basename(os.path.normpath(diretorio))):
+            continue
+        try:
+            market = carregar_json_cache("market.json", diretorio).get("data", {})
+        except FileNotFoundError:
+            continue
+        rodada = int(market.get("round", {}).get("indexInSplit", -1))
+        jogadores = market.get("roundPlayers", [])
+        mercados[rodada] = {
+            "precos": {j.get("proPlayerId"): j.get("price") for j in jogadores},
+            "anteriores": {j.get("proPlayerId"): j.get("previousRoundPrice") for j in jogadores},
+            "odds": carregar_settings(os.path.join(diretorio, SETTINGS_FILE)).get("odds") or {},
+            "inicio": market.get("round", {}).get("marketClosesAt"),
+        }
+    return mercados
+
+
+def preparar_base(raiz=CACHE_DIR, diretorio=None, settings_file=SETTINGS_FILE) -> dict:
+    """
+    Jogadores (do dump `diretorio`, padrão: `raiz`), histórico de partidas
+    e jogos de todos os dumps com a rodada de cada um, e os mercados/odds
+    por rodada. É o que cada processo do pool recebe.
+    """
+    modelo, _, _ = carregar_modelo(diretorio or raiz)
+    historico = HistoricoRodadas(raiz)
+    historico.atualizar()
+
+    linha = {pid: jid for jid, pid in enumerate(modelo.jogadores["proPlayerId"])}
+    partidas = historico.partidas.assign(linha=historico.partidas["proPlayerId"].map(linha))
+    partidas = partidas.dropna(subset=["linha", "indiceRodada"]).astype({"linha": np.int64})
+    jogos = historico.jogos.assign(linha=historico.jogos["proPlayerId"].map(linha))
+    jogos = jogos.dropna(subset=["linha"]).astype({"linha": np.int64})
+    jogos = jogos.merge(partidas[["linha", "matchId", "indiceRodada"]], on=["linha", "matchId"], how="inner")
+    return {
+        "jogadores": modelo.jogadores,
+        "partidas": partidas.sort_values(["linha", "startsAt"], kind="stable", ignore_index=True),
+        "jogos": jogos,
+        "mercados": _mercados(raiz, historico),
+        "settings": ler_historico(settings_file),
+    }
+
+
+def _odds(base, rodada, inicio):
+    mercado = base["mercados"].get(rodada, {})
+    if mercado.get("odds"):
+        return mercado["odds"], "rodada"
+    estado = estado_em(inicio, historico=base["settings"]) if inicio and base["settings"] else None
+    if estado and estado.get("odds"):
+        return estado["odds"], "historico"
+    return {}, "neutras"
+
+
+def _precos(base, rodada):
+    jogadores = base["jogadores"]
+    pid = jogadores["proPlayerId"]
+    atual = pd.to_numeric(jogadores["price"], errors="coerce")
+    if rodada in base["mercados"]:
+        return pd.to_numeric(pid.map(base["mercados"][rodada]["precos"]), errors="coerce").fillna(atual), "rodada"
+    if rodada + 1 in base["mercados"]:
+        anteriores = pid.map(base["mercados"][rodada + 1]["anteriores"])
+        return pd.to_numeric(anteriores, errors="coerce").fillna(atual), "anterior"
+    return atual, "atual"
+
+
+def entradas_da_rodada(base, rodada, peso_forma=0.0) -> tuple:
+    """
+    (jogadores com estatísticas, pontuação realizada, jogou, info) como
+    estavam antes da `rodada`.
+    """
+    jogadores = base["jogadores"].copy()
+    partidas, jogos = base["partidas"], base["jogos"]
+    n = len(jogadores)
+    antes = partidas[partidas["indiceRodada"] < rodada]
+    na_rodada = partidas[partidas["indiceRodada"] == rodada]
+
+    # realizado: média das partidas do jogador na rodada
+    score = na_rodada.groupby("linha")["score"].mean()
+    realizado = score.reindex(range(n)).fillna(0.0).to_numpy()
+    jogou = np.zeros(n, dtype=bool)
+    jogou[score.index.to_numpy()] = True
+
+    # oponente do time na rodada (de qualquer jogador do time que jogou)
+    times = jogadores["teamName"].to_numpy(dtype=object)
+    oponente_time = (
+        pd.DataFrame({"time": times[na_rodada["linha"].to_numpy()],
+                      "oponente": na_rodada["adversario"].to_numpy(dtype=object)})
+        .dropna().groupby("time")["oponente"].first()
+    )
+    jogadores["proximoOponente"] = jogadores["teamName"].map(oponente_time).astype(object)
+
+    # temporada até a rodada anterior
+    temporada = _por_rodada(antes, antes["score"].to_numpy(dtype=float)).reindex(range(n))
+    temporada.columns = list(COLUNAS_TEMPORADA)
+    for col in COLUNAS_TEMPORADA:
+        jogadores[col] = temporada[col].to_numpy()
+
+    inicio = base["mercados"].get(rodada, {}).get("inicio") or (na_rodada["startsAt"].min() if len(na_rodada) else None)
+    jogadores["price"], fonte_precos = _precos(base, rodada)
+    odds, fonte_odds = _odds(base, rodada, inicio)
+    jogadores["teamOdd"] = pd.to_numeric(jogadores["teamName"].map(odds), errors="coerce").fillna(ODD_NEUTRA)
+
+    jogos_antes = jogos[jogos["indiceRodada"] < rodada]
+    medias = calcular_medias(jogadores, antes, jogos_antes)
+    if peso_forma:
+        forma = FormaJogadores(None)
+        forma.atualizar(jogos_antes)
+        medias = aplicar_forma(medias, jogadores, forma.features(), peso_forma)
+    stats = calcular_estatisticas(jogadores, medias)
+    stats["realizado"] = realizado
+    info = {"precos": fonte_precos, "odds": fonte_odds, "jogadores_rodada": int(jogou.sum())}
+    return stats, realizado, jogou, info
+
+
+def erros(previsto, realizado) -> dict:
+    """MAE, RMSE, viés (previsto - realizado) e Spearman, ignorando NaN no previsto."""
+    previsto = np.asarray(previsto, dtype=float)
+    ok = ~np.isnan(previsto)
+    previsto, realizado = previsto[ok], np.asarray(realizado, dtype=float)[ok]
+    if len(previsto) < 2:
+        return {"n": int(len(previsto)), "mae": np.nan, "rmse": np.nan, "vies": np.nan, "spearman": np.nan}
+    diferenca = previsto - realizado
+    postos = [pd.Series(x).rank().to_numpy() for x in (previsto, realizado)]
+    spearman = np.corrcoef(*postos)[0, 1] if postos[0].std() and postos[1].std() else np.nan
+    return {
+        "n": int(len(previsto)),
+        "mae": float(np.abs(diferenca).mean()),
+        "rmse": float(np.sqrt((diferenca ** 2).mean())),
+        "vies": float(diferenca.mean()),
+        "spearman": float(spearman),
+    }
+
+
+def _aleatorias(stats, orcamento, max_por_time, n, seed):
+    """Pontos realizados médios de `n` escalações aleatórias que cabem no orçamento."""
+    rng = np.random.default_rng(seed)
+    preco = pd.to_numeric(stats["price"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    realizado = stats["realizado"].to_numpy(dtype=float)
+    times = pd.factorize(stats["teamName"])[0]
+    escolhas = []
+    for pos in POSICOES:
+        idx = np.flatnonzero((stats["role"] == pos).to_numpy())
+        if not len(idx):
+            return np.nan
+        escolhas.append(rng.choice(idx, size=n))
+    escolhas = np.column_stack(escolhas)
+    validas = preco[escolhas].sum(axis=1) <= orcamento + 1e-9
+    if max_por_time:
+        t = np.sort(times[escolhas], axis=1)
+        repetidos = np.ones(t.shape, dtype=int)
+        for i in range(1, t.shape[1]):
+            repetidos[:, i] = np.where(t[:, i] == t[:, i - 1], repetidos[:, i - 1] + 1, 1)
+        validas &= repetidos.max(axis=1) <= max_por_time
+    return float(realizado[escolhas[validas]].sum(axis=1).mean()) if validas.any() else np.nan
+
+
+def avaliar_rodada(base, rodada, orcamento, peso_forma=0.0, max_por_time=0, n_aleatorias=N_ALEATORIAS) -> tuple:
+    """(linhas de erro, linhas de escalação) de uma rodada com um conjunto de parâmetros."""
+    stats, realizado, jogou, info = entradas_da_rodada(base, rodada, peso_forma)
+    comum = {"rodada": rodada, "orcamento": orcamento, "peso_forma": peso_forma,
+             "max_por_time": max_por_time, **info}
+
+    linhas_erro = [
+        {**comum, "preditor": col, **erros(stats[col].to_numpy(dtype=float)[jogou], realizado[jogou])}
+        for col in PREDITORES
+    ]
+    linhas_esc = []
+    for estrategia in PREDITORES + ["realizado"]:
+        resultado = montar_time_otimo(stats, estrategia, orcamento, k=1, max_por_time=max_por_time or None)
+        if not resultado:
+            continue
+        time_, custo, previsto, _ = resultado[0]
+        linhas_esc.append({
+            **comum, "estrategia": "oraculo" if estrategia == "realizado" else estrategia,
+            "custo": round(float(custo), 2),
+            "pts_previstos": round(float(sum(j["expectedScore"] for j in time_)), 2),
+            "pts_realizados": round(float(sum(j["realizado"] for j in time_)), 2),
+            "jogadores": ";".join(j["playerName"] for j in time_),
+        })
+    linhas_esc.append({
+        **comum, "estrategia": "aleatoria",
+        "pts_realizados": _aleatorias(stats, orcamento, max_por_time, n_aleatorias, seed=rodada),
+    })
+    return linhas_erro, linhas_esc
+
+
+# estado do processo (pool): a base é enviada uma única vez
+_BASE = None
+
+
+def _iniciar(base):
+    global _BASE
+    _BASE = base
+
+
+def _tarefa(tarefa):
+    rodada, parametros = tarefa
+    return avaliar_rodada(_BASE, rodada, **parametros)
+
+
+def _combinacoes(grade):
+    chaves = list(grade)
+    return [dict(zip(chaves, valores)) for valores in itertools.product(*(grade[c] for c in chaves))]
+
+
+def executar_backtest(base, orcamentos, grade=None, rodadas=None, processos=1) -> dict:
+    """
+    Roda todas as (rodada, orçamento, parâmetros da grade). `grade`:
+    {"peso_forma": [...], "max_por_time": [...]}. Retorna {"erros",
+    "escalacoes", "resumo"} como DataFrames; o resumo é a média por
+    estratégia e parâmetros sobre as rodadas.
+    """
+    grade = {**GRADE_PADRAO, **(grade or {}), "orcamento": list(orcamentos)}
+    if rodadas is None:
+        disponiveis = sorted(int(r) for r in base["partidas"]["indiceRodada"].unique())
+        rodadas = [r for r in disponiveis if r >= RODADA_MINIMA]
+    tarefas = [(r, p) for r in rodadas for p in _combinacoes(grade)]
+    if processos > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(processos, initializer=_iniciar, initargs=(base,)) as pool:
+            partes = list(pool.map(_tarefa, tarefas))
+    else:
+        _iniciar(base)
+        partes = [_tarefa(t) for t in tarefas]
+
+    erros_df = pd.DataFrame([linha for e, _ in partes for linha in e])
+    escalacoes = pd.DataFrame([linha for _, s in partes for linha in s])
+    parametros = list(grade)
+    resumo = (
+        escalacoes.groupby(parametros + ["estrategia"], dropna=False)["pts_realizados"]
+        .agg(["mean", "std", "count"]).reset_index()
+        .rename(columns={"mean": "pts_realizados_media", "std": "pts_realizados_desvio", "count": "rodadas"})
+        .sort_values(parametros + ["pts_realizados_media"], ascending=[True] * len(parametros) + [False],
+                     ignore_index=True)
+    ) if len(escalacoes) else escalacoes
+    return {"erros": erros_df, "escalacoes": escalacoes, "resumo": resumo}
+
+
+def _ler_grade(itens):
+    """["peso_forma=0,0.3", "max_por_time=0,2"] -> {"peso_forma": [0.0, 0.3], "max_por_time": [0, 2]}."""
+    grade = {}
+    for item in itens:
+        chave, _, valores = item.partition("=")
+        if chave not in GRADE_PADRAO:
+            raise SystemExit(f"Parâmetro de grade desconhecido: {chave} (use {', '.join(GRADE_PADRAO)})")
+        tipo = type(GRADE_PADRAO[chave][0])
+        grade[chave] = [tipo(float(v)) for v in valores.split(",") if v]
+    return grade
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backtest histórico do expectedScore e do otimizador")
+    parser.add_argument("--raiz", default=CACHE_DIR, help="cache com os dumps Rodada_N")
+    parser.add_argument("--diretorio", help="dump com os jogadores (padrão: a raiz)")
+    parser.add_argument("--orcamentos", nargs="+", type=float, help="padrão: o do settings.json")
+    parser.add_argument("--grade", nargs="*", default=[], metavar="PARAM=V1,V2",
+                        help=f"grade de parâmetros ({', '.join(GRADE_PADRAO)})")
+    parser.add_argument("--rodadas", nargs="+", type=int, help="índices das rodadas (padrão: todas com histórico)")
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--saida", help="prefixo dos CSV (<saida>_erros.csv, _escalacoes.csv, _resumo.csv)")
+    args = parser.parse_args(argv)
+
+    orcamentos = args.orcamentos or [carregar_settings(SETTINGS_FILE).get("orcamento", 25.0)]
+    base = preparar_base(args.raiz, args.diretorio)
+    resultado = executar_backtest(base, orcamentos, _ler_grade(args.grade), args.rodadas, args.processos)
+
+    if args.saida:
+        for nome, tabela in resultado.items():
+            tabela.to_csv(f"{args.saida}_{nome}.csv", index=False)
+        print(f">> Backtest gravado em {args.saida}_*.csv")
+    colunas_erro = ["rodada", *GRADE_PADRAO, "orcamento", "preditor", "n", "mae", "rmse", "vies", "spearman"]
+    print(resultado["erros"][[c for c in colunas_erro if c in resultado["erros"].columns]].to_string(index=False))
+    print(resultado["resumo"].to_string(index=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,11 @@
+# benchmark/__init__.py
+
+"""
+Benchmarks do pipeline (integrate_data -> estatísticas -> otimizador)
+sobre ligas sintéticas geradas no esquema do cache/.
+
+Uso: python -m benchmark [--tamanho pequeno|medio|grande] [--salvar]
+"""
+
+from benchmark.gerador import gerar_liga
+from benchmark.executar import TAMANHOS, medir, executar, comparar, rodar
@@ -0,0 +1,31 @@
+# benchmark/__main__.py
+
+import sys
+import argparse
+
+from benchmark.executar import PISO_S, TAMANHOS, rodar
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmark", description="Benchmark do pipeline")
+    parser.add_argument("--tamanho", choices=list(TAMANHOS), default="pequeno")
+    parser.add_argument("--repeticoes", type=int, default=3)
+    parser.add_argument("--etapas", nargs="+", help="mede só estas etapas")
+    parser.add_argument("--salvar", action="store_true", help="grava o resultado como baseline")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="folga sobre a mediana do baseline antes de acusar regressão")
+    parser.add_argument("--piso-ms", type=float, default=PISO_S * 1e3,
+                        help="diferença mínima (ms) para acusar regressão")
+    parser.add_argument("--diretorio", help="usa/gera a liga neste diretório em vez de um temporário")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    _, regressoes = rodar(
+        args.tamanho, args.repeticoes, args.etapas, args.salvar,
+        args.tolerancia, diretorio=args.diretorio, seed=args.seed, piso_s=args.piso_ms / 1e3,
+    )
+    return 1 if regressoes else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,209 @@
+# benchmark/executar.py
+
+"""
+Execução cronometrada das etapas do pipeline sobre uma liga sintética.
+
+Cada etapa roda `repeticoes` vezes; guardamos o menor tempo, a mediana e
+o pico de memória (numa execução extra sob tracemalloc, que também
+contabiliza os buffers do NumPy). O resultado pode ser salvo como baseline JSON e comparado nas
+execuções seguintes: etapas com mediana acima de baseline * (1 + tolerância)
+são marcadas como regressão. Etapas curtas (mediana do baseline abaixo de
+ETAPA_CURTA_S) comparam o menor tempo, menos sujeito a ruído, e nenhuma
+diferença abaixo de PISO_S conta como regressão.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import subprocess
+import tempfile
+import statistics
+import tracemalloc
+import contextlib
+
+import numpy as np
+
+from benchmark.gerador import gerar_liga
+
+BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# nome -> (n_jogadores, jogos_por_jogador)
+TAMANHOS = {
+    "pequeno": (85, 14),
+    "medio": (1000, 50),
+    "grande": (10000, 200),
+}
+
+# etapas de poucos milissegundos: compara o mínimo e ignora diferenças < piso
+ETAPA_CURTA_S = 0.1
+PISO_S = 0.005
+
+
+def medir(funcao, repeticoes=3):
+    """
+    Roda `funcao` `repeticoes` vezes cronometrando, e mais uma vez sob
+    tracemalloc para o pico de memória (o rastreamento distorce o tempo).
+    Retorna (resultado, métricas).
+    """
+    tempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            resultado = funcao()
+            tempos.append(time.perf_counter() - inicio)
+        del resultado
+        tracemalloc.start()
+        try:
+            resultado = funcao()
+            pico = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return resultado, {
+        "min_s": min(tempos),
+        "mediana_s": statistics.median(tempos),
+        "pico_mb": pico / 2**20,
+    }
+
+
+def executar(diretorio, repeticoes=3, etapas=None):
+    """Mede cada etapa do pipeline sobre os JSON de `diretorio`. Retorna {etapa: métricas}."""
+    from api_config import integrate_data
+    from snapshot import compilar_snapshot, ler_snapshot
+    from modelo import ModeloRodada
+    from utils import (
+        calcular_medias, calcular_estatisticas, atualizar_odds,
+        montar_time_otimo, montar_times, fronteira_eficiente,
+    )
+    from simulacao import simular_escalacoes, escalacoes_do_otimizador
+    from pontuacao import MatrizPontuacao, repontuar
+    from sessao import BaseCompartilhada, OverlaySessao
+    from forma import FormaJogadores, jogos_do_modelo
+    from portfolio import montar_portfolio
+    from confrontos import IndiceConfrontos
+
+    resultados = {}
+
+    def _etapa(nome, funcao, repeticoes=repeticoes, necessaria=False):
+        """Mede a etapa; fora de `etapas`, só roda (sem medir) se outra depende dela."""
+        if etapas and nome not in etapas:
+            if not necessaria:
+                return None
+            with contextlib.redirect_stdout(io.StringIO()):
+                return funcao()
+        valor, metricas = medir(funcao, repeticoes)
+        resultados[nome] = metricas
+        print(f"  {nome:<24} {metricas['mediana_s'] * 1e3:10.1f} ms  {metricas['pico_mb']:8.1f} MB")
+        return valor
+
+    df, market = _etapa("integrate_data", lambda: integrate_data(diretorio, recompilar_snapshot=False),
+                        necessaria=True)
+    _etapa("compilar_snapshot", lambda: compilar_snapshot(diretorio), repeticoes=1,
+           necessaria="carregar_snapshot" in (etapas or ()))
+    # snapshot -> ModeloRodada, para comparar com integrate_data + modelo
+    _etapa("carregar_snapshot", lambda: ler_snapshot(diretorio))
+    modelo = _etapa("modelo", lambda: ModeloRodada(df, market), necessaria=True)
+
+    rng = np.random.default_rng(0)
+    odds = {t: round(float(rng.uniform(1.1, 5.0)), 2) for t in modelo.times["teamName"]}
+    base = modelo.jogadores.copy()
+    base["teamOdd"] = base["teamName"].map(odds)
+
+    medias = _etapa("calcular_medias", lambda: calcular_medias(base, modelo.partidas, modelo.jogos), necessaria=True)
+    confrontos = _etapa("confrontos", lambda: IndiceConfrontos(modelo), necessaria=True)
+    _etapa("calcular_medias_indice",
+           lambda: calcular_medias(base, modelo.partidas, modelo.jogos, confrontos))
+    stats = _etapa("calcular_estatisticas", lambda: calcular_estatisticas(base, medias), necessaria=True)
+    time_alterado = next(iter(odds))
+    _etapa("atualizar_odds", lambda: atualizar_odds(stats, medias, {**odds, time_alterado: 1.5}))
+    # multiusuário: uma base por versão dos dados e um overlay por sessão;
+    # o pico de memória de sessoes_50 / 50 é o custo de uma sessão a mais
+    base_sessoes = _etapa("base_compartilhada", lambda: BaseCompartilhada(modelo.jogadores, medias), necessaria=True)
+    _etapa("sessoes_50", lambda: [OverlaySessao(base_sessoes, odds, 50.0) for _ in range(50)])
+    matriz = _etapa("matriz_pontuacao", lambda: MatrizPontuacao(modelo), necessaria=True)
+    _etapa("repontuar", lambda: repontuar(modelo, {"kills": 3.0, "deaths": -2.0}, matriz))
+    jogos_forma = jogos_do_modelo(modelo)
+    _etapa("forma", lambda: FormaJogadores(None).atualizar(jogos_forma))
+
+    # orçamento "apertado": mediana dos preços por posição, com 10% de folga
+    orcamento = round(float(stats.groupby("role")["price"].median().sum()) * 1.1, 1)
+    _etapa("montar_time_otimo_k1", lambda: montar_time_otimo(stats, "expectedScore", orcamento, k=1))
+    candidatos = _etapa("montar_time_otimo_k50",
+                        lambda: montar_time_otimo(stats, "expectedScore", orcamento, k=50), necessaria=True)
+    _etapa("montar_times", lambda: montar_times(stats, orcamento))
+    _etapa("fronteira_eficiente", lambda: fronteira_eficiente(stats))
+    _etapa("portfolio_50", lambda: montar_portfolio(stats, "expectedScore", orcamento, n=50), repeticoes=1)
+    _etapa("simular_50x20k", lambda: simular_escalacoes(
+        stats, escalacoes_do_otimizador(candidatos), n_sims=20_000,
+        partidas=modelo.partidas, jogos=modelo.jogos, seed=0,
+    ))
+    # processo novo: import + carga + estatísticas + otimizador, como no cron
+    _etapa("cli_solve", lambda: subprocess.run(
+        [sys.executable, os.path.join(RAIZ, "cli.py"), "solve", "--diretorio", diretorio,
+         "--orcamento", str(orcamento)],
+        cwd=RAIZ, check=True, capture_output=True,
+    ))
+    return resultados
+
+
+def comparar(resultados, baseline, tolerancia=0.2, piso_s=PISO_S):
+    """
+    Etapas que passaram de baseline * (1 + tolerancia) e de baseline + piso_s:
+    {etapa: (antes, agora)}. Compara a mediana, ou o mínimo nas etapas curtas.
+    """
+    regressoes = {}
+    for etapa, m in resultados.items():
+        antes = baseline.get(etapa)
+        if not antes:
+            continue
+        chave = "min_s" if antes["mediana_s"] < ETAPA_CURTA_S and "min_s" in antes else "mediana_s"
+        if m[chave] > antes[chave] * (1 + tolerancia) and m[chave] - antes[chave] > piso_s:
+            regressoes[etapa] = (antes[chave], m[chave])
+    return regressoes
+
+
+def _ler_baseline(caminho):
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def rodar(tamanho="pequeno", repeticoes=3, etapas=None, salvar=False, tolerancia=0.2,
+          baseline=BASELINE, diretorio=None, seed=0, piso_s=PISO_S):
+    """
+    Gera (ou reaproveita) a liga do `tamanho`, mede as etapas e compara com
+    o baseline salvo para o mesmo tamanho. Retorna (resultados, regressões).
+    """
+    n_jogadores, jogos = TAMANHOS[tamanho]
+    temporario = diretorio is None
+    diretorio = diretorio or tempfile.mkdtemp(prefix=f"liga_{tamanho}_")
+    try:
+        if not os.path.exists(os.path.join(diretorio, "market.json")):
+            inicio = time.perf_counter()
+            resumo = gerar_liga(diretorio, n_jogadores, jogos, seed=seed)
+            print(f">> Liga {tamanho}: {resumo} gerada em {time.perf_counter() - inicio:.1f}s")
+        resultados = executar(diretorio, repeticoes, etapas)
+    finally:
+        if temporario:
+            shutil.rmtree(diretorio, ignore_errors=True)
+
+    todos = _ler_baseline(baseline)
+    regressoes = comparar(resultados, todos.get(tamanho, {}).get("etapas", {}), tolerancia, piso_s)
+    for etapa, (antes, agora) in regressoes.items():
+        print(f"[REGRESSÃO] {etapa}: {antes * 1e3:.1f} ms -> {agora * 1e3:.1f} ms")
+
+    if salvar:
+        todos[tamanho] = {
+            "maquina": f"{platform.python_implementation()} {platform.python_version()} {platform.machine()}",
+            "repeticoes": repeticoes,
+            "etapas": resultados,
+        }
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump(todos, f, indent=2)
+        print(f">> Baseline '{tamanho}' salvo em {baseline}")
+    return resultados, regressoes
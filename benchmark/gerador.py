@@ -0,0 +1,176 @@
+# benchmark/gerador.py
+
+"""
+Gerador de ligas sintéticas no mesmo esquema do cache/.
+
+Escreve market.json, player-stats.json e um player-<uuid>.json por
+jogador. Cada time tem um jogador por posição; os times se enfrentam em
+rodadas (todos contra todos, repetindo o turno se preciso) em séries de
+1 a `melhor_de` jogos. Como nos dados reais, o score da partida é a média
+dos points dos jogos e o vencedor da série é o do último jogo.
+"""
+
+import os
+import json
+import math
+import uuid
+import random
+
+from api_config import TIMES_SUL
+from utils import POSICOES
+
+# tipos de pontuação em games[].details: (detailType, pontos por unidade)
+DETALHES = [("kills", 1.5), ("asssits", 1.0), ("deaths", -1.0), ("cs", 0.01)]
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _calendario(n_times, n_rodadas, rng):
+    """Lista de rodadas, cada uma uma lista de pares (time_a, time_b)."""
+    times = list(range(n_times)) + ([None] if n_times % 2 else [])
+    rng.shuffle(times)
+    rodadas = []
+    while len(rodadas) < n_rodadas:
+        # método do círculo: fixa o primeiro e gira os demais
+        for _ in range(len(times) - 1):
+            metade = len(times) // 2
+            pares = [(times[i], times[-1 - i]) for i in range(metade)]
+            rodadas.append([(a, b) for a, b in pares if a is not None and b is not None])
+            times = [times[0], times[-1]] + times[1:-1]
+            if len(rodadas) == n_rodadas:
+                break
+    return rodadas
+
+
+def _jogo(rng, game_id, match_id, inicio, indice, venceu, forca):
+    kills = max(0, int(rng.gauss(3 + 2 * venceu, 2) * forca))
+    deaths = max(0, int(rng.gauss(3 - venceu, 1.5)))
+    assists = max(0, int(rng.gauss(5 + 3 * venceu, 3) * forca))
+    cs = max(0, int(rng.gauss(200, 60)))
+    contagens = {"kills": kills, "asssits": assists, "deaths": deaths, "cs": cs}
+    detalhes = [
+        {"count": contagens[tipo], "value": round(contagens[tipo] * peso, 2),
+         "detailType": tipo, "displayMode": "int"}
+        for tipo, peso in DETALHES
+    ]
+    return {
+        "gameId": game_id,
+        "matchId": match_id,
+        "indexInMatch": indice,
+        "gameTimestamp": inicio,
+        "championName": "Campeao",
+        "championId": rng.randint(1, 900),
+        "teamKills": kills + rng.randint(0, 15),
+        "duration": rng.randint(1_300_000, 2_600_000),
+        "cs": cs,
+        "damage": round(rng.uniform(5_000, 40_000), 2),
+        "csAt15": int(cs * 0.4),
+        "kills": kills,
+        "deaths": deaths,
+        "assists": assists,
+        "win": venceu,
+        "details": detalhes,
+        "points": round(sum(d["value"] for d in detalhes), 2),
+        "pentakills": 0,
+    }
+
+
+def gerar_liga(destino: str,
+               n_jogadores: int = 85,
+               jogos_por_jogador: int = 14,
+               melhor_de: int = 3,
+               seed: int = 0) -> dict:
+    """
+    Gera uma liga em `destino` com ~`n_jogadores` (múltiplo de 5) e
+    ~`jogos_por_jogador` jogos no histórico de cada um. Retorna um resumo.
+    """
+    rng = random.Random(seed)
+    os.makedirs(destino, exist_ok=True)
+    n_times = max(2, math.ceil(n_jogadores / len(POSICOES)))
+    jogos_por_serie = (1 + melhor_de) / 2 if melhor_de > 1 else 1
+    n_rodadas = max(1, round(jogos_por_jogador / jogos_por_serie))
+
+    times = []
+    for i in range(n_times):
+        nome = f"{TIMES_SUL[i % len(TIMES_SUL)]} {i}" if i % 2 else f"Time {i}"
+        times.append({"id": _uuid(rng), "name": nome, "imageUrl": "", "code": f"T{i}"})
+    rodadas_info = [{"id": _uuid(rng), "name": f"Round {r + 1}", "indexInSplit": r} for r in range(n_rodadas + 1)]
+
+    def _adversario(t):
+        return {"id": times[t]["id"], "name": times[t]["name"], "code": times[t]["code"],
+                "side": "blue", "imageUrl": ""}
+
+    # calendário: só o resumo de cada série; os jogos saem por jogador na escrita.
+    # +1 rodada: a última vira upcomingMatches
+    series = [[] for _ in range(n_times)]
+    proximas = [[] for _ in range(n_times)]
+    for r, pares in enumerate(_calendario(n_times, n_rodadas + 1, rng)):
+        inicio = f"2025-{1 + r // 28 % 12:02d}-{1 + r % 28:02d}T16:00:00.000Z"
+        for a, b in pares:
+            match_id = _uuid(rng)
+            if r == n_rodadas:
+                if (a, b) == pares[-1] and len(pares) > 1:
+                    continue  # folga: dois times sem próxima partida, como no fim do split
+                for t, o in [(a, b), (b, a)]:
+                    proximas[t].append({
+                        "matchId": match_id, "startsAt": inicio, "status": "upcoming",
+                        "round": rodadas_info[r], "ownTeam": _adversario(t), "opponentTeam": _adversario(o),
+                    })
+                continue
+            n_jogos = 1 if melhor_de == 1 else rng.randint((melhor_de + 1) // 2, melhor_de)
+            vitorias_a = [rng.random() < 0.5 for _ in range(n_jogos)]
+            game_ids = [_uuid(rng) for _ in range(n_jogos)]
+            series[a].append((r, match_id, inicio, b, vitorias_a, game_ids))
+            series[b].append((r, match_id, inicio, a, [not v for v in vitorias_a], game_ids))
+
+    round_players, stats, n_total = [], [], 0
+    for t in range(n_times):
+        for pos in POSICOES:
+            pro_id, nome = _uuid(rng), f"J{len(round_players)}"
+            forca = rng.uniform(0.6, 1.6)
+            recentes, jogos = [], []
+            for r, match_id, inicio, o, vitorias, game_ids in series[t]:
+                serie = [
+                    _jogo(rng, gid, match_id, inicio, i, v, forca)
+                    for i, (gid, v) in enumerate(zip(game_ids, vitorias))
+                ]
+                jogos.extend(serie)
+                recentes.append({
+                    "matchId": match_id, "startsAt": inicio,
+                    "score": round(sum(g["points"] for g in serie) / len(serie), 2),
+                    "round": rodadas_info[r], "opponentTeam": _adversario(o),
+                })
+            n_total += len(jogos)
+            detalhes = {
+                "player": {"id": pro_id, "name": nome},
+                "upcomingMatches": proximas[t],
+                "recentMatches": recentes,
+                "games": jogos,
+            }
+            with open(os.path.join(destino, f"player-{pro_id}.json"), "w", encoding="utf-8") as f:
+                json.dump({"data": detalhes}, f)
+
+            preco = round(min(16.0, max(4.0, 4 + forca * 6 + rng.uniform(-1.5, 1.5))), 1)
+            round_players.append({
+                "proPlayerId": pro_id, "id": _uuid(rng), "summonerName": nome,
+                "imageUrl": "", "teamId": times[t]["id"], "role": pos,
+                "previousRoundPrice": preco, "price": preco, "upcomingOpponents": [],
+            })
+            pontos = [m["score"] for m in recentes] or [0.0]
+            stats.append({
+                "proPlayerId": pro_id,
+                "averageRoundScore": round(sum(pontos) / len(pontos), 2),
+                "maxRoundScore": max(pontos), "minRoundScore": min(pontos),
+                "lastRoundScore": pontos[-1], "lastRoundPrice": preco,
+            })
+
+    market = {"round": rodadas_info[n_rodadas], "upcomingRound": rodadas_info[n_rodadas],
+              "teams": times, "roundPlayers": round_players}
+    with open(os.path.join(destino, "market.json"), "w", encoding="utf-8") as f:
+        json.dump({"data": market}, f)
+    with open(os.path.join(destino, "player-stats.json"), "w", encoding="utf-8") as f:
+        json.dump({"data": {"players": stats}}, f)
+
+    return {"jogadores": len(round_players), "times": n_times, "rodadas": n_rodadas, "jogos": n_total}
@@ -0,0 +1,212 @@
+# cache_incremental.py
+
+"""
+Recarga incremental do cache, guiada por um manifesto dos arquivos.
+
+O manifesto guarda (tamanho, mtime_ns, hash do conteúdo) de cada JSON do
+diretório. `mudou()` só faz stat nos arquivos, então pode rodar a cada
+rerun do Streamlit. `recarregar()` confirma as mudanças pelo hash, relê
+apenas os player-*.json alterados, substitui essas linhas no DataFrame
+integrado e refaz as médias (calcular_medias) só desses jogadores. As
+sessões recebem o ModeloRodada (modelo.py) montado a partir dele. As
+médias levam também a forma recente (forma.py), atualizada só com os
+jogos novos de cada recarga, e o índice de confrontos do modelo
+(confrontos.py) é atualizado só nas linhas desses jogadores.
+
+Mudanças em market.json ou nas estatísticas da temporada, e jogadores que
+entram ou saem, disparam uma recarga completa. Quando a carga veio de um
+snapshot atualizado (snapshot.py), o modelo sai direto das colunas, sem o
+DataFrame integrado; a primeira mudança depois disso também recarrega tudo.
+"""
+
+import os
+import json
+import hashlib
+import threading
+import numpy as np
+
+from api_config import (
+    CACHE_DIR, ARQUIVOS_TEMPORADA, listar_fontes,
+    carregar_temporada_cache, montar_linha, indexar_times,
+)
+from snapshot import carregar_modelo
+from utils import calcular_medias, atualizar_medias
+from modelo import ModeloRodada
+from forma import FormaJogadores, aplicar_forma, jogos_do_modelo
+from instrumentacao import span, contar
+
+
+def _hash(caminho):
+    with open(caminho, "rb") as f:
+        return hashlib.blake2b(f.read(), digest_size=16).hexdigest()
+
+
+def _stat(diretorio):
+    """nome -> (tamanho, mtime_ns) dos JSON de origem."""
+    assinatura = {}
+    for nome in listar_fontes(diretorio):
+        st = os.stat(os.path.join(diretorio, nome))
+        assinatura[nome] = (st.st_size, st.st_mtime_ns)
+    return assinatura
+
+
+def gerar_manifesto(diretorio=CACHE_DIR, anterior=None):
+    """
+    Manifesto nome -> {"tamanho", "mtime_ns", "hash"}. Arquivos com mesmo
+    tamanho e mtime do manifesto `anterior` reaproveitam o hash sem reler.
+    """
+    anterior = anterior or {}
+    manifesto = {}
+    for nome, (tamanho, mtime) in _stat(diretorio).items():
+        antigo = anterior.get(nome)
+        if antigo and antigo["tamanho"] == tamanho and antigo["mtime_ns"] == mtime:
+            manifesto[nome] = antigo
+            contar("manifesto.hash_reaproveitado")
+        else:
+            manifesto[nome] = {
+                "tamanho": tamanho, "mtime_ns": mtime,
+                "hash": _hash(os.path.join(diretorio, nome)),
+            }
+    return manifesto
+
+
+def comparar_manifestos(anterior, atual):
+    """(alterados, removidos): nomes com conteúdo novo/diferente e nomes que sumiram."""
+    alterados = {n for n, m in atual.items() if n not in anterior or anterior[n]["hash"] != m["hash"]}
+    removidos = set(anterior) - set(atual)
+    return alterados, removidos
+
+
+class CacheIncremental:
+    """
+    DataFrame integrado + médias de uma rodada, mantidos em sincronia com
+    os arquivos do cache. `versao` aumenta a cada recarga com mudanças,
+    para as sessões saberem quando refazer as estatísticas.
+    """
+
+    def __init__(self, diretorio=CACHE_DIR):
+        self.diretorio = diretorio
+        self.versao = 0
+        self.manifesto = {}
+        self.df = None
+        self.market = None
+        self.modelo = None
+        self.medias = None
+        self.forma = FormaJogadores(diretorio).carregar()
+        self._lock = threading.Lock()
+
+    def carregar(self):
+        """Recarga completa (snapshot ou JSON)."""
+        with self._lock:
+            self._carregar()
+        return self
+
+    def _carregar(self):
+        with span("cache.carregar"):
+            with span("manifesto"):
+                self.manifesto = gerar_manifesto(self.diretorio, self.manifesto)
+            # do snapshot, df fica None: só o modelo é montado
+            self.modelo, self.market, self.df = carregar_modelo(self.diretorio)
+            self.medias = calcular_medias(self.modelo.jogadores, self.modelo.partidas, self.modelo.jogos,
+                                          self.modelo.confrontos)
+            self._aplicar_forma()
+            self.versao += 1
+
+    def _aplicar_forma(self):
+        with span("forma"):
+            if self.forma.atualizar(jogos_do_modelo(self.modelo)):
+                try:
+                    self.forma.salvar()
+                except OSError as e:
+                    print(f"[AVISO] Falha ao salvar o estado da forma: {e}")
+            self.medias = aplicar_forma(self.medias, self.modelo.jogadores, self.forma.features())
+
+    def estado(self):
+        """(versao, modelo, medias) consistentes entre si."""
+        with self._lock:
+            return self.versao, self.modelo, self.medias
+
+    def mudou(self):
+        """Checagem barata (só stat): algum arquivo foi criado, removido ou tocado?"""
+        atual = _stat(self.diretorio)
+        if atual.keys() != self.manifesto.keys():
+            return True
+        return any(
+            (m["tamanho"], m["mtime_ns"]) != atual[nome]
+            for nome, m in self.manifesto.items()
+        )
+
+    def recarregar(self):
+        """
+        Aplica as mudanças do cache. Retorna o conjunto de proPlayerId cujas
+        linhas foram refeitas (vazio se nada mudou de fato).
+        """
+        with self._lock, span("cache.recarregar"):
+            if not self.mudou():
+                contar("cache.sem_mudanca")
+                return set()
+            novo = gerar_manifesto(self.diretorio, self.manifesto)
+            alterados, removidos = comparar_manifestos(self.manifesto, novo)
+            self.manifesto = novo
+            if not alterados and not removidos:
+                contar("cache.sem_mudanca")
+                return set()
+
+            globais = {"market.json", *ARQUIVOS_TEMPORADA}
+            # carregado do snapshot: não há DataFrame com as listas para
+            # remendar; a recarga completa lê os JSON (e recompila o snapshot)
+            if removidos or alterados & globais or self.df is None:
+                self._carregar()
+                return set(self.modelo.jogadores["proPlayerId"])
+
+            return self._aplicar_players(alterados)
+
+    def _aplicar_players(self, alterados):
+        posicao = {pid: i for i, pid in enumerate(self.df["proPlayerId"])}
+        round_players = {j.get("proPlayerId"): j for j in self.market.get("roundPlayers", [])}
+        docs = {}
+        for nome in alterados:
+            with open(os.path.join(self.diretorio, nome), "r", encoding="utf-8") as f:
+                try:
+                    detalhes = json.load(f).get("data", {})
+                except Exception as e:
+                    print(f"[ERRO] Falha ao carregar {nome}: {e}")
+                    continue
+            pid = detalhes.get("player", {}).get("id")
+            if pid in round_players:
+                docs[pid] = detalhes
+
+        # jogador do mercado que antes não tinha arquivo: muda o conjunto de linhas
+        if any(pid not in posicao for pid in docs):
+            self._carregar()
+            return set(self.modelo.jogadores["proPlayerId"])
+        if not docs:
+            return set()
+
+        temporada = carregar_temporada_cache(self.diretorio).get("data", {})
+        stats_map = {p["proPlayerId"]: p for p in temporada.get("players", []) if p.get("proPlayerId")}
+        times = indexar_times(self.market.get("teams", []))
+
+        linhas = {
+            posicao[pid]: montar_linha(round_players[pid], stats_map.get(pid, {}), detalhes, times)
+            for pid, detalhes in docs.items()
+        }
+        df = self.df.copy()
+        for col in df.columns:
+            valores = df[col].to_numpy(copy=True)
+            for i, linha in linhas.items():
+                valores[i] = linha[col]
+            df[col] = valores
+
+        afetados = np.isin(np.arange(len(df)), [posicao[pid] for pid in docs])
+        modelo = ModeloRodada(df, self.market)
+        # confrontos: só as linhas dos jogadores recarregados
+        modelo.confrontos = self.modelo.confrontos.atualizar(modelo, afetados)
+        self.medias = atualizar_medias(self.medias, df, afetados, modelo.confrontos)
+        self.df = df
+        self.modelo = modelo
+        self._aplicar_forma()
+        self.versao += 1
+        contar("cache.jogadores_recarregados", len(docs))
+        print(f">> Cache: {len(docs)} jogador(es) recarregado(s)")
+        return set(docs)
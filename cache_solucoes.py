@@ -0,0 +1,132 @@
+# cache_solucoes.py
+
+"""
+Memoização das soluções do otimizador (montar_time_otimo, fronteira_eficiente).
+
+A chave junta a impressão digital do DataFrame de estatísticas (muda com
+os dados dos jogadores e com as odds), o critério, o orçamento, o filtro
+de região e as restrições. Dois níveis:
+  - memória: LRU com até `max_entradas` soluções, compartilhado por quem
+    usa a mesma instância (no app, todas as sessões via st.cache_resource)
+  - disco (opcional): um pickle por chave em `diretorio`, para sobreviver a
+    reinícios e ser visto por outros processos; gravação atômica
+    (arquivo temporário + os.replace) e poda dos mais antigos além de
+    `max_arquivos`
+
+Os valores devolvidos são compartilhados: não alterar.
+"""
+
+import os
+import pickle
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
+
+from utils import impressao_digital, montar_time_otimo, fronteira_eficiente
+from instrumentacao import span, contar
+
+SOLUCOES_DIR = "solucoes"
+# sobe quando o formato das soluções muda, invalidando o disco
+VERSAO = 1
+
+
+class CacheSolucoes:
+    def __init__(self, diretorio=None, max_entradas=64, max_arquivos=500):
+        self.diretorio = diretorio
+        self.max_entradas = max_entradas
+        self.max_arquivos = max_arquivos
+        self._memoria = OrderedDict()
+        self._lock = threading.Lock()
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+
+    def _arquivo(self, chave):
+        nome = hashlib.blake2b(repr(chave).encode(), digest_size=16).hexdigest()
+        return os.path.join(self.diretorio, f"{nome}.pkl")
+
+    def _ler_disco(self, chave):
+        caminho = self._arquivo(chave)
+        try:
+            with open(caminho, "rb") as f:
+                guardada, valor = pickle.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"[AVISO] Solução em cache ilegível ({caminho}): {e}")
+            return None
+        if guardada != chave:
+            return None
+        os.utime(caminho)  # mtime = último uso, para a poda
+        return valor
+
+    def _gravar_disco(self, chave, valor):
+        fd, temporario = tempfile.mkstemp(dir=self.diretorio, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                pickle.dump((chave, valor), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporario, self._arquivo(chave))
+        except Exception as e:
+            print(f"[AVISO] Falha ao gravar solução em cache: {e}")
+            if os.path.exists(temporario):
+                os.remove(temporario)
+            return
+        arquivos = [os.path.join(self.diretorio, n) for n in os.listdir(self.diretorio) if n.endswith(".pkl")]
+        if len(arquivos) > self.max_arquivos:
+            arquivos.sort(key=lambda c: os.stat(c).st_mtime_ns)
+            for caminho in arquivos[:len(arquivos) - self.max_arquivos]:
+                try:
+                    os.remove(caminho)
+                except OSError:
+                    pass
+
+    def obter(self, chave, calcular):
+        """Valor de `chave`: memória, depois disco, senão calcular() (e guarda nos dois)."""
+        chave = (VERSAO, *chave)
+        with self._lock:
+            if chave in self._memoria:
+                self._memoria.move_to_end(chave)
+                contar("solucoes.acertos_memoria")
+                return self._memoria[chave]
+        valor = self._ler_disco(chave) if self.diretorio else None
+        if valor is not None:
+            contar("solucoes.acertos_disco")
+        else:
+            contar("solucoes.faltas")
+            with span("solucoes.calcular", operacao=chave[1]):
+                valor = calcular()
+            if self.diretorio:
+                self._gravar_disco(chave, valor)
+        with self._lock:
+            self._memoria[chave] = valor
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_entradas:
+                self._memoria.popitem(last=False)
+        return valor
+
+    def limpar(self):
+        with self._lock:
+            self._memoria.clear()
+        if self.diretorio:
+            for nome in os.listdir(self.diretorio):
+                if nome.endswith(".pkl"):
+                    os.remove(os.path.join(self.diretorio, nome))
+
+    def montar_time_otimo(self, df, criterio, orcamento, k=5, regiao=None,
+                          max_por_time=None, fixos=None, excluidos=None) -> list:
+        """montar_time_otimo memoizado; `regiao` filtra df.region antes da busca."""
+        chave = (
+            "montar_time_otimo", impressao_digital(df), criterio, round(float(orcamento), 2), k,
+            regiao, max_por_time, tuple(sorted(fixos or [])), tuple(sorted(excluidos or [])),
+        )
+
+        def calcular():
+            base = df[df["region"] == regiao] if regiao is not None else df
+            return montar_time_otimo(base, criterio, orcamento, k=k, max_por_time=max_por_time,
+                                     fixos=fixos, excluidos=excluidos)
+
+        return self.obter(chave, calcular)
+
+    def fronteira_eficiente(self, df, criterio="expectedScore"):
+        chave = ("fronteira_eficiente", impressao_digital(df), criterio)
+        return self.obter(chave, lambda: fronteira_eficiente(df, criterio))
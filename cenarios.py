@@ -0,0 +1,205 @@
+# cenarios.py
+
+"""
+Varredura em lote de cenários de odds e orçamentos.
+
+Cada cenário é um conjunto de odds (time -> odd) aplicado sobre as odds
+base (settings.json). As médias que não dependem das odds (calcular_medias)
+são calculadas uma vez; a etapa das odds roda para todos os cenários
+juntos, como uma matriz (cenários x jogadores) em pontuacao_esperada.
+Depois o otimizador resolve cada (cenário, orçamento), opcionalmente
+num pool de processos.
+
+CSV de confrontos (uma ou mais linhas por cenário):
+    cenario,time1,odd1,time2,odd2
+    loud_favorito,LOUD,1.8,paiN Gaming,2.0
+
+Uso:
+    python cenarios.py --csv cenarios.csv --orcamentos 60 73.4
+    python cenarios.py --variar LOUD 1.5 2.5 0.1 --saida varredura.csv
+"""
+
+import sys
+import csv
+import argparse
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+from api_config import CACHE_DIR
+from snapshot import carregar_modelo
+from utils import POSICOES, calcular_medias, pontuacao_esperada, montar_time_otimo, _forma
+from configuracoes import SETTINGS_FILE, carregar_settings
+
+# odd de times sem odd na base nem no cenário (o padrão do app)
+ODD_PADRAO = 2.0
+COLUNAS_SOLVER = ["proPlayerId", "playerName", "teamName", "role", "price"]
+
+
+def carregar_cenarios_csv(caminho: str) -> dict:
+    """Lê um CSV de confrontos em {cenario: {time: odd}}."""
+    cenarios = {}
+    with open(caminho, "r", encoding="utf-8", newline="") as f:
+        for linha in csv.DictReader(f):
+            odds = cenarios.setdefault(linha["cenario"].strip(), {})
+            for t, o in [("time1", "odd1"), ("time2", "odd2")]:
+                if linha.get(t) and linha.get(o):
+                    odds[linha[t].strip()] = float(linha[o])
+    return cenarios
+
+
+def variar_odd(time: str, inicio: float, fim: float, passo: float) -> dict:
+    """Cenários com a odd de um time indo de `inicio` a `fim` (inclusive)."""
+    valores = np.round(np.arange(inicio, fim + passo / 2, passo), 2)
+    return {f"{time}@{v:g}": {time: float(v)} for v in valores}
+
+
+def _odd(valor):
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def matriz_expected(df: pd.DataFrame, medias: pd.DataFrame, odds_base: dict, cenarios: dict) -> np.ndarray:
+    """
+    expectedScore de cada jogador em cada cenário: matriz (cenários, jogadores),
+    idêntica a aplicar as odds de cada cenário com calcular_estatisticas
+    depois de completar com ODD_PADRAO os times sem odd (nem na base nem no
+    cenário); esses times são listados num aviso. Sem o padrão, os
+    jogadores deles e dos adversários ficariam com expectedScore NaN.
+    """
+    times = list(dict.fromkeys(df["teamName"]))
+    codigo = {t: i for i, t in enumerate(times)}
+    odds = np.full((len(cenarios), len(times) + 1), np.nan)
+    odds[:, -1] = 0.0  # última coluna: sem adversário na base (ver pontuacao_esperada)
+    for s, alteracoes in enumerate(cenarios.values()):
+        completas = {**odds_base, **alteracoes}
+        for t, i in codigo.items():
+            odds[s, i] = _odd(completas.get(t))
+    # time sem odd (nem na base nem no cenário): a odd padrão do app
+    sem_odd = np.isnan(odds[:, :-1])
+    if sem_odd.any():
+        nomes = [t for t, falta in zip(times, sem_odd.any(axis=0)) if falta]
+        print(f"[AVISO] Sem odd para {', '.join(nomes)}: usando {ODD_PADRAO:g} "
+              f"em {int(sem_odd.any(axis=1).sum())} de {len(cenarios)} cenário(s).")
+        odds[:, :-1] = np.where(sem_odd, ODD_PADRAO, odds[:, :-1])
+
+    time_j = df["teamName"].map(codigo).to_numpy()
+    adv_j = medias["oponente"].map(codigo).fillna(len(times)).to_numpy(dtype=int)
+    colunas = pontuacao_esperada(
+        odds[:, time_j], odds[:, adv_j],
+        medias["media_vitoria"].to_numpy(),
+        medias["media_derrota"].to_numpy(),
+        medias["media_confronto"].to_numpy(),
+        medias["n_confrontos"].to_numpy(),
+        medias["n_confrontos"].mean(),
+        pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=float),
+        **_forma(medias),
+    )
+    return colunas["expectedScore"]
+
+
+# estado do processo (pool): a base dos jogadores é enviada uma única vez
+_BASE = None
+
+
+def _iniciar(base):
+    global _BASE
+    _BASE = base
+
+
+def _resolver(tarefa):
+    nome, expected, orcamentos, k, max_por_time = tarefa
+    df = _BASE.assign(expectedScore=expected)
+    linhas = []
+    for orcamento in orcamentos:
+        for rank, (time_, custo, pts, eff) in enumerate(
+                montar_time_otimo(df, "expectedScore", orcamento, k=k, max_por_time=max_por_time), 1):
+            linha = {"cenario": nome, "orcamento": orcamento, "rank": rank,
+                     "custo": round(custo, 2), "pts": round(pts, 2), "eff": round(eff, 3)}
+            linha.update({j["role"]: j["playerName"] for j in time_})
+            linha["ids"] = ";".join(j["proPlayerId"] for j in time_)
+            linhas.append(linha)
+    return linhas
+
+
+def avaliar_cenarios(df: pd.DataFrame,
+                     cenarios: dict,
+                     orcamentos: list,
+                     odds_base: dict | None = None,
+                     medias: pd.DataFrame | None = None,
+                     k: int = 1,
+                     max_por_time: int | None = None,
+                     processos: int = 1) -> pd.DataFrame:
+    """
+    Avalia todos os cenários x orçamentos. `df` é o DataFrame integrado
+    (integrate_data) ou modelo.jogadores com as `medias` do modelo; `odds_base` completa as odds que o cenário não muda.
+    Retorna uma linha por (cenario, orcamento, rank) com custo, pts, eff
+    e o jogador escolhido em cada posição.
+    """
+    if medias is None:
+        medias = calcular_medias(df)
+    if odds_base is None:
+        odds_base = df.groupby("teamName")["teamOdd"].first().dropna().to_dict()
+    conhecidos = set(df["teamName"])
+    for nome, alteracoes in cenarios.items():
+        desconhecidos = sorted(set(alteracoes) - conhecidos)
+        if desconhecidos:
+            print(f"[AVISO] Cenário '{nome}': time(s) fora da rodada ignorado(s): {', '.join(desconhecidos)}")
+    expected = matriz_expected(df, medias, odds_base, cenarios)
+
+    base = df[COLUNAS_SOLVER].copy()
+    tarefas = [
+        (nome, expected[s], list(orcamentos), k, max_por_time)
+        for s, nome in enumerate(cenarios)
+    ]
+    if processos > 1 and len(tarefas) > 1:
+        with ProcessPoolExecutor(processos, initializer=_iniciar, initargs=(base,)) as pool:
+            partes = list(pool.map(_resolver, tarefas, chunksize=max(1, len(tarefas) // (4 * processos))))
+    else:
+        _iniciar(base)
+        partes = [_resolver(t) for t in tarefas]
+
+    colunas = ["cenario", "orcamento", "rank", "custo", "pts", "eff", *POSICOES, "ids"]
+    return pd.DataFrame([linha for parte in partes for linha in parte], columns=colunas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Varredura de cenários de odds e orçamentos")
+    parser.add_argument("--csv", help="CSV de confrontos (cenario,time1,odd1,time2,odd2)")
+    parser.add_argument("--variar", nargs=4, action="append", default=[],
+                        metavar=("TIME", "INICIO", "FIM", "PASSO"),
+                        help="varia a odd de um time (pode repetir)")
+    parser.add_argument("--orcamentos", nargs="+", type=float,
+                        help="orçamentos (padrão: o do settings.json)")
+    parser.add_argument("--k", type=int, default=1, help="melhores escalações por cenário")
+    parser.add_argument("--max-por-time", type=int, default=None)
+    parser.add_argument("--processos", type=int, default=1)
+    parser.add_argument("--diretorio", default=CACHE_DIR)
+    parser.add_argument("--saida", help="grava o resultado em CSV")
+    args = parser.parse_args(argv)
+
+    settings = carregar_settings(SETTINGS_FILE)
+    cenarios = {"base": {}}
+    if args.csv:
+        cenarios.update(carregar_cenarios_csv(args.csv))
+    for time, inicio, fim, passo in args.variar:
+        cenarios.update(variar_odd(time, float(inicio), float(fim), float(passo)))
+    orcamentos = args.orcamentos or [settings.get("orcamento", 25.0)]
+
+    modelo, _, _ = carregar_modelo(args.diretorio)
+    medias = calcular_medias(modelo.jogadores, modelo.partidas, modelo.jogos)
+    resultado = avaliar_cenarios(
+        modelo.jogadores, cenarios, orcamentos, odds_base=settings.get("odds", {}), medias=medias,
+        k=args.k, max_por_time=args.max_por_time, processos=args.processos,
+    )
+    if args.saida:
+        resultado.to_csv(args.saida, index=False)
+        print(f">> {len(resultado)} linhas gravadas em {args.saida}")
+    else:
+        print(resultado.to_string(index=False))
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,203 @@
+# cli.py
+
+"""
+Modo batch, sem interface: carrega o cache, calcula as estatísticas com as
+odds do settings.json e imprime os melhores times em JSON ou CSV.
+
+Só a biblioteca padrão é importada no topo; pandas/numpy e os módulos do
+projeto entram dentro de cada comando (nada de streamlit, plotly ou
+sklearn), para a partida ser rápida em cron. --tempos mostra no stderr o
+tempo de import e das etapas.
+
+Uso:
+    python cli.py solve --orcamento 73.4 --settings settings.json
+    python cli.py solve --criterio expectedScore --k 10 --formato csv
+    python cli.py portfolio --n 100 --exposicao-jogador 0.4 --formato csv > portfolio.csv
+    python cli.py estatisticas --formato csv > estatisticas.csv
+    python cli.py solve --regras regras.json   # pontuação alternativa
+    python cli.py solve --peso-forma 0.3       # expectedScore puxado pela forma recente
+"""
+
+import sys
+import json
+import time
+import argparse
+import contextlib
+
+INICIO = time.perf_counter()
+
+# instrumentacao só usa a biblioteca padrão
+from instrumentacao import execucao, span  # noqa: E402
+
+COLUNAS_TIME = ["proPlayerId", "playerName", "teamName", "role", "price"]
+COLUNAS_ESTATISTICAS = [
+    "proPlayerId", "playerName", "teamName", "region", "role", "price", "teamOdd",
+    "oponente", "win_prob", "media_vitoria", "media_derrota", "media_confronto",
+    "expectedScore", "custo_beneficio",
+]
+
+
+def _estatisticas(args, settings):
+    """DataFrame de calcular_estatisticas com as odds do settings."""
+    with span("imports"):
+        from snapshot import carregar_modelo
+        from utils import calcular_medias, calcular_estatisticas
+
+    # os prints de progresso dos carregadores vão para o stderr, não para a saída
+    with contextlib.redirect_stdout(sys.stderr):
+        modelo, _, _ = carregar_modelo(args.diretorio)
+        if len(modelo) == 0:
+            raise SystemExit(f"Nenhum dado em {args.diretorio}")
+        df, partidas, jogos = modelo.jogadores, modelo.partidas, modelo.jogos
+        if args.regras:
+            # "e se a pontuação mudar?": repontua os jogos e parte das novas tabelas
+            with span("imports"):
+                from pontuacao import carregar_regras, repontuar
+            df, partidas, jogos = repontuar(modelo, carregar_regras(args.regras))
+        medias = calcular_medias(df, partidas, jogos)
+        if args.peso_forma:
+            with span("imports"):
+                from forma import FormaJogadores, aplicar_forma
+            forma = FormaJogadores(None)
+            forma.atualizar(jogos.assign(proPlayerId=df["proPlayerId"].to_numpy()[jogos["linha"].to_numpy()]))
+            medias = aplicar_forma(medias, df, forma.features(), args.peso_forma)
+        df["teamOdd"] = df["teamName"].map(settings.get("odds") or {})
+        return calcular_estatisticas(df, medias)
+
+
+def _valor(v):
+    """Escalar do numpy -> Python; NaN -> None (JSON válido)."""
+    v = v.item() if hasattr(v, "item") else v
+    return None if isinstance(v, float) and v != v else v
+
+
+def _times(resultado, criterio, colunas):
+    """Saída de montar_time_otimo -> lista de dicts serializáveis."""
+    return [
+        {
+            "criterio": criterio,
+            "posicao": i + 1,
+            "custo": round(float(custo), 2),
+            "pts": round(float(pts), 2),
+            "eff": round(float(eff), 2),
+            "jogadores": [
+                {c: _valor(j.get(c)) for c in colunas}
+                for j in time_
+            ],
+        }
+        for i, (time_, custo, pts, eff) in enumerate(resultado)
+    ]
+
+
+def solve(args, settings):
+    orcamento = args.orcamento if args.orcamento is not None else settings.get("orcamento", 25.0)
+    stats = _estatisticas(args, settings)
+    with span("imports"):
+        from utils import montar_times, montar_time_otimo
+
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.criterio:
+            colunas = COLUNAS_TIME + [args.criterio]
+            resultados = {args.criterio: montar_time_otimo(
+                stats, args.criterio, orcamento, k=args.k, max_por_time=args.max_por_time
+            )}
+        else:
+            colunas = COLUNAS_TIME + ["expectedScore", "maxRoundScore"]
+            resultados = montar_times(stats, orcamento)
+
+    times = [t for criterio, res in resultados.items() for t in _times(res, criterio, colunas)]
+    if args.formato == "json":
+        json.dump({"orcamento": orcamento, "times": times}, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+        return
+    # CSV: uma linha por jogador escalado
+    import csv
+    escritor = csv.writer(sys.stdout)
+    escritor.writerow(["criterio", "posicao", "custo", "pts", "eff"] + colunas)
+    for t in times:
+        for j in t["jogadores"]:
+            escritor.writerow([t["criterio"], t["posicao"], t["custo"], t["pts"], t["eff"]]
+                              + [j[c] for c in colunas])
+
+
+def portfolio(args, settings):
+    orcamento = args.orcamento if args.orcamento is not None else settings.get("orcamento", 25.0)
+    stats = _estatisticas(args, settings)
+    with span("imports"):
+        from portfolio import montar_portfolio, portfolio_tabela
+
+    with contextlib.redirect_stdout(sys.stderr):
+        resultado = montar_portfolio(
+            stats, args.criterio, orcamento, n=args.n, min_diferentes=args.min_diferentes,
+            exposicao_jogador=args.exposicao_jogador, exposicao_time=args.exposicao_time,
+            max_por_time=args.max_por_time,
+        )
+    if args.formato == "json":
+        colunas = COLUNAS_TIME + [args.criterio]
+        json.dump({"orcamento": orcamento, "times": _times(resultado, args.criterio, colunas)},
+                  sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+    else:
+        portfolio_tabela(resultado, args.criterio).to_csv(sys.stdout, index=False)
+
+
+def estatisticas(args, settings):
+    stats = _estatisticas(args, settings)
+    tabela = stats[[c for c in COLUNAS_ESTATISTICAS if c in stats.columns]]
+    if args.formato == "json":
+        sys.stdout.write(tabela.to_json(orient="records", force_ascii=False, indent=2) + "\n")
+    else:
+        tabela.to_csv(sys.stdout, index=False)
+
+
+def main(argv=None):
+    # opções comuns, aceitas depois do comando
+    comum = argparse.ArgumentParser(add_help=False)
+    comum.add_argument("--settings", default="settings.json", help="odds e orçamento (formato do app)")
+    comum.add_argument("--diretorio", default="cache", help="diretório com os JSON da rodada")
+    comum.add_argument("--formato", choices=["json", "csv"], default="json")
+    comum.add_argument("--tempos", action="store_true", help="tempo de import e das etapas no stderr")
+    comum.add_argument("--regras", help="JSON com regras de pontuação (ver pontuacao.py) para repontuar os jogos")
+    comum.add_argument("--peso-forma", type=float, default=0.0,
+                       help="peso da forma recente (EWMA de points, ver forma.py) no expectedScore")
+
+    parser = argparse.ArgumentParser(prog="python cli.py", description="Cartola LoL em modo batch")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    p_solve = comandos.add_parser("solve", parents=[comum], help="melhores times para o orçamento")
+    p_solve.add_argument("--orcamento", "--budget", type=float, help="padrão: o do settings")
+    p_solve.add_argument("--criterio", help="só este critério (padrão: os de montar_times)")
+    p_solve.add_argument("--k", type=int, default=5, help="times por critério (com --criterio)")
+    p_solve.add_argument("--max-por-time", type=int)
+    p_solve.set_defaults(funcao=solve)
+
+    p_port = comandos.add_parser("portfolio", parents=[comum], help="N escalações diferentes (ver portfolio.py)")
+    p_port.add_argument("--orcamento", "--budget", type=float, help="padrão: o do settings")
+    p_port.add_argument("--criterio", default="expectedScore")
+    p_port.add_argument("--n", type=int, default=50, help="escalações no portfólio")
+    p_port.add_argument("--min-diferentes", type=int, default=2, help="jogadores diferentes entre quaisquer duas")
+    p_port.add_argument("--exposicao-jogador", type=float, default=0.5, help="fração máxima de escalações por jogador")
+    p_port.add_argument("--exposicao-time", type=float, default=1.0, help="fração máxima de escalações por time")
+    p_port.add_argument("--max-por-time", type=int)
+    p_port.set_defaults(funcao=portfolio)
+
+    p_stats = comandos.add_parser("estatisticas", parents=[comum], help="tabela de estatísticas por jogador")
+    p_stats.set_defaults(funcao=estatisticas)
+
+    args = parser.parse_args(argv)
+
+    with execucao(f"cli.{args.comando}") as registro:
+        with span("imports"):
+            from configuracoes import carregar_settings
+        args.funcao(args, carregar_settings(args.settings))
+
+    if args.tempos:
+        print(f"[TEMPO] total {(time.perf_counter() - INICIO) * 1e3:.1f} ms "
+              f"(até o comando: {(registro.inicio - INICIO) * 1e3:.1f} ms)", file=sys.stderr)
+        for s in registro.spans:
+            print(f"[TEMPO] {'  ' * s['profundidade']}{s['nome']:<28} {s['duracao_ms']:10.1f} ms", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,234 @@
+# configuracoes.py
+
+"""
+Configurações do app (orçamento e odds) e o histórico de ajustes.
+
+settings.json guarda só o estado atual. Cada "Aplicar Ajustes" vira uma
+linha JSON acrescentada a settings_historico.jsonl (write + fsync de uma
+linha só), então salvar custa O(1) em vez de reescrever todo o histórico.
+Escritas de sessões diferentes passam por um lock de arquivo
+(settings.json.lock), e nenhuma atualização se perde.
+
+Quando o log passa de COMPACTAR_BYTES ele é compactado: estados repetidos
+em sequência somem, e entradas com mais de RETENCAO_DIAS dias ficam só
+com a última de cada dia. O tamanho depois da compactação fica anotado
+no settings.json, e a próxima só acontece quando o log crescer
+FATOR_COMPACTAR vezes desde então (um log sem nada para descartar não é
+reescrito a cada gravação). O `historico` embutido no settings.json antigo
+é migrado para o log na primeira gravação.
+
+ler_historico / estado_em / diff_odds reproduzem o estado em qualquer
+instante e comparam snapshots de odds por timestamp.
+"""
+
+import os
+import json
+import bisect
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+SETTINGS_FILE = "settings.json"
+HISTORICO_FILE = "settings_historico.jsonl"
+COMPACTAR_BYTES = 1 << 20
+FATOR_COMPACTAR = 2
+# chave interna do settings.json: tamanho do log após a última compactação
+CHAVE_COMPACTADO = "historico_bytes_compactado"
+RETENCAO_DIAS = 30
+
+
+def _caminho_historico(settings_file):
+    return os.path.join(os.path.dirname(settings_file), HISTORICO_FILE)
+
+
+@contextmanager
+def _travado(settings_file):
+    """Lock exclusivo (entre processos) para escrever settings e histórico."""
+    with open(settings_file + ".lock", "a+b") as f:
+        if fcntl:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _gravar_atomico(caminho, texto):
+    fd, temporario = tempfile.mkstemp(dir=os.path.dirname(caminho) or ".", prefix=".tmp-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(texto)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _linha(entrada):
+    return json.dumps(entrada, ensure_ascii=False, separators=(",", ":")) + "\n"
+
+
+def carregar_settings(settings_file=SETTINGS_FILE):
+    """Estado atual {"orcamento", "odds"}; não lê o histórico."""
+    try:
+        with open(settings_file, "r", encoding="utf-8") as f:
+            settings = json.load(f)
+    except FileNotFoundError:
+        return {}
+    settings.pop("historico", None)
+    settings.pop(CHAVE_COMPACTADO, None)
+    return settings
+
+
+def _compactado(settings_file):
+    try:
+        with open(settings_file, "r", encoding="utf-8") as f:
+            return int(json.load(f).get(CHAVE_COMPACTADO) or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def _gravar_settings(settings_file, orcamento, odds, compactado):
+    estado = {"orcamento": orcamento, "odds": odds}
+    if compactado:
+        estado[CHAVE_COMPACTADO] = compactado
+    _gravar_atomico(settings_file, json.dumps(estado, indent=2))
+
+
+def _migrar_historico(settings_file):
+    """Move o `historico` embutido no settings.json (formato antigo) para o log."""
+    try:
+        with open(settings_file, "r", encoding="utf-8") as f:
+            antigo = json.load(f).get("historico") or []
+    except FileNotFoundError:
+        return
+    if not antigo:
+        return
+    # o log fica em ordem de timestamp: as entradas antigas vêm antes; as
+    # já migradas (queda antes de regravar o settings.json) não se repetem
+    existentes = ler_historico(settings_file)
+    vistos = {e.get("timestamp") for e in existentes}
+    antigo = [e for e in antigo if e.get("timestamp") not in vistos]
+    _gravar_atomico(_caminho_historico(settings_file), "".join(_linha(e) for e in antigo + existentes))
+
+
+def salvar_settings(orcamento, odds, settings_file=SETTINGS_FILE):
+    """Grava o estado atual e acrescenta uma linha ao histórico."""
+    entrada = {
+        "timestamp": datetime.now().isoformat(timespec="milliseconds"),
+        "orcamento": orcamento,
+        "odds": odds,
+    }
+    caminho = _caminho_historico(settings_file)
+    with _travado(settings_file):
+        _migrar_historico(settings_file)
+        with open(caminho, "a", encoding="utf-8") as f:
+            f.write(_linha(entrada))
+            f.flush()
+            os.fsync(f.fileno())
+            tamanho = f.tell()
+        compactado = _compactado(settings_file)
+        if tamanho > max(COMPACTAR_BYTES, FATOR_COMPACTAR * compactado):
+            compactar(settings_file, travar=False, anotar=False)
+            compactado = os.path.getsize(caminho)
+        _gravar_settings(settings_file, orcamento, odds, compactado)
+    return entrada
+
+
+def ler_historico(settings_file=SETTINGS_FILE, desde=None, ate=None):
+    """
+    Entradas do histórico em ordem, com timestamp em [desde, ate] (strings
+    ISO ou datetime). Uma última linha truncada (queda no meio da escrita)
+    é ignorada.
+    """
+    desde = desde.isoformat() if isinstance(desde, datetime) else desde
+    ate = ate.isoformat() if isinstance(ate, datetime) else ate
+    entradas = []
+    try:
+        with open(_caminho_historico(settings_file), "r", encoding="utf-8") as f:
+            for linha in f:
+                try:
+                    entrada = json.loads(linha)
+                except ValueError:
+                    continue
+                ts = entrada.get("timestamp", "")
+                if (desde is None or ts >= desde) and (ate is None or ts <= ate):
+                    entradas.append(entrada)
+    except FileNotFoundError:
+        pass
+    return entradas
+
+
+def estado_em(timestamp, settings_file=SETTINGS_FILE, historico=None):
+    """Último estado gravado até `timestamp` (replay do log), ou None."""
+    timestamp = timestamp.isoformat() if isinstance(timestamp, datetime) else timestamp
+    historico = ler_historico(settings_file) if historico is None else historico
+    i = bisect.bisect_right([e["timestamp"] for e in historico], timestamp)
+    return historico[i - 1] if i else None
+
+
+def diff_odds(antes, depois, settings_file=SETTINGS_FILE, historico=None):
+    """
+    Odds que mudaram entre dois instantes: {time: (odd_antes, odd_depois)}.
+    `antes`/`depois` são timestamps ou entradas do histórico (dicts).
+    """
+    historico = ler_historico(settings_file) if historico is None else historico
+    estados = [
+        x if isinstance(x, dict) else (estado_em(x, historico=historico) or {})
+        for x in (antes, depois)
+    ]
+    odds_a, odds_d = (e.get("odds") or {} for e in estados)
+    return {
+        time: (odds_a.get(time), odds_d.get(time))
+        for time in sorted(set(odds_a) | set(odds_d))
+        if odds_a.get(time) != odds_d.get(time)
+    }
+
+
+def compactar(settings_file=SETTINGS_FILE, retencao_dias=RETENCAO_DIAS, travar=True, anotar=True):
+    """
+    Reescreve o log sem estados repetidos em sequência e, antes da
+    retenção, só com a última entrada de cada dia. Retorna (antes, depois).
+    `anotar` grava o novo tamanho do log no settings.json.
+    """
+    def _compactar():
+        historico = ler_historico(settings_file)
+        limite = (datetime.now() - timedelta(days=retencao_dias)).isoformat(timespec="seconds")
+        mantidas = []
+        for i, entrada in enumerate(historico):
+            estado = (entrada.get("orcamento"), entrada.get("odds"))
+            if mantidas and (mantidas[-1].get("orcamento"), mantidas[-1].get("odds")) == estado:
+                # mesmo estado: fica a primeira vez em que ele apareceu
+                continue
+            proxima = historico[i + 1] if i + 1 < len(historico) else None
+            if (entrada["timestamp"] < limite and proxima is not None
+                    and proxima["timestamp"][:10] == entrada["timestamp"][:10]):
+                continue
+            mantidas.append(entrada)
+        caminho = _caminho_historico(settings_file)
+        _gravar_atomico(caminho, "".join(_linha(e) for e in mantidas))
+        if anotar and os.path.exists(settings_file):
+            atual = carregar_settings(settings_file)
+            _gravar_settings(settings_file, atual.get("orcamento"), atual.get("odds"), os.path.getsize(caminho))
+        return len(historico), len(mantidas)
+
+    if not travar:
+        return _compactar()
+    with _travado(settings_file):
+        return _compactar()
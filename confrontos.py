@@ -0,0 +1,173 @@
+# confrontos.py
+
+"""
+Índice de confrontos diretos time x time, montado uma vez por carga.
+
+Cada time (do mercado, adversário de alguma partida ou próximo oponente)
+ganha um id denso pela ordem de modelo.times. As partidas com resultado
+(utils.partidas_com_resultado) viram arrays NumPy densos:
+  - por (jogador, time adversário): soma dos scores, partidas e vitórias
+  - por (time, time adversário): as mesmas somas sobre os jogadores do
+    time (uma entrada por jogador-partida)
+
+Consultas (média de um jogador contra o próximo oponente, retrospecto
+entre dois times, confrontos da rodada) viram leituras nos arrays.
+atualizar() refaz só as linhas dos jogadores que mudaram: tira a
+contribuição antiga deles das somas por time e soma a nova, devolvendo
+um índice novo (o antigo continua válido para quem ainda o usa).
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import partidas_com_resultado
+from instrumentacao import span, contar
+
+
+class IndiceConfrontos:
+    def __init__(self, modelo):
+        with span("confrontos.montar", jogadores=len(modelo)):
+            self.ids = {}
+            for nome in modelo.times["teamName"]:
+                self._id(nome)
+            n = len(modelo)
+            self.soma_jogador = np.zeros((n, 0))
+            self.partidas_jogador = np.zeros((n, 0), dtype=np.int32)
+            self.vitorias_jogador = np.zeros((n, 0), dtype=np.int32)
+            self.soma_time = np.zeros((0, 0))
+            self.partidas_time = np.zeros((0, 0), dtype=np.int32)
+            self.vitorias_time = np.zeros((0, 0), dtype=np.int32)
+            self._rodada(modelo)
+            self._acumular(modelo, np.arange(n), +1)
+
+    # ------------------------------------------------------------ montagem
+    def _id(self, nome) -> int:
+        if nome is None or nome != nome:
+            return -1
+        return self.ids.setdefault(nome, len(self.ids))
+
+    def _ids(self, nomes) -> np.ndarray:
+        return np.array([self._id(nome) for nome in nomes], dtype=np.int64)
+
+    def _crescer(self):
+        """Aumenta os arrays quando aparecem times novos."""
+        t, antigo = len(self.ids), self.soma_time.shape[0]
+        if t == antigo:
+            return
+        for nome in ("soma_jogador", "partidas_jogador", "vitorias_jogador"):
+            atual = getattr(self, nome)
+            setattr(self, nome, np.pad(atual, ((0, 0), (0, t - antigo))))
+        for nome in ("soma_time", "partidas_time", "vitorias_time"):
+            atual = getattr(self, nome)
+            setattr(self, nome, np.pad(atual, ((0, t - antigo), (0, t - antigo))))
+
+    def _rodada(self, modelo):
+        """Time e próximo oponente de cada jogador e os confrontos da rodada."""
+        jogadores = modelo.jogadores
+        self.time_jogador = self._ids(jogadores["teamName"])
+        self.oponente_jogador = self._ids(jogadores["proximoOponente"])
+        self._crescer()
+        # primeiro oponente listado por time (como o groupby do app)
+        primeiro = (
+            pd.DataFrame({"time": jogadores["teamName"].to_numpy(dtype=object),
+                          "oponente": jogadores["proximoOponente"].to_numpy(dtype=object)})
+            .groupby("time", sort=False)["oponente"].first()
+        )
+        # sem próxima partida (fim do split, folga): NaN no oponente, sem par
+        self.pares = sorted({tuple(sorted((t, o))) for t, o in primeiro.items() if pd.notna(o) and o})
+
+    def _acumular(self, modelo, jids, sinal):
+        """Soma (sinal=+1) ou tira (-1) as partidas dos jogadores `jids` nas somas por time."""
+        if sinal > 0:
+            partidas = partidas_com_resultado(None, modelo.partidas, modelo.jogos)
+            partidas = partidas[np.isin(partidas["linha"].to_numpy(), jids)]
+            adv = self._ids(partidas["adversario"].to_numpy(dtype=object))
+            self._crescer()
+            t = len(self.ids)
+            linha = partidas["linha"].to_numpy()
+            score = partidas["score"].to_numpy(dtype=float)
+            win = partidas["win"].to_numpy(dtype=bool)
+            ok = adv >= 0
+            chave = linha[ok] * t + adv[ok]
+            tamanho = len(self.time_jogador) * t
+            self.soma_jogador[jids] = 0
+            self.partidas_jogador[jids] = 0
+            self.vitorias_jogador[jids] = 0
+            self.soma_jogador += np.bincount(chave, weights=score[ok], minlength=tamanho).reshape(-1, t)
+            self.partidas_jogador += np.bincount(chave, minlength=tamanho).reshape(-1, t).astype(np.int32)
+            self.vitorias_jogador += np.bincount(chave[win[ok]], minlength=tamanho).reshape(-1, t).astype(np.int32)
+        # por time: linhas dos jogadores somadas na linha do time deles
+        jids = jids[self.time_jogador[jids] >= 0]
+        times = self.time_jogador[jids]
+        np.add.at(self.soma_time, times, sinal * self.soma_jogador[jids])
+        np.add.at(self.partidas_time, times, sinal * self.partidas_jogador[jids])
+        np.add.at(self.vitorias_time, times, sinal * self.vitorias_jogador[jids])
+
+    def atualizar(self, modelo, linhas) -> "IndiceConfrontos":
+        """
+        Índice novo com as partidas dos jogadores `linhas` (máscara booleana
+        sobre modelo.jogadores) relidas de `modelo`. O conjunto de jogadores
+        precisa ser o mesmo; senão, monte um índice do zero.
+        """
+        linhas = np.asarray(linhas, dtype=bool)
+        if len(linhas) != len(self.time_jogador):
+            return IndiceConfrontos(modelo)
+        jids = np.flatnonzero(linhas)
+        novo = object.__new__(IndiceConfrontos)
+        novo.__dict__.update({k: (v.copy() if isinstance(v, (np.ndarray, dict)) else v)
+                              for k, v in self.__dict__.items()})
+        with span("confrontos.atualizar", jogadores=len(jids)):
+            novo._acumular(modelo, jids, -1)
+            novo._rodada(modelo)
+            novo._acumular(modelo, jids, +1)
+        contar("confrontos.jogadores_atualizados", len(jids))
+        return novo
+
+    # ------------------------------------------------------------ consultas
+    @property
+    def nomes(self) -> list:
+        return list(self.ids)
+
+    def id_time(self, nomes) -> np.ndarray:
+        """Ids dos times pelo nome; -1 para desconhecidos."""
+        return np.array([self.ids.get(nome, -1) for nome in nomes], dtype=np.int64)
+
+    def media_jogadores(self, jids=None, oponentes=None) -> tuple:
+        """
+        (media, partidas, vitorias) dos jogadores `jids` contra `oponentes`
+        (ids de time; padrão: o próximo oponente de cada um). Sem confronto: 0.
+        """
+        jids = np.arange(len(self.time_jogador)) if jids is None else np.asarray(jids)
+        oponentes = self.oponente_jogador[jids] if oponentes is None else np.asarray(oponentes)
+        ok = oponentes >= 0
+        o = np.where(ok, oponentes, 0)
+        soma = np.where(ok, self.soma_jogador[jids, o], 0.0)
+        partidas = np.where(ok, self.partidas_jogador[jids, o], 0)
+        vitorias = np.where(ok, self.vitorias_jogador[jids, o], 0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            media = np.where(partidas > 0, soma / partidas, 0.0)
+        return media, partidas, vitorias
+
+    def confronto(self, time, oponente) -> dict:
+        """Retrospecto do `time` contra o `oponente` (por jogador-partida)."""
+        t, o = self.ids.get(time, -1), self.ids.get(oponente, -1)
+        if t < 0 or o < 0:
+            return {"media": 0.0, "partidas": 0, "vitorias": 0}
+        partidas = int(self.partidas_time[t, o])
+        return {
+            "media": float(self.soma_time[t, o] / partidas) if partidas else 0.0,
+            "partidas": partidas,
+            "vitorias": int(self.vitorias_time[t, o]),
+        }
+
+    def matriz(self, campo="media") -> pd.DataFrame:
+        """Time x time adversário: `media`, `partidas` ou `vitorias`."""
+        if campo == "media":
+            with np.errstate(divide="ignore", invalid="ignore"):
+                valores = np.where(self.partidas_time > 0, self.soma_time / self.partidas_time, np.nan)
+        else:
+            valores = getattr(self, f"{campo}_time")
+        return pd.DataFrame(valores, index=self.nomes, columns=self.nomes)
+
+    def memoria(self) -> int:
+        return sum(v.nbytes for v in self.__dict__.values() if isinstance(v, np.ndarray))
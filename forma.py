@@ -0,0 +1,177 @@
+# forma.py
+
+"""
+Forma recente dos jogadores: médias exponenciais (EWMA) e dos últimos
+JANELA jogos de points, kills e cs, na ordem de gameTimestamp (e
+indexInMatch, que desempata jogos da mesma série).
+
+Tudo é calculado para todos os jogadores de uma vez. A EWMA é guardada
+como numerador e denominador por jogador: um jogo novo multiplica os dois
+por (1 - alfa) e soma o jogo, então jogos de uma rodada nova atualizam o
+estado sem revisitar o histórico (o resultado é igual ao
+pandas ewm(alpha, adjust=True) sobre a série inteira). Para a janela,
+o estado guarda a cauda dos últimos JANELA jogos de cada jogador.
+
+Um jogo é novo se vem depois do último já visto do jogador; jogos antigos
+que chegam atrasados são ignorados (recalcule do zero com
+FormaJogadores().atualizar(...) se precisar deles).
+
+aplicar_forma() leva as colunas para as médias de calcular_medias;
+com peso_forma > 0 a EWMA de points entra no expectedScore (ver
+utils.pontuacao_esperada). O estado fica salvo em cache/forma/.
+"""
+
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+from api_config import CACHE_DIR
+from utils import COLUNA_FORMA, COLUNA_PESO_FORMA
+from instrumentacao import span, contar
+
+FORMA_DIR = "forma"
+MEIA_VIDA = 5  # jogos
+JANELA = 5
+PESO_FORMA = 0.0
+METRICAS = ["points", "kills", "cs"]
+CHAVE = ["proPlayerId", "gameTimestamp", "indiceNaPartida"]
+
+
+def _ordenar(jogos: pd.DataFrame) -> pd.DataFrame:
+    jogos = jogos[CHAVE + METRICAS].copy()
+    if jogos["indiceNaPartida"].isna().any():
+        jogos["indiceNaPartida"] = jogos["indiceNaPartida"].fillna(0)
+    for col in METRICAS:
+        jogos[col] = pd.to_numeric(jogos[col], errors="coerce").fillna(0).astype(float)
+    return jogos.sort_values(CHAVE, kind="stable", ignore_index=True)
+
+
+class FormaJogadores:
+    def __init__(self, raiz=CACHE_DIR, meia_vida=MEIA_VIDA, janela=JANELA):
+        self.destino = os.path.join(raiz, FORMA_DIR) if raiz else None
+        self.meia_vida = meia_vida
+        self.janela = janela
+        self.decaimento = 0.5 ** (1 / meia_vida)
+        # por jogador: jogos vistos, último (timestamp, índice), numeradores e denominador da EWMA
+        self.estado = pd.DataFrame(
+            {"n": pd.Series(dtype=np.int64), "ultimo_ts": pd.Series(dtype=object),
+             "ultimo_indice": pd.Series(dtype=float), "den": pd.Series(dtype=float),
+             **{f"num_{m}": pd.Series(dtype=float) for m in METRICAS}},
+            index=pd.Index([], name="proPlayerId", dtype=object),
+        )
+        self.cauda = pd.DataFrame({c: pd.Series(dtype=object if c in CHAVE[:2] else float)
+                                   for c in CHAVE + METRICAS})
+
+    # ---------------------------------------------------------------- disco
+    def _arquivo(self):
+        return os.path.join(self.destino, "forma.pkl")
+
+    def carregar(self):
+        """Estado salvo, se existir e tiver os mesmos parâmetros."""
+        if self.destino and os.path.exists(self._arquivo()):
+            with open(self._arquivo(), "rb") as f:
+                salvo = pickle.load(f)
+            if (salvo["meia_vida"], salvo["janela"]) == (self.meia_vida, self.janela):
+                self.estado, self.cauda = salvo["estado"], salvo["cauda"]
+        return self
+
+    def salvar(self):
+        """Grava o estado em disco; sem `raiz` (estado só em memória), não faz nada."""
+        if not self.destino:
+            return self
+        os.makedirs(self.destino, exist_ok=True)
+        temporario = self._arquivo() + ".tmp"
+        with open(temporario, "wb") as f:
+            pickle.dump({"meia_vida": self.meia_vida, "janela": self.janela,
+                         "estado": self.estado, "cauda": self.cauda}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporario, self._arquivo())
+        return self
+
+    # ------------------------------------------------------------ atualização
+    def _novos(self, jogos: pd.DataFrame) -> pd.DataFrame:
+        """Jogos posteriores ao último já visto de cada jogador."""
+        pid = jogos["proPlayerId"]
+        ultimo_ts = pid.map(self.estado["ultimo_ts"]).to_numpy(dtype=object)
+        conhecido = pd.notna(ultimo_ts)
+        visto = np.zeros(len(jogos), dtype=bool)
+        if conhecido.any():
+            ts = jogos["gameTimestamp"].to_numpy(dtype=object)[conhecido].astype(str)
+            ultimo = ultimo_ts[conhecido].astype(str)
+            indice = jogos["indiceNaPartida"].to_numpy(dtype=float)[conhecido]
+            ultimo_indice = pid.map(self.estado["ultimo_indice"]).to_numpy(dtype=float)[conhecido]
+            visto[conhecido] = (ts < ultimo) | ((ts == ultimo) & (indice <= ultimo_indice))
+        return jogos[~visto]
+
+    def atualizar(self, jogos: pd.DataFrame) -> int:
+        """
+        Incorpora os jogos novos de `jogos` (colunas proPlayerId, gameTimestamp,
+        indiceNaPartida, points, kills, cs; pode repetir jogos já vistos).
+        Retorna quantos jogos novos entraram.
+        """
+        with span("forma.atualizar"):
+            novos = self._novos(_ordenar(jogos.dropna(subset=["proPlayerId", "gameTimestamp"])))
+            if novos.empty:
+                return 0
+
+            pids, grupo = np.unique(novos["proPlayerId"].to_numpy(dtype=object), return_inverse=True)
+            m = np.bincount(grupo)
+            inicio = np.concatenate([[0], np.cumsum(m)[:-1]])
+            posicao = np.arange(len(novos)) - inicio[grupo]
+            # peso de cada jogo novo no fim da série: decaimento^(jogos depois dele)
+            peso = self.decaimento ** (m[grupo] - 1 - posicao)
+            fator = self.decaimento ** m
+
+            estado = self.estado.reindex(pids)
+            novo = pd.DataFrame(index=pd.Index(pids, name="proPlayerId", dtype=object))
+            novo["n"] = estado["n"].fillna(0).to_numpy(dtype=np.int64) + m
+            ultimos = inicio + m - 1
+            novo["ultimo_ts"] = novos["gameTimestamp"].to_numpy(dtype=object)[ultimos]
+            novo["ultimo_indice"] = novos["indiceNaPartida"].to_numpy(dtype=float)[ultimos]
+            novo["den"] = estado["den"].fillna(0).to_numpy() * fator + np.bincount(grupo, weights=peso)
+            for met in METRICAS:
+                novo[f"num_{met}"] = (estado[f"num_{met}"].fillna(0).to_numpy() * fator
+                                      + np.bincount(grupo, weights=peso * novos[met].to_numpy()))
+
+            self.estado = pd.concat([self.estado.drop(index=pids, errors="ignore"), novo])
+            cauda = pd.concat([self.cauda, novos], ignore_index=True) if len(self.cauda) else novos
+            self.cauda = (cauda.sort_values(CHAVE, kind="stable")
+                          .groupby("proPlayerId", sort=False).tail(self.janela)
+                          .reset_index(drop=True))
+        contar("forma.jogos_novos", len(novos))
+        return len(novos)
+
+    # --------------------------------------------------------------- consulta
+    def features(self) -> pd.DataFrame:
+        """Por proPlayerId: forma_ewm_<métrica>, forma_u<JANELA>_<métrica> e forma_jogos."""
+        saida = pd.DataFrame(index=self.estado.index)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for met in METRICAS:
+                saida[f"forma_ewm_{met}"] = self.estado[f"num_{met}"] / self.estado["den"]
+        janela = self.cauda.groupby("proPlayerId")[METRICAS].mean()
+        for met in METRICAS:
+            saida[f"forma_u{self.janela}_{met}"] = janela[met].reindex(saida.index)
+        saida["forma_jogos"] = self.estado["n"].astype(float)
+        return saida
+
+
+def jogos_do_modelo(modelo) -> pd.DataFrame:
+    """modelo.jogos com o proPlayerId do dono, no formato de FormaJogadores.atualizar."""
+    jogos = modelo.jogos
+    return jogos.assign(proPlayerId=modelo.jogadores["proPlayerId"].to_numpy()[jogos["linha"].to_numpy()])
+
+
+def aplicar_forma(medias: pd.DataFrame, df: pd.DataFrame, features: pd.DataFrame,
+                  peso_forma: float = PESO_FORMA) -> pd.DataFrame:
+    """
+    `medias` com as colunas de forma alinhadas por df["proPlayerId"] e o
+    peso da EWMA de points no expectedScore (0 onde não há jogos).
+    """
+    medias = medias.drop(columns=[c for c in medias.columns if c.startswith("forma_")] + [COLUNA_PESO_FORMA],
+                         errors="ignore")
+    alinhadas = features.reindex(df["proPlayerId"].to_numpy())
+    for col in features.columns:
+        medias[col] = alinhadas[col].to_numpy()
+    medias[COLUNA_PESO_FORMA] = np.where(np.isnan(medias[COLUNA_FORMA].to_numpy(dtype=float)), 0.0, peso_forma)
+    return medias
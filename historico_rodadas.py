@@ -0,0 +1,172 @@
+# historico_rodadas.py
+
+"""
+Histórico de jogos entre rodadas.
+
+Cada dump de rodada (cache/Rodada_N, e o próprio cache/ para a rodada
+atual) repete todos os `games` e `recentMatches` das rodadas anteriores.
+O HistoricoRodadas ingere cada diretório uma única vez, remove duplicatas
+por (proPlayerId, gameId) e (proPlayerId, matchId), e mantém as tabelas
+ordenadas por jogador e data com um índice proPlayerId -> fatia de linhas.
+Assim a série completa de um jogador, ou os últimos N jogos de vários
+jogadores, saem sem reler os arquivos.
+
+As tabelas ficam salvas em cache/historico/ entre execuções.
+"""
+
+import os
+import re
+import json
+import numpy as np
+import pandas as pd
+
+from api_config import CACHE_DIR, carregar_json_cache, carregar_todos_os_players_cache, listar_fontes
+from utils import explodir_jogos, explodir_partidas
+
+HISTORICO_DIR = "historico"
+PADRAO_RODADA = re.compile(r"^Rodada_(\d+)$")
+
+
+def _assinatura(diretorio):
+    assinatura = {}
+    for nome in listar_fontes(diretorio):
+        st = os.stat(os.path.join(diretorio, nome))
+        assinatura[nome] = [st.st_size, st.st_mtime_ns]
+    return assinatura
+
+
+def _numero_rodada(diretorio):
+    """Número da rodada de um dump: pelo nome Rodada_N ou pelo market.json."""
+    m = PADRAO_RODADA.match(os.path.basename(os.path.normpath(diretorio)))
+    if m:
+        return int(m.group(1))
+    rodada = carregar_json_cache("market.json", diretorio).get("data", {}).get("round", {})
+    return int(rodada.get("indexInSplit", -1)) + 1
+
+
+def _indexar(tabela):
+    """proPlayerId -> (inicio, fim) numa tabela já ordenada por jogador."""
+    pids = tabela["proPlayerId"].to_numpy()
+    if not len(pids):
+        return {}
+    quebras = np.flatnonzero(pids[1:] != pids[:-1]) + 1
+    inicios = np.concatenate([[0], quebras])
+    fins = np.concatenate([quebras, [len(pids)]])
+    return {pids[i]: (int(i), int(f)) for i, f in zip(inicios, fins)}
+
+
+def _juntar(atual, novos, chave):
+    if atual.empty:
+        return novos.drop_duplicates(chave, keep="first")
+    return pd.concat([atual, novos], ignore_index=True).drop_duplicates(chave, keep="first")
+
+
+class HistoricoRodadas:
+    def __init__(self, raiz=CACHE_DIR):
+        self.raiz = raiz
+        self.destino = os.path.join(raiz, HISTORICO_DIR)
+        self.rodadas = {}  # diretório -> {"rodada", "assinatura"}
+        self.jogos = explodir_jogos(pd.DataFrame({"proPlayerId": [], "games": []})).drop(columns="linha")
+        self.partidas = explodir_partidas(pd.DataFrame({"proPlayerId": [], "recentMatches": []})).drop(columns="linha")
+        self._indice_jogos = {}
+        self._indice_partidas = {}
+        self._carregar()
+
+    # ---------------------------------------------------------------- disco
+    def _carregar(self):
+        meta = os.path.join(self.destino, "meta.json")
+        if not os.path.exists(meta):
+            return
+        with open(meta, "r", encoding="utf-8") as f:
+            self.rodadas = json.load(f)["rodadas"]
+        self.jogos = pd.read_pickle(os.path.join(self.destino, "jogos.pkl"))
+        self.partidas = pd.read_pickle(os.path.join(self.destino, "partidas.pkl"))
+        self._reindexar()
+
+    def salvar(self):
+        os.makedirs(self.destino, exist_ok=True)
+        self.jogos.to_pickle(os.path.join(self.destino, "jogos.pkl"))
+        self.partidas.to_pickle(os.path.join(self.destino, "partidas.pkl"))
+        with open(os.path.join(self.destino, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump({"rodadas": self.rodadas}, f, indent=2)
+
+    # ------------------------------------------------------------- ingestão
+    def diretorios_rodada(self):
+        """cache/Rodada_N em ordem de rodada, mais o cache/ atual por último."""
+        subdirs = [
+            os.path.join(self.raiz, nome) for nome in os.listdir(self.raiz)
+            if PADRAO_RODADA.match(nome) and os.path.isdir(os.path.join(self.raiz, nome))
+        ]
+        subdirs.sort(key=lambda d: int(PADRAO_RODADA.match(os.path.basename(d)).group(1)))
+        return subdirs + [self.raiz]
+
+    def ingerir(self, diretorio):
+        """
+        Ingere um dump de rodada. Não faz nada se o diretório já foi
+        ingerido e nenhum arquivo mudou. Retorna o nº de jogos novos.
+        """
+        chave = os.path.normpath(diretorio)
+        assinatura = _assinatura(diretorio)
+        if self.rodadas.get(chave, {}).get("assinatura") == assinatura:
+            return 0
+        rodada = _numero_rodada(diretorio)
+
+        docs = carregar_todos_os_players_cache(diretorio)
+        docs = [d for d in docs if d.get("player", {}).get("id")]
+        base = pd.DataFrame({
+            "proPlayerId": [d["player"]["id"] for d in docs],
+            "games": [d.get("games", []) for d in docs],
+            "recentMatches": [d.get("recentMatches", []) for d in docs],
+        })
+        jogos = explodir_jogos(base).drop(columns="linha")
+        partidas = explodir_partidas(base).drop(columns="linha")
+        jogos["rodadaIngestao"] = rodada
+        partidas["rodadaIngestao"] = rodada
+
+        antes = len(self.jogos)
+        # a primeira ocorrência vence: rodadas antigas entram primeiro
+        self.jogos = _juntar(self.jogos, jogos, ["proPlayerId", "gameId"])
+        self.partidas = _juntar(self.partidas, partidas, ["proPlayerId", "matchId"])
+        self._reindexar()
+
+        self.rodadas[chave] = {"rodada": rodada, "assinatura": assinatura}
+        return len(self.jogos) - antes
+
+    def atualizar(self):
+        """Ingere todos os dumps novos ou alterados e salva. Retorna o nº de jogos novos."""
+        novos = sum(self.ingerir(d) for d in self.diretorios_rodada())
+        self.salvar()
+        return novos
+
+    def _reindexar(self):
+        self.jogos = self.jogos.sort_values(["proPlayerId", "gameTimestamp"], kind="stable", ignore_index=True)
+        self.partidas = self.partidas.sort_values(["proPlayerId", "startsAt"], kind="stable", ignore_index=True)
+        self._indice_jogos = _indexar(self.jogos)
+        self._indice_partidas = _indexar(self.partidas)
+
+    # ------------------------------------------------------------- consultas
+    def jogos_do_jogador(self, pro_id):
+        """Série completa de jogos de um jogador, em ordem cronológica."""
+        inicio, fim = self._indice_jogos.get(pro_id, (0, 0))
+        return self.jogos.iloc[inicio:fim]
+
+    def partidas_do_jogador(self, pro_id):
+        inicio, fim = self._indice_partidas.get(pro_id, (0, 0))
+        return self.partidas.iloc[inicio:fim]
+
+    def ultimos_jogos(self, pro_ids, n):
+        """Últimos `n` jogos de cada jogador em `pro_ids`, numa única tabela."""
+        posicoes = []
+        for pid in pro_ids:
+            inicio, fim = self._indice_jogos.get(pid, (0, 0))
+            posicoes.append(np.arange(max(inicio, fim - n), fim))
+        if not posicoes:
+            return self.jogos.iloc[:0]
+        return self.jogos.iloc[np.concatenate(posicoes)]
+
+
+if __name__ == "__main__":
+    historico = HistoricoRodadas()
+    novos = historico.atualizar()
+    print(f">> Histórico: {novos} jogos novos, {len(historico.jogos)} no total, "
+          f"{historico.jogos['proPlayerId'].nunique()} jogadores")
@@ -0,0 +1,346 @@
+# ingestao.py
+
+"""
+Ingestão do cache a partir da API: market.json, as estatísticas da
+temporada e um player-<proPlayerId>.json por jogador de `roundPlayers`.
+
+Os documentos por jogador são baixados em paralelo (asyncio + threads de
+um requests.Session), limitados por um semáforo, com pool de threads e
+de conexões do mesmo tamanho. Erros de rede, 429 e 5xx são repetidos com backoff
+exponencial (respeitando Retry-After). Cada arquivo guarda o ETag e o
+Last-Modified da resposta em ingestao.json; na próxima rodada de
+downloads eles vão como If-None-Match/If-Modified-Since, e um 304 deixa
+o arquivo como está.
+
+A gravação é atômica (arquivo temporário + os.replace) e só acontece se o
+conteúdo mudou, assim o mtime dos arquivos intocados se mantém e o
+CacheIncremental relê apenas o que mudou. Os jogadores são gravados
+primeiro e market.json/temporada por último. Tudo vai para CACHE_DIR e
+para o dump da rodada (cache/Rodada_N, com a temporada como season.json).
+
+Uso: python ingestao.py --base-url https://... [--concorrencia 16]
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api_config import CACHE_DIR
+from instrumentacao import span, contar
+
+# caminhos relativos a --base-url; {proPlayerId} é preenchido por jogador
+ROTAS = {
+    "market": "market",
+    "temporada": "player-stats",
+    "jogador": "pro-players/{proPlayerId}",
+}
+ARQUIVO_TEMPORADA = {"cache": "player-stats.json", "rodada": "season.json"}
+METADADOS = "ingestao.json"
+
+CONCORRENCIA = 16
+TENTATIVAS = 4
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+TIMEOUT = 15.0
+REPETIR_STATUS = {429, 500, 502, 503, 504}
+
+
+class ErroIngestao(Exception):
+    pass
+
+
+@dataclass
+class Resultado:
+    rodada: int = None
+    baixados: list = field(default_factory=list)      # conteúdo novo gravado
+    iguais: list = field(default_factory=list)        # 200 com o mesmo conteúdo
+    nao_modificados: list = field(default_factory=list)  # 304
+    falhas: dict = field(default_factory=dict)        # nome -> erro
+    duracao_s: float = 0.0
+
+    def resumo(self):
+        return (f"rodada {self.rodada}: {len(self.baixados)} atualizado(s), "
+                f"{len(self.iguais) + len(self.nao_modificados)} sem mudança, "
+                f"{len(self.falhas)} falha(s) em {self.duracao_s:.2f} s")
+
+
+def criar_sessao(concorrencia=CONCORRENCIA):
+    """Session com pool de conexões para `concorrencia` requisições simultâneas."""
+    sessao = requests.Session()
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=concorrencia)
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    sessao.headers["Accept"] = "application/json"
+    return sessao
+
+
+def gravar_atomico(caminho, conteudo):
+    """Grava bytes num temporário do mesmo diretório e troca com os.replace."""
+    diretorio = os.path.dirname(caminho) or "."
+    os.makedirs(diretorio, exist_ok=True)
+    fd, temporario = tempfile.mkstemp(dir=diretorio, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(conteudo)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, caminho)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+
+
+def _mesmo_conteudo(caminho, conteudo):
+    try:
+        with open(caminho, "rb") as f:
+            return f.read() == conteudo
+    except FileNotFoundError:
+        return False
+
+
+def _ler_metadados(diretorio):
+    try:
+        with open(os.path.join(diretorio, METADADOS), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+
+def _espera(tentativa, resposta=None):
+    """Backoff exponencial com jitter; Retry-After da resposta tem prioridade."""
+    if resposta is not None and resposta.headers.get("Retry-After"):
+        valor = resposta.headers["Retry-After"]
+        try:
+            return min(float(valor), BACKOFF_MAX)
+        except ValueError:
+            try:
+                return min(max(parsedate_to_datetime(valor).timestamp() - time.time(), 0), BACKOFF_MAX)
+            except (TypeError, ValueError):
+                pass
+    return min(BACKOFF_BASE * 2 ** tentativa, BACKOFF_MAX) * random.uniform(0.5, 1.0)
+
+
+class Ingestao:
+    """
+    Um download completo do cache. Os GETs bloqueantes do requests rodam num
+    pool próprio de `concorrencia` threads (o executor padrão do asyncio tem
+    poucas); o semáforo limita quantos ficam em voo.
+    """
+
+    def __init__(self, base_url, diretorio=CACHE_DIR, concorrencia=CONCORRENCIA,
+                 tentativas=TENTATIVAS, timeout=TIMEOUT, sessao=None):
+        self.base_url = base_url.rstrip("/") + "/"
+        self.diretorio = diretorio
+        self.concorrencia = concorrencia
+        self.tentativas = tentativas
+        self.timeout = timeout
+        self.sessao = sessao or criar_sessao(concorrencia)
+        self.metadados = _ler_metadados(diretorio)
+        self._semaforo = None
+        self._executor = None
+
+    def _em_thread(self, funcao, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._executor, functools.partial(funcao, *args, **kwargs))
+
+    def _url(self, rota, **params):
+        return self.base_url + ROTAS[rota].format(**params)
+
+    def _cabecalhos(self, nome):
+        """If-None-Match/If-Modified-Since, só se o arquivo ainda existe no cache."""
+        meta = self.metadados.get(nome, {})
+        if not os.path.exists(os.path.join(self.diretorio, nome)):
+            return {}
+        cabecalhos = {}
+        if meta.get("etag"):
+            cabecalhos["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            cabecalhos["If-Modified-Since"] = meta["last_modified"]
+        return cabecalhos
+
+    async def _get(self, url, nome):
+        """
+        GET com repetição. Retorna (status, conteúdo, cabeçalhos); status 304
+        vem com conteúdo None. Levanta ErroIngestao depois da última tentativa.
+        """
+        cabecalhos = self._cabecalhos(nome)
+        async with self._semaforo:
+            for tentativa in range(self.tentativas):
+                resposta = None
+                try:
+                    resposta = await self._em_thread(
+                        self.sessao.get, url, headers=cabecalhos, timeout=self.timeout
+                    )
+                except requests.RequestException as e:
+                    erro = f"{type(e).__name__}: {e}"
+                else:
+                    if resposta.status_code == 304:
+                        return 304, None, resposta.headers
+                    if resposta.status_code == 200:
+                        return 200, resposta.content, resposta.headers
+                    erro = f"HTTP {resposta.status_code}"
+                    if resposta.status_code not in REPETIR_STATUS:
+                        break
+                if tentativa + 1 < self.tentativas:
+                    contar("ingestao.repeticoes")
+                    await asyncio.sleep(_espera(tentativa, resposta))
+        raise ErroIngestao(f"{url}: {erro}")
+
+    async def _baixar(self, url, nome):
+        """(status, conteúdo) de um arquivo, atualizando os metadados em caso de 200."""
+        status, conteudo, cabecalhos = await self._get(url, nome)
+        if status == 200:
+            try:
+                json.loads(conteudo)
+            except ValueError as e:
+                raise ErroIngestao(f"{url}: JSON inválido ({e})")
+            self.metadados[nome] = {
+                "etag": cabecalhos.get("ETag"),
+                "last_modified": cabecalhos.get("Last-Modified"),
+            }
+        contar(f"ingestao.http_{status}")
+        return status, conteudo
+
+    def _gravar(self, nome, conteudo, resultado, destinos):
+        """Grava `conteudo` em cada (diretório, nome) de `destinos` se mudou."""
+        mudou = False
+        for diretorio, nome_destino in destinos:
+            caminho = os.path.join(diretorio, nome_destino)
+            if not _mesmo_conteudo(caminho, conteudo):
+                gravar_atomico(caminho, conteudo)
+                mudou = True
+        (resultado.baixados if mudou else resultado.iguais).append(nome)
+
+    def _copiar_para_rodada(self, nome, rodada_dir, nome_destino=None):
+        """304: o arquivo do cache continua valendo; garante a cópia no dump da rodada."""
+        origem = os.path.join(self.diretorio, nome)
+        with open(origem, "rb") as f:
+            conteudo = f.read()
+        destino = os.path.join(rodada_dir, nome_destino or nome)
+        if not _mesmo_conteudo(destino, conteudo):
+            gravar_atomico(destino, conteudo)
+
+    async def _jogador(self, pro_id, rodada_dir, resultado):
+        nome = f"player-{pro_id}.json"
+        try:
+            status, conteudo = await self._baixar(self._url("jogador", proPlayerId=pro_id), nome)
+            if status == 304:
+                await self._em_thread(self._copiar_para_rodada, nome, rodada_dir)
+                resultado.nao_modificados.append(nome)
+            else:
+                await self._em_thread(
+                    self._gravar, nome, conteudo, resultado,
+                    [(self.diretorio, nome), (rodada_dir, nome)],
+                )
+        except (ErroIngestao, OSError) as e:
+            # sem o arquivo gravado, o ETag novo não pode valer no próximo GET
+            self.metadados.pop(nome, None)
+            resultado.falhas[nome] = str(e)
+            contar("ingestao.falhas")
+            print(f"[ERRO] {nome}: {e}", file=sys.stderr)
+
+    async def executar(self):
+        inicio = time.perf_counter()
+        self._semaforo = asyncio.Semaphore(self.concorrencia)
+        resultado = Resultado()
+        with ThreadPoolExecutor(self.concorrencia, thread_name_prefix="ingestao") as self._executor:
+            await self._executar(resultado)
+        self._executor = None
+        resultado.duracao_s = time.perf_counter() - inicio
+        contar("ingestao.atualizados", len(resultado.baixados))
+        return resultado
+
+    async def _executar(self, resultado):
+        with span("ingestao", concorrencia=self.concorrencia):
+            with span("ingestao.market"):
+                status, conteudo = await self._baixar(self._url("market"), "market.json")
+                if status == 304:
+                    with open(os.path.join(self.diretorio, "market.json"), "rb") as f:
+                        conteudo = f.read()
+                market = json.loads(conteudo).get("data", {})
+
+            round_players = market.get("roundPlayers", [])
+            rodada = int(market.get("round", {}).get("indexInSplit", -1)) + 1
+            resultado.rodada = rodada
+            rodada_dir = os.path.join(self.diretorio, f"Rodada_{rodada}")
+            os.makedirs(rodada_dir, exist_ok=True)
+            print(f">> Ingestão da rodada {rodada}: {len(round_players)} jogadores", file=sys.stderr)
+
+            with span("ingestao.jogadores", n=len(round_players)):
+                ids = dict.fromkeys(j["proPlayerId"] for j in round_players if j.get("proPlayerId"))
+                temporada = asyncio.ensure_future(
+                    self._baixar(self._url("temporada"), ARQUIVO_TEMPORADA["cache"])
+                )
+                await asyncio.gather(*(self._jogador(pid, rodada_dir, resultado) for pid in ids))
+                try:
+                    status_temporada, conteudo_temporada = await temporada
+                except ErroIngestao as e:
+                    resultado.falhas[ARQUIVO_TEMPORADA["cache"]] = str(e)
+                    print(f"[ERRO] {ARQUIVO_TEMPORADA['cache']}: {e}", file=sys.stderr)
+                    status_temporada = None
+
+            # globais por último: quem vê o market novo já encontra os jogadores
+            with span("ingestao.gravar_globais"):
+                nome_temporada = ARQUIVO_TEMPORADA["cache"]
+                if status_temporada == 200:
+                    self._gravar(nome_temporada, conteudo_temporada, resultado, [
+                        (self.diretorio, nome_temporada), (rodada_dir, ARQUIVO_TEMPORADA["rodada"]),
+                    ])
+                elif status_temporada == 304:
+                    self._copiar_para_rodada(nome_temporada, rodada_dir, ARQUIVO_TEMPORADA["rodada"])
+                    resultado.nao_modificados.append(nome_temporada)
+
+                if status == 200:
+                    self._gravar("market.json", conteudo, resultado, [
+                        (self.diretorio, "market.json"), (rodada_dir, "market.json"),
+                    ])
+                else:
+                    self._copiar_para_rodada("market.json", rodada_dir)
+                    resultado.nao_modificados.append("market.json")
+
+                gravar_atomico(
+                    os.path.join(self.diretorio, METADADOS),
+                    json.dumps(self.metadados, ensure_ascii=False, indent=1).encode("utf-8"),
+                )
+
+
+def ingerir(base_url, diretorio=CACHE_DIR, concorrencia=CONCORRENCIA, **kwargs):
+    """Atualiza o cache a partir da API (bloqueante). Retorna o Resultado."""
+    ingestao = Ingestao(base_url, diretorio, concorrencia, **kwargs)
+    try:
+        return asyncio.run(ingestao.executar())
+    finally:
+        ingestao.sessao.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python ingestao.py", description="Atualiza o cache a partir da API")
+    parser.add_argument("--base-url", default=os.environ.get("CARTOLA_LOL_API"),
+                        help="raiz da API (padrão: $CARTOLA_LOL_API)")
+    parser.add_argument("--diretorio", default=CACHE_DIR)
+    parser.add_argument("--concorrencia", type=int, default=CONCORRENCIA)
+    parser.add_argument("--tentativas", type=int, default=TENTATIVAS)
+    args = parser.parse_args(argv)
+    if not args.base_url:
+        parser.error("informe --base-url ou defina CARTOLA_LOL_API")
+
+    resultado = ingerir(args.base_url, args.diretorio, args.concorrencia, tentativas=args.tentativas)
+    print(resultado.resumo())
+    return 1 if resultado.falhas else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,160 @@
+# instrumentacao.py
+
+"""
+Instrumentação leve: spans de tempo e contadores por execução.
+
+Uma execução (um rerun do Streamlit, uma chamada de CLI) abre um Registro
+com iniciar_execucao(); dentro dela, `with span("nome"):` mede um trecho
+e contar("nome") soma contadores. Sem execução ativa na thread, span e
+contar não fazem nada, então as bibliotecas podem ser instrumentadas sem
+custo para quem não usa.
+
+Ao finalizar, o Registro vira uma linha JSON no arquivo indicado por
+INSTRUMENTACAO_LOG (se definido). Com perfil=("cprofile", "tracemalloc")
+a execução também grava em perfis/ o .prof do cProfile e o top de
+alocações do tracemalloc.
+"""
+
+import os
+import json
+import time
+import pstats
+import cProfile
+import threading
+import functools
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+LOG_JSON = os.environ.get("INSTRUMENTACAO_LOG")
+PERFIS_DIR = "perfis"
+PERFIS = ("cprofile", "tracemalloc")
+
+_local = threading.local()
+
+
+class Registro:
+    def __init__(self, nome, perfil=()):
+        self.nome = nome
+        self.inicio = time.perf_counter()
+        self.timestamp = datetime.now().isoformat(timespec="milliseconds")
+        self.spans = []
+        self.contadores = {}
+        self.duracao_ms = None
+        self.perfil = tuple(p for p in perfil if p in PERFIS)
+        self.arquivos_perfil = []
+        self._pilha = []
+        self._profiler = None
+        self._tracemalloc = False  # True só se esta execução ligou o tracemalloc
+
+    def resumo(self) -> dict:
+        return {
+            "execucao": self.nome,
+            "timestamp": self.timestamp,
+            "duracao_ms": self.duracao_ms,
+            "spans": self.spans,
+            "contadores": self.contadores,
+        }
+
+
+def registro_atual():
+    return getattr(_local, "registro", None)
+
+
+@contextmanager
+def span(nome, **atributos):
+    """Mede o bloco no Registro da thread; spans aninhados guardam a profundidade."""
+    registro = registro_atual()
+    if registro is None:
+        yield
+        return
+    item = {"nome": nome, "profundidade": len(registro._pilha),
+            "inicio_ms": round((time.perf_counter() - registro.inicio) * 1e3, 3), **atributos}
+    registro.spans.append(item)
+    registro._pilha.append(item)
+    inicio = time.perf_counter()
+    try:
+        yield item
+    finally:
+        item["duracao_ms"] = round((time.perf_counter() - inicio) * 1e3, 3)
+        registro._pilha.pop()
+
+
+def cronometrado(nome):
+    """Decorador: cada chamada da função vira um span `nome`."""
+    def decorar(funcao):
+        @functools.wraps(funcao)
+        def envolver(*args, **kwargs):
+            with span(nome):
+                return funcao(*args, **kwargs)
+        return envolver
+    return decorar
+
+
+def contar(nome, n=1):
+    registro = registro_atual()
+    if registro is not None:
+        registro.contadores[nome] = registro.contadores.get(nome, 0) + n
+
+
+def iniciar_execucao(nome, perfil=()) -> Registro:
+    """Abre um Registro para a thread atual (substitui um anterior não finalizado)."""
+    registro = Registro(nome, perfil)
+    if "cprofile" in registro.perfil:
+        try:
+            registro._profiler = cProfile.Profile()
+            registro._profiler.enable()
+        except ValueError:
+            # outro profiler ativo no processo (outra sessão capturando)
+            print("[AVISO] cProfile já em uso; perfil desta execução ignorado")
+            registro._profiler = None
+    if "tracemalloc" in registro.perfil and not tracemalloc.is_tracing():
+        tracemalloc.start()
+        registro._tracemalloc = True
+    _local.registro = registro
+    return registro
+
+
+def finalizar_execucao():
+    """Fecha o Registro da thread, grava o log JSON e os perfis. Retorna o Registro."""
+    registro = registro_atual()
+    if registro is None:
+        return None
+    _local.registro = None
+    registro.duracao_ms = round((time.perf_counter() - registro.inicio) * 1e3, 3)
+
+    if registro.perfil:
+        os.makedirs(PERFIS_DIR, exist_ok=True)
+        base = os.path.join(PERFIS_DIR, f"{datetime.now():%Y%m%d-%H%M%S-%f}_{registro.nome}")
+        if registro._profiler is not None:
+            registro._profiler.disable()
+            registro._profiler.dump_stats(base + ".prof")
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                pstats.Stats(registro._profiler, stream=f).sort_stats("cumulative").print_stats(40)
+            registro.arquivos_perfil += [base + ".prof", base + ".txt"]
+        if "tracemalloc" in registro.perfil and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            atual, pico = tracemalloc.get_traced_memory()
+            # o tracemalloc é do processo: desliga só o que esta execução ligou
+            if registro._tracemalloc:
+                tracemalloc.stop()
+            with open(base + "_memoria.txt", "w", encoding="utf-8") as f:
+                f.write(f"atual={atual / 2**20:.2f} MB pico={pico / 2**20:.2f} MB\n")
+                for estat in snapshot.statistics("lineno")[:40]:
+                    f.write(f"{estat}\n")
+            registro.contadores["memoria.pico_mb"] = round(pico / 2**20, 2)
+            registro.arquivos_perfil.append(base + "_memoria.txt")
+
+    if LOG_JSON:
+        with open(LOG_JSON, "a", encoding="utf-8") as f:
+            f.write(json.dumps(registro.resumo(), ensure_ascii=False) + "\n")
+    return registro
+
+
+@contextmanager
+def execucao(nome, perfil=()):
+    registro = iniciar_execucao(nome, perfil)
+    try:
+        yield registro
+    finally:
+        finalizar_execucao()
@@ -0,0 +1,182 @@
+# modelo.py
+
+"""
+Modelo normalizado de uma rodada.
+
+O DataFrame de integrate_data guarda recentMatches, upcomingMatches e
+games como listas de dicts em colunas object; cada df.copy() carrega
+essas colunas junto. O ModeloRodada separa:
+  - jogadores: só colunas escalares, índice = id denso do jogador (jid)
+  - times: um por time do mercado, índice = id denso do time (tid)
+  - partidas, jogos, proximas, detalhes: tabelas planas tipadas, com a
+    coluna `linha` = jid do dono (mesma convenção de utils._achatar);
+    em detalhes, `jogo` é a posição do jogo na tabela jogos
+  - confrontos: índice time x time dos confrontos diretos (confrontos.py)
+
+As tabelas filhas ficam ordenadas por `linha`, então a fatia de um
+jogador sai por busca binária. O DataFrame de sessão (app.py) parte de
+`jogadores`, e as estatísticas e a simulação recebem as tabelas filhas
+prontas em vez de explodir as listas de novo.
+"""
+
+import numpy as np
+import pandas as pd
+
+from api_config import TIME_DESCONHECIDO, regiao_do_time
+from utils import explodir_partidas, explodir_jogos, proximo_oponente, _achatar
+from confrontos import IndiceConfrontos
+
+COLUNAS_ANINHADAS = ["recentMatches", "upcomingMatches", "games"]
+
+CAMPOS_PROXIMA = {
+    "matchId": ("matchId", None),
+    "startsAt": ("startsAt", None),
+    "adversario": (("opponentTeam", "name"), None),
+}
+CAMPOS_DETALHE = {
+    "detailType": ("detailType", None),
+    "count": ("count", 0),
+    "value": ("value", 0),
+}
+# strings repetidas por muitas linhas viram category
+CATEGORICAS = {"adversario", "detailType"}
+
+
+def _tipar(tabela: pd.DataFrame) -> pd.DataFrame:
+    for col in tabela.columns:
+        if pd.api.types.is_integer_dtype(tabela[col]):
+            tabela[col] = tabela[col].astype(np.int32)
+    for col in CATEGORICAS & set(tabela.columns):
+        tabela[col] = tabela[col].astype("category")
+    return tabela
+
+
+def _fatias(tabela: pd.DataFrame, n: int) -> np.ndarray:
+    """inicio[jid]..inicio[jid+1] = linhas do jogador numa tabela ordenada por `linha`."""
+    return np.searchsorted(tabela["linha"].to_numpy(), np.arange(n + 1), side="left")
+
+
+class ModeloRodada:
+    def __init__(self, df: pd.DataFrame, market: dict | None = None):
+        df = df.reset_index(drop=True)
+        n = len(df)
+
+        vazias = pd.Series([[]] * n, dtype=object)
+        partidas = df["recentMatches"] if "recentMatches" in df.columns else vazias
+        jogos = df["games"] if "games" in df.columns else vazias
+        proximas = df["upcomingMatches"] if "upcomingMatches" in df.columns else vazias
+
+        tabela_jogos = explodir_jogos(
+            pd.DataFrame({"proPlayerId": df["proPlayerId"], "games": jogos})
+        ).drop(columns="proPlayerId")
+        # games[].details: uma linha por (jogo, tipo de pontuação)
+        por_jogo = pd.Series([g.get("details") or [] for lst in jogos for g in (lst or [])], dtype=object)
+        detalhes = _achatar(por_jogo, CAMPOS_DETALHE)
+        jogo = detalhes.pop("linha").to_numpy()
+        detalhes.insert(0, "linha", tabela_jogos["linha"].to_numpy()[jogo])
+        detalhes.insert(1, "jogo", jogo)
+
+        self._montar(
+            df.drop(columns=[c for c in COLUNAS_ANINHADAS if c in df.columns]),
+            proximo_oponente(df).to_numpy(),
+            explodir_partidas(
+                pd.DataFrame({"proPlayerId": df["proPlayerId"], "recentMatches": partidas})
+            ).drop(columns="proPlayerId"),
+            tabela_jogos,
+            _achatar(proximas, CAMPOS_PROXIMA),
+            detalhes,
+            market,
+        )
+
+    @classmethod
+    def de_tabelas(cls, jogadores, partidas, jogos, proximas, detalhes, market=None) -> "ModeloRodada":
+        """
+        Modelo a partir das tabelas já achatadas (ex.: as colunas do
+        snapshot.py), sem passar pelo DataFrame com as listas de dicts.
+        `jogadores` só com as colunas escalares; o próximo oponente sai
+        da primeira linha de cada jogador em `proximas`.
+        """
+        jogadores = jogadores.reset_index(drop=True)
+        oponente = np.full(len(jogadores), None, dtype=object)
+        primeira = proximas.drop_duplicates("linha")
+        adversario = primeira["adversario"].to_numpy(dtype=object)
+        oponente[primeira["linha"].to_numpy()] = np.where(pd.isna(adversario), None, adversario)
+        modelo = cls.__new__(cls)
+        modelo._montar(jogadores, oponente, partidas, jogos, proximas, detalhes, market)
+        return modelo
+
+    def _montar(self, jogadores, oponente, partidas, jogos, proximas, detalhes, market):
+        n = len(jogadores)
+
+        # times: os do mercado, mais algum que só apareça nos jogadores
+        nomes = {}
+        for t in (market or {}).get("teams", []):
+            nomes.setdefault(t.get("id"), t.get("name"))
+        for team_id, nome in zip(jogadores.get("teamId", []), jogadores.get("teamName", [])):
+            if nome != TIME_DESCONHECIDO:
+                nomes.setdefault(team_id, nome)
+        self.times = pd.DataFrame({
+            "teamId": list(nomes),
+            "teamName": list(nomes.values()),
+            "region": [regiao_do_time(nome) for nome in nomes.values()],
+        })
+        self.times.index.name = "tid"
+        self.tid_por_time_id = {team_id: tid for tid, team_id in enumerate(nomes)}
+        self.tid_por_nome = {nome: tid for tid, nome in enumerate(nomes.values())}
+
+        jogadores["tid"] = np.array(
+            [self.tid_por_time_id.get(t, -1) for t in jogadores.get("teamId", [None] * n)], dtype=np.int32
+        )
+        jogadores["proximoOponente"] = oponente
+        jogadores.index.name = "jid"
+        self.jogadores = jogadores
+        self.jid_por_pro = {pid: jid for jid, pid in enumerate(jogadores["proPlayerId"])}
+
+        self.partidas = _tipar(partidas)
+        self.jogos = _tipar(jogos)
+        self.proximas = _tipar(proximas)
+        self.detalhes = _tipar(detalhes)
+
+        self._fatias = {
+            nome: _fatias(getattr(self, nome), n)
+            for nome in ("partidas", "jogos", "proximas", "detalhes")
+        }
+        self._confrontos = None
+
+    def __len__(self):
+        return len(self.jogadores)
+
+    @property
+    def confrontos(self) -> IndiceConfrontos:
+        """Índice de confrontos diretos (confrontos.py), montado na primeira consulta."""
+        if self._confrontos is None:
+            self._confrontos = IndiceConfrontos(self)
+        return self._confrontos
+
+    @confrontos.setter
+    def confrontos(self, indice):
+        self._confrontos = indice
+
+    def _do_jogador(self, tabela, jid):
+        inicio = self._fatias[tabela]
+        return getattr(self, tabela).iloc[inicio[jid]:inicio[jid + 1]]
+
+    def partidas_do_jogador(self, jid):
+        return self._do_jogador("partidas", jid)
+
+    def jogos_do_jogador(self, jid):
+        return self._do_jogador("jogos", jid)
+
+    def detalhes_do_jogador(self, jid):
+        return self._do_jogador("detalhes", jid)
+
+    def time_do_jogador(self, jid):
+        tid = self.jogadores["tid"].iat[jid]
+        return self.times.iloc[tid] if tid >= 0 else None
+
+    def memoria(self) -> dict:
+        """Bytes (deep) de cada tabela do modelo."""
+        return {
+            nome: int(getattr(self, nome).memory_usage(deep=True).sum())
+            for nome in ("jogadores", "times", "partidas", "jogos", "proximas", "detalhes")
+        }
@@ -0,0 +1,215 @@
+# pontuacao.py
+
+"""
+Regras de pontuação e repontuação vetorizada dos jogos.
+
+Cada jogo em `games` traz `details`: uma entrada por tipo de pontuação
+(kills, cs, kp_70, stomp...) com `count` e `value`, e `points` é a soma
+dos `value`. A MatrizPontuacao compila os detalhes do ModeloRodada uma
+vez numa matriz esparsa jogo x detailType (coordenadas jogo, tipo,
+contagem, valor). Uma tabela de regras dá o valor de cada tipo:
+
+  - ("unidade", peso): valor = peso * count (kills, cs, barons...)
+  - ("fixo", peso): valor = peso se o bônus saiu no jogo (stomp, kp_70...)
+
+Repontuar é uma conta sobre a matriz inteira: a diferença entre o valor
+novo e o gravado de cada entrada, somada por jogo (bincount), é
+aplicada aos `points`. Só os tipos cuja regra difere de REGRAS_PADRAO
+são recalculados; os demais mantêm o valor gravado (o arredondamento do
+cs na API nem sempre é reproduzível), então as regras padrão devolvem
+exatamente os pontos da API. Os limiares dos bônus (kp > 70%,
+dano > 30%...) não podem mudar: o detalhe só existe nos jogos em que o
+bônus saiu.
+
+O `score` de uma partida é a média dos `points` dos seus jogos; ele e as
+pontuações por rodada da temporada (averageRoundScore, maxRoundScore...)
+são deslocados pela diferença correspondente, e daí saem médias,
+estatísticas e escalações (ver repontuar).
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+from instrumentacao import span, contar
+
+UNIDADE, FIXO = "unidade", "fixo"
+
+# regras da liga, inferidas dos detalhes da API (o tipo "asssits" vem assim)
+REGRAS_PADRAO = {
+    "kills": (UNIDADE, 1.5),
+    "asssits": (UNIDADE, 1.0),
+    "deaths": (UNIDADE, -1.0),
+    "cs": (UNIDADE, 0.01),
+    "triple_kills": (UNIDADE, 2.0),
+    "quadra_kills": (UNIDADE, 3.0),
+    "jng_barons": (UNIDADE, 2.0),
+    "jng_dragon_soul": (UNIDADE, 1.5),
+    "top_solo_kills": (UNIDADE, 1.0),
+    "sup_vision_score": (UNIDADE, 1.0),
+    "victory": (FIXO, 1.0),
+    "stomp": (FIXO, 2.0),
+    "perfect_scores": (FIXO, 3.0),
+    "first_blood": (FIXO, 1.0),
+    "over_ten_kills": (FIXO, 3.0),
+    "kp_70": (FIXO, 2.0),
+    "damage_share_30": (FIXO, 3.0),
+    "bot_dpm_over_1000": (FIXO, 1.5),
+    "jng_kp_over_75": (FIXO, 1.5),
+    "top_damage_share": (FIXO, 2.0),
+    "top_tank": (FIXO, 2.0),
+    "mid_damage_share_over_30": (FIXO, 3.0),
+    "sup_assists_over_10": (FIXO, 2.0),
+    "sup_kp_over_75": (FIXO, 2.0),
+    "sup_first_dragon": (FIXO, 1.5),
+}
+
+# colunas da temporada deslocadas junto com as partidas -> agregação por rodada
+COLUNAS_TEMPORADA = {
+    "averageRoundScore": "mean",
+    "maxRoundScore": "max",
+    "minRoundScore": "min",
+    "lastRoundScore": "last",
+}
+
+
+def normalizar_regras(regras=None) -> dict:
+    """
+    REGRAS_PADRAO com as alterações de `regras`. Cada valor pode ser
+    (modo, peso), {"modo": ..., "peso": ...} ou só o peso (mantém o modo
+    padrão do tipo, ou "unidade" para tipos novos).
+    """
+    saida = dict(REGRAS_PADRAO)
+    for tipo, regra in (regras or {}).items():
+        if isinstance(regra, dict):
+            modo, peso = regra.get("modo", saida.get(tipo, (UNIDADE,))[0]), regra["peso"]
+        elif isinstance(regra, (list, tuple)):
+            modo, peso = regra
+        else:
+            modo, peso = saida.get(tipo, (UNIDADE,))[0], regra
+        if modo not in (UNIDADE, FIXO):
+            raise ValueError(f"Modo de regra inválido para {tipo}: {modo!r}")
+        saida[tipo] = (modo, float(peso))
+    return saida
+
+
+def carregar_regras(caminho) -> dict:
+    """Regras de um JSON {detailType: peso | [modo, peso] | {"modo", "peso"}}."""
+    with open(caminho, "r", encoding="utf-8") as f:
+        return normalizar_regras(json.load(f))
+
+
+class MatrizPontuacao:
+    """
+    Detalhes de todos os jogos como matriz esparsa jogo x tipo. `jogo`
+    indexa a tabela modelo.jogos; `tipo` indexa `tipos`.
+    """
+
+    def __init__(self, modelo):
+        detalhes = modelo.detalhes
+        tipo = detalhes["detailType"]
+        if not isinstance(tipo.dtype, pd.CategoricalDtype):
+            tipo = tipo.astype("category")
+        self.tipos = list(tipo.cat.categories)
+        self.n_jogos = len(modelo.jogos)
+        self.jogo = detalhes["jogo"].to_numpy(dtype=np.int32)
+        self.tipo = tipo.cat.codes.to_numpy(dtype=np.int32)
+        self.contagem = pd.to_numeric(detalhes["count"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        self.valor = pd.to_numeric(detalhes["value"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        self.pontos = pd.to_numeric(modelo.jogos["points"], errors="coerce").fillna(0).to_numpy(dtype=float)
+
+    def __len__(self):
+        return len(self.valor)
+
+    def densa(self, campo="contagem") -> pd.DataFrame:
+        """Matriz densa jogo x tipo de `contagem` ou `valor` (0 onde o tipo não saiu)."""
+        matriz = np.zeros((self.n_jogos, len(self.tipos)))
+        matriz[self.jogo, self.tipo] = getattr(self, campo)
+        return pd.DataFrame(matriz, columns=self.tipos)
+
+    def pesos(self, regras) -> tuple:
+        """
+        (peso_unidade, peso_fixo, alterado) por tipo, na ordem de `tipos`;
+        `alterado` marca os tipos com regra diferente da padrão.
+        """
+        regras = normalizar_regras(regras)
+        unidade = np.zeros(len(self.tipos))
+        fixo = np.zeros(len(self.tipos))
+        alterado = np.zeros(len(self.tipos), dtype=bool)
+        for i, tipo in enumerate(self.tipos):
+            if tipo in regras and regras[tipo] != REGRAS_PADRAO.get(tipo):
+                modo, peso = regras[tipo]
+                (unidade if modo == UNIDADE else fixo)[i] = peso
+                alterado[i] = True
+        return unidade, fixo, alterado
+
+    def valores(self, regras=None) -> np.ndarray:
+        """Valor de cada entrada sob `regras`, arredondado a 2 casas como na API."""
+        unidade, fixo, alterado = self.pesos(regras)
+        novo = np.round(self.contagem * unidade[self.tipo] + fixo[self.tipo], 2)
+        return np.where(alterado[self.tipo], novo, self.valor)
+
+    def repontuar(self, regras=None) -> np.ndarray:
+        """`points` de cada jogo de modelo.jogos sob `regras`."""
+        with span("pontuacao.repontuar", entradas=len(self)):
+            delta = np.bincount(self.jogo, weights=self.valores(regras) - self.valor, minlength=self.n_jogos)
+            return np.round(self.pontos + delta, 2)
+
+
+def _por_rodada(partidas: pd.DataFrame, score: np.ndarray) -> pd.DataFrame:
+    """Média por (jogador, rodada) e as agregações de COLUNAS_TEMPORADA por jogador."""
+    rodadas = (
+        pd.DataFrame({"linha": partidas["linha"].to_numpy(),
+                      "rodada": partidas["indiceRodada"].to_numpy(), "score": score})
+        .dropna(subset=["rodada"])
+        .groupby(["linha", "rodada"], sort=True)["score"].mean()
+        .reset_index()
+    )
+    return rodadas.groupby("linha")["score"].agg(list(COLUNAS_TEMPORADA.values()))
+
+
+def repontuar(modelo, regras=None, matriz=None) -> tuple:
+    """
+    Aplica `regras` a todos os jogos do ModeloRodada. Retorna (jogadores,
+    partidas, jogos) novos: points dos jogos, score das partidas (média da
+    diferença dos jogos da mesma partida) e as colunas da temporada
+    deslocadas pela diferença da agregação por rodada. Passe o resultado
+    para calcular_medias / calcular_estatisticas como as tabelas do modelo.
+    `matriz` (MatrizPontuacao do modelo) evita recompilar os detalhes.
+    """
+    if matriz is None:
+        matriz = MatrizPontuacao(modelo)
+    pontos = matriz.repontuar(regras)
+    jogos = modelo.jogos.copy()
+    delta_jogo = pontos - matriz.pontos
+    jogos["points"] = pontos
+    contar("pontuacao.jogos_alterados", int(np.count_nonzero(np.abs(delta_jogo) > 1e-9)))
+
+    with span("pontuacao.partidas"):
+        partidas = modelo.partidas.copy()
+        chave = ["linha", "matchId"]
+        delta = (
+            pd.DataFrame({"linha": jogos["linha"].to_numpy(), "matchId": jogos["matchId"].to_numpy(),
+                          "delta": delta_jogo})
+            .dropna(subset=["matchId"])
+            .groupby(chave, sort=False)["delta"].mean()
+        )
+        indice = pd.MultiIndex.from_arrays([partidas["linha"], partidas["matchId"]])
+        delta_partida = delta.reindex(indice).fillna(0).to_numpy()
+        score_antigo = pd.to_numeric(partidas["score"], errors="coerce").fillna(0).to_numpy(dtype=float)
+        partidas["score"] = np.round(score_antigo + delta_partida, 2)
+
+    with span("pontuacao.temporada"):
+        jogadores = modelo.jogadores.copy()
+        colunas = [c for c in COLUNAS_TEMPORADA if c in jogadores.columns]
+        if colunas and "indiceRodada" in partidas.columns:
+            antes = _por_rodada(partidas, score_antigo)
+            depois = _por_rodada(partidas, partidas["score"].to_numpy(dtype=float))
+            diferenca = (depois - antes).reindex(range(len(jogadores))).fillna(0)
+            diferenca.columns = list(COLUNAS_TEMPORADA)
+            for col in colunas:
+                base = pd.to_numeric(jogadores[col], errors="coerce").to_numpy(dtype=float)
+                # jogadores sem estatística da temporada continuam sem
+                jogadores[col] = base + diferenca[col].to_numpy()
+    return jogadores, partidas, jogos
@@ -0,0 +1,149 @@
+# portfolio.py
+
+"""
+Portfólio de escalações diferentes sob o mesmo orçamento.
+
+Os 5 melhores times de montar_time_otimo costumam diferir só por um
+suporte. montar_portfolio escolhe N escalações uma a uma: cada uma é a
+melhor (branch-and-bound de montar_time_otimo, k=1) que
+  - difere de todas as anteriores em pelo menos `min_diferentes` jogadores
+    (o otimizador corta os ramos que repetem jogadores demais, ver `evitar`)
+  - não usa jogador que já está em `exposicao_jogador` do portfólio nem
+    time que já está em `exposicao_time` das escalações (os esgotados
+    saem por máscara).
+
+Os candidatos de cada posição e os limites da DP (_limites_por_sufixo)
+saem uma vez, antes da primeira escalação: tirar jogadores só afrouxa o
+limite, que continua válido. Entre uma escalação e outra só mudam a
+máscara dos esgotados e a matriz de `evitar`.
+
+Como cada restrição nova só tira opções, os times saem em ordem de
+pontos; o portfólio para antes de N se não houver mais escalação viável.
+portfolio_tabela() dá uma linha por escalação (para o CSV) e exposicao()
+a fração das escalações com cada jogador.
+
+Uso (pela CLI):
+    python cli.py portfolio --n 100 --min-diferentes 2 --exposicao-jogador 0.4 --formato csv > portfolio.csv
+"""
+
+import math
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from utils import (
+    POSICOES, _branch_and_bound, _candidatos_posicao, _escalacoes, _limites, _marcar, _preparar_candidatos,
+)
+from instrumentacao import span, contar
+
+N_ESCALACOES = 50
+MIN_DIFERENTES = 2
+EXPOSICAO_JOGADOR = 0.5
+EXPOSICAO_TIME = 1.0
+
+
+def _id(jogador):
+    return jogador.get("proPlayerId", jogador["playerName"])
+
+
+def _limite(fracao, n):
+    """Máximo de escalações (de n) com o mesmo jogador/time; pelo menos 1."""
+    return max(1, math.floor(fracao * n + 1e-9))
+
+
+def montar_portfolio(df: pd.DataFrame,
+                     criterio: str,
+                     orcamento: float,
+                     n: int = N_ESCALACOES,
+                     min_diferentes: int = MIN_DIFERENTES,
+                     exposicao_jogador: float = EXPOSICAO_JOGADOR,
+                     exposicao_time: float = EXPOSICAO_TIME,
+                     max_por_time: int | None = None,
+                     fixos=None,
+                     excluidos=None) -> list:
+    """
+    Até `n` escalações no formato de montar_time_otimo [(time_, custo, pts, eff)],
+    em ordem de pontos. Exposições são frações de `n`; fixos entram em
+    todas as escalações (e ignoram o limite de exposição).
+    """
+    limite_jogador = _limite(exposicao_jogador, n)
+    limite_time = _limite(exposicao_time, n)
+    fixos = set(fixos or [])
+    max_comuns = len(POSICOES) - min_diferentes
+
+    portfolio = []
+    avaliados = 0
+    with span("portfolio", n=n, min_diferentes=min_diferentes):
+        df, posicoes = _preparar_candidatos(df, criterio, fixos, excluidos)
+        # sem posições (alguma vazia ou com dois fixos) não há escalação viável
+        posicoes = sorted(posicoes or [], key=lambda p: len(p[0]))
+        teto_unid, limite = _limites(posicoes, orcamento)
+        fixo = _marcar(df, fixos).to_numpy()
+        times = df["teamName"].to_numpy() if "teamName" in df.columns else None
+        membro = np.zeros((len(df), 0), dtype=bool)  # membro[linha, e]: jogador na escalação e
+        esgotado = np.zeros(len(df), dtype=bool)
+        por_jogador, por_time = Counter(), Counter()
+
+        while posicoes and len(portfolio) < n:
+            cand = []
+            for idx, preco, pts, times_cod in posicoes:
+                ok = ~esgotado[idx]
+                if not ok.any():
+                    break
+                cand.append(_candidatos_posicao(idx[ok], preco[ok], pts[ok], times_cod[ok],
+                                                membro[idx[ok]], 1, max_por_time))
+            if len(cand) < len(posicoes):
+                break
+            melhores, combos = _branch_and_bound(cand, limite, teto_unid, orcamento, 1, max_por_time, max_comuns)
+            avaliados += combos
+            if not melhores:
+                break
+            escalacao = _escalacoes(df, melhores, criterio)[0]
+            portfolio.append(escalacao)
+            ids = [_id(j) for j in escalacao[0]]
+            membro = np.column_stack([membro, _marcar(df, ids).to_numpy()])
+
+            # atualiza as exposições só com o time novo
+            por_jogador.update(ids)
+            esgotado |= _marcar(df, [i for i in ids if por_jogador[i] >= limite_jogador]).to_numpy() & ~fixo
+            for t in {j.get("teamName") for j in escalacao[0]} - {None}:
+                por_time[t] += 1
+                if por_time[t] >= limite_time:
+                    esgotado |= (times == t) & ~fixo
+    contar("otimizador.combos_avaliados", avaliados)
+    contar("portfolio.escalacoes", len(portfolio))
+    if len(portfolio) < n:
+        print(f"[AVISO] Portfólio com {len(portfolio)} de {n} escalações: não há mais times viáveis "
+              "com essas restrições.")
+    return portfolio
+
+
+def portfolio_tabela(portfolio: list, criterio: str = "expectedScore") -> pd.DataFrame:
+    """Uma linha por escalação: ranking, custo, pontos, eficiência e o jogador de cada posição."""
+    linhas = []
+    for i, (time_, custo, pts, eff) in enumerate(portfolio, 1):
+        linha = {"ranking": i, "custo": round(float(custo), 2), criterio: round(float(pts), 2),
+                 "eff": round(float(eff), 2)}
+        for j in time_:
+            linha[j["role"]] = j["playerName"]
+            linha[f"{j['role']}_time"] = j.get("teamName")
+        linhas.append(linha)
+    colunas = ["ranking", "custo", criterio, "eff"] + [c for p in POSICOES for c in (p, f"{p}_time")]
+    return pd.DataFrame(linhas, columns=colunas)
+
+
+def exposicao(portfolio: list) -> pd.DataFrame:
+    """Fração das escalações com cada jogador, da maior para a menor."""
+    contagem = Counter()
+    info = {}
+    for time_, *_ in portfolio:
+        for j in time_:
+            contagem[_id(j)] += 1
+            info[_id(j)] = (j["playerName"], j.get("teamName"), j["role"])
+    tabela = pd.DataFrame(
+        [(*info[i], c, c / len(portfolio)) for i, c in contagem.items()],
+        columns=["playerName", "teamName", "role", "escalacoes", "exposicao"],
+    )
+    return tabela.sort_values(["exposicao", "playerName"], ascending=[False, True], ignore_index=True)
+
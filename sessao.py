@@ -0,0 +1,135 @@
+# sessao.py
+
+"""
+Base compartilhada entre sessões + overlay de odds por sessão.
+
+Tudo o que não depende das odds (colunas escalares dos jogadores e as
+médias brutas/arredondadas de calcular_medias) fica numa BaseCompartilhada,
+montada uma vez por versão dos dados e lida por todas as sessões. Cada
+sessão guarda só um OverlaySessao: odds, orçamento e as colunas que
+dependem das odds (teamOdd, win_prob, base_exp, weight_confronto,
+expectedScore, custo_beneficio), uns poucos arrays float por jogador.
+
+tabela() monta o DataFrame de estatísticas sob demanda a partir de uma
+cópia rasa da base (as colunas da base não são copiadas) mais as colunas
+do overlay; o resultado é o mesmo de calcular_estatisticas. A tabela e a
+base são compartilhadas: não alterar.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import _arredondar, _forma, pontuacao_esperada
+from instrumentacao import span, contar
+
+COLUNAS_ODDS = ["teamOdd", "win_prob", "base_exp", "weight_confronto", "expectedScore", "custo_beneficio"]
+# colunas que o app garante na sessão, com o valor padrão
+PADROES = {"region": "Outra", "teamName": "Desconhecido"}
+
+
+def _bytes(valor):
+    if isinstance(valor, np.ndarray):
+        return valor.nbytes
+    if isinstance(valor, dict):
+        return sum(len(str(k)) + 8 for k in valor) + 8 * len(valor)
+    return 8
+
+
+class BaseCompartilhada:
+    """Parte das estatísticas que não depende das odds, de uma versão dos dados."""
+
+    def __init__(self, jogadores: pd.DataFrame, medias: pd.DataFrame, versao=None):
+        with span("base.montar", jogadores=len(jogadores)):
+            df = jogadores.drop(columns=[c for c in COLUNAS_ODDS if c in jogadores.columns])
+            for col, padrao in PADROES.items():
+                if col not in df.columns:
+                    df[col] = padrao
+            df["media_vitoria"] = _arredondar(medias["media_vitoria"], 2)
+            df["media_derrota"] = _arredondar(medias["media_derrota"], 2)
+            df["media_confronto"] = _arredondar(medias["media_confronto"], 2)
+            df["n_confrontos"] = medias["n_confrontos"].to_numpy()
+            df["oponente"] = medias["oponente"]
+            for col in medias.columns:
+                if col.startswith("forma_"):
+                    df[col] = medias[col].to_numpy()
+        self.df = df
+        self.versao = versao
+        self.regioes = df.groupby("teamName", sort=False)["region"].first().to_dict()
+
+        # entradas de pontuacao_esperada que não dependem das odds
+        self.times = df["teamName"].to_numpy(dtype=object)
+        self.oponente = medias["oponente"].to_numpy(dtype=object)
+        self.nomes_times = list(dict.fromkeys(self.times))
+        self.media_v = medias["media_vitoria"].to_numpy(dtype=float)
+        self.media_d = medias["media_derrota"].to_numpy(dtype=float)
+        self.media_c = medias["media_confronto"].to_numpy(dtype=float)
+        self.n_c = medias["n_confrontos"].to_numpy(dtype=float)
+        self.avg_n_conf = medias["n_confrontos"].mean()
+        self.price = pd.to_numeric(df["price"], errors="coerce").to_numpy(dtype=float)
+        self.forma = _forma(medias)
+
+    def __len__(self):
+        return len(self.df)
+
+    def tabela(self, overlay) -> pd.DataFrame:
+        """DataFrame de estatísticas da sessão: base (sem cópia) + colunas do overlay."""
+        tabela = self.df.copy(deep=False)
+        for col, valores in overlay.colunas.items():
+            tabela[col] = valores
+        return tabela
+
+    def memoria(self) -> int:
+        return int(self.df.memory_usage(deep=True).sum())
+
+
+class OverlaySessao:
+    """Odds, orçamento e colunas dependentes das odds de uma sessão sobre a base."""
+
+    def __init__(self, base: BaseCompartilhada, odds: dict, orcamento: float):
+        self.base = base
+        self.orcamento = orcamento
+        self.odds = dict(odds)
+        n = len(base)
+        self.colunas = {col: np.zeros(n) for col in COLUNAS_ODDS}
+        self._recalcular(np.ones(n, dtype=bool))
+
+    def _recalcular(self, linhas):
+        """Etapa das odds (como utils._aplicar_odds) só para as `linhas`."""
+        base = self.base
+        # odd do oponente só se ele também for time da base (o groupby de _aplicar_odds)
+        odd_map = {t: self.odds.get(t) for t in base.nomes_times}
+        odd_t = pd.to_numeric(pd.Series(base.times).map(odd_map), errors="coerce").to_numpy(dtype=float)
+        oponente = pd.Series(base.oponente[linhas])
+        odd_a = pd.to_numeric(oponente.map(odd_map), errors="coerce").to_numpy(dtype=float, copy=True)
+        odd_a[~oponente.isin(base.nomes_times).to_numpy()] = 0.0  # sem adversário na base
+        self.colunas["teamOdd"] = odd_t
+        colunas = pontuacao_esperada(
+            odd_t[linhas], odd_a,
+            base.media_v[linhas], base.media_d[linhas], base.media_c[linhas], base.n_c[linhas],
+            base.avg_n_conf, base.price[linhas],
+            **{k: v[linhas] for k, v in base.forma.items()},
+        )
+        for col, valores in colunas.items():
+            self.colunas[col][linhas] = valores
+
+    def atualizar_odds(self, odds: dict) -> int:
+        """
+        Aplica novas odds refazendo só jogadores cujo time ou oponente teve a
+        odd alterada (como utils.atualizar_odds). Retorna quantos foram refeitos.
+        """
+        mudaram = {t for t in self.base.nomes_times if self.odds.get(t) != odds.get(t)}
+        self.odds = dict(odds)
+        if not mudaram:
+            return 0
+        linhas = (pd.Series(self.base.times).isin(mudaram) | pd.Series(self.base.oponente).isin(mudaram)).to_numpy()
+        with span("overlay.atualizar_odds", times=len(mudaram)):
+            self._recalcular(linhas)
+        contar("odds.linhas_recalculadas", int(linhas.sum()))
+        return int(linhas.sum())
+
+    def tabela(self) -> pd.DataFrame:
+        return self.base.tabela(self)
+
+    def memoria(self) -> int:
+        """Bytes próprios da sessão (a base não entra)."""
+        return sum(_bytes(v) for v in self.colunas.values()) + _bytes(self.odds) + _bytes(self.orcamento)
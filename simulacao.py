@@ -0,0 +1,206 @@
+# simulacao.py
+
+"""
+Simulação Monte Carlo das pontuações de escalações.
+
+Para cada jogador monta uma distribuição empírica de pontuação separada
+por resultado da série (vitória/derrota):
+  1. scores de recentMatches, com o resultado da série (último jogo em games)
+  2. sem partidas naquele resultado: points dos games com aquele win
+  3. sem nada naquele resultado: as amostras do outro resultado
+  4. sem nenhuma amostra: o próprio expectedScore
+
+Cada rodada simulada sorteia o vencedor de cada confronto com o win_prob
+sem juice de calcular_estatisticas (o adversário perde quando o time
+ganha), então companheiros de time ficam correlacionados. As pontuações
+são sorteadas em blocos de arrays NumPy e somadas por escalação.
+"""
+
+import numpy as np
+import pandas as pd
+
+from utils import partidas_com_resultado, explodir_jogos
+
+DERROTA, VITORIA = 0, 1
+# células (simulações x jogadores ou escalações) por lote: cada lote aloca
+# alguns arrays desse tamanho ao mesmo tempo, e no app várias sessões simulam
+# no mesmo processo (~2M células = ~16 MB por array de 8 bytes)
+CELULAS_LOTE = 2_000_000
+
+
+def distribuicoes_empiricas(df: pd.DataFrame, partidas=None, jogos=None) -> dict:
+    """
+    Amostras por (jogador, resultado) num vetor único:
+      amostras[inicio[i, r] : inicio[i, r] + contagem[i, r]]
+    com i = posição do jogador em df e r = DERROTA/VITORIA.
+    `partidas`/`jogos` (de ModeloRodada) evitam explodir as listas de `df`.
+    """
+    n = len(df)
+    if jogos is None:
+        jogos = explodir_jogos(df, ["matchId", "points", "win"])
+    partidas = partidas_com_resultado(df, partidas, jogos)
+
+    def _celulas(tabela, coluna):
+        celula = tabela["linha"].to_numpy() * 2 + tabela["win"].to_numpy(dtype=int)
+        valor = pd.to_numeric(tabela[coluna], errors="coerce").to_numpy(dtype=float)
+        ok = ~np.isnan(valor)
+        return celula[ok], valor[ok]
+
+    cel_p, val_p = _celulas(partidas, "score")
+    cel_g, val_g = _celulas(jogos, "points")
+    tem_p = np.bincount(cel_p, minlength=2 * n) > 0
+    usa_g = ~tem_p & (np.bincount(cel_g, minlength=2 * n) > 0)
+
+    celula = np.concatenate([cel_p, cel_g[usa_g[cel_g]]])
+    valor = np.concatenate([val_p, val_g[usa_g[cel_g]]])
+
+    # resultado sem amostras herda as do outro resultado do mesmo jogador
+    vazia = np.bincount(celula, minlength=2 * n) == 0
+    herda = vazia[celula ^ 1]
+    celula = np.concatenate([celula, celula[herda] ^ 1])
+    valor = np.concatenate([valor, valor[herda]])
+
+    # jogador sem nenhuma amostra: expectedScore fixo
+    sem_nada = np.flatnonzero(np.bincount(celula, minlength=2 * n) == 0)
+    esperado = pd.to_numeric(df["expectedScore"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    celula = np.concatenate([celula, sem_nada])
+    valor = np.concatenate([valor, esperado[sem_nada // 2]])
+
+    ordem = np.argsort(celula, kind="stable")
+    contagem = np.bincount(celula, minlength=2 * n)
+    inicio = np.concatenate([[0], np.cumsum(contagem)[:-1]])
+    return {
+        "amostras": valor[ordem].astype(np.float32),
+        "inicio": inicio.reshape(n, 2),
+        "contagem": contagem.reshape(n, 2),
+    }
+
+
+def _confrontos(df: pd.DataFrame):
+    """
+    Código do time de cada jogador, win_prob por time e, por time, o
+    código do adversário que "segue" o seu resultado (-1 se o time sorteia
+    o próprio resultado).
+    """
+    times, nomes = pd.factorize(df["teamName"])
+    codigo = {nome: i for i, nome in enumerate(nomes)}
+    por_time = df.groupby(times)[["win_prob", "oponente"]].first()
+    win_prob = pd.to_numeric(por_time["win_prob"], errors="coerce").fillna(0.5).to_numpy(dtype=float)
+    adversario = np.array([codigo.get(o, -1) for o in por_time["oponente"]], dtype=int)
+
+    segue = np.full(len(nomes), -1)
+    for t, a in enumerate(adversario):
+        # confronto consistente: B segue o sorteio de A quando A < B
+        if 0 <= a < t and adversario[a] == t:
+            segue[t] = a
+    return times, win_prob, segue
+
+
+def simular_pontuacoes(df: pd.DataFrame, n_sims: int, rng=None, dist=None) -> np.ndarray:
+    """Matriz (n_sims, n_jogadores) de pontuações simuladas, em float32."""
+    rng = rng if rng is not None else np.random.default_rng()
+    dist = dist if dist is not None else distribuicoes_empiricas(df)
+    times, win_prob, segue = _confrontos(df)
+
+    vence = rng.random((n_sims, len(win_prob))) < win_prob
+    seguidores = np.flatnonzero(segue >= 0)
+    vence[:, seguidores] = ~vence[:, segue[seguidores]]
+
+    estado = vence[:, times].astype(np.intp)            # (n_sims, n_jogadores)
+    del vence
+    jogador = np.arange(len(df))
+    inicio = dist["inicio"][jogador, estado]
+    contagem = dist["contagem"][jogador, estado]
+    del estado
+    sorteio = rng.random(inicio.shape)
+    sorteio *= contagem
+    del contagem
+    inicio += sorteio.astype(np.intp)
+    del sorteio
+    return dist["amostras"][inicio]
+
+
+def simular_escalacoes(df: pd.DataFrame,
+                       escalacoes: list,
+                       n_sims: int = 100_000,
+                       limiares=(),
+                       percentis=(5, 25, 50, 75, 95),
+                       resolucao: float = 0.1,
+                       seed=None,
+                       partidas=None,
+                       jogos=None) -> pd.DataFrame:
+    """
+    Avalia várias escalações (listas de proPlayerId) contra as mesmas
+    `n_sims` rodadas simuladas. Retorna uma linha por escalação com média,
+    desvio, percentis (aproximados por histograma com `resolucao` pontos)
+    e P(pontuação > X) para cada X em `limiares`. Sem escalações, a
+    tabela volta vazia (com as mesmas colunas).
+    """
+    if len(escalacoes) == 0:
+        colunas = ["jogadores", "custo", "pts_esperados", "media", "desvio",
+                   *(f"p{q}" for q in percentis), *(f"P(>{x:g})" for x in limiares)]
+        return pd.DataFrame(columns=colunas)
+    rng = np.random.default_rng(seed)
+    dist = distribuicoes_empiricas(df, partidas, jogos)
+    posicao = {pid: i for i, pid in enumerate(df["proPlayerId"])}
+    L = np.array([[posicao[p] for p in e] for e in escalacoes], dtype=np.intp)
+    m = len(L)
+
+    # limites do histograma: soma dos extremos das amostras de cada jogador
+    amostras, inicio, contagem = dist["amostras"], dist["inicio"].ravel(), dist["contagem"].ravel()
+    mins = np.minimum.reduceat(amostras, inicio).reshape(-1, 2).min(axis=1)
+    maxs = np.maximum.reduceat(amostras, inicio).reshape(-1, 2).max(axis=1)
+    lo = float(mins[L].sum(axis=1).min())
+    hi = float(maxs[L].sum(axis=1).max())
+    n_bins = int(np.ceil((hi - lo) / resolucao)) + 1
+
+    soma = np.zeros(m)
+    soma2 = np.zeros(m)
+    acima = np.zeros((m, len(limiares)))
+    hist = np.zeros(m * n_bins, dtype=np.int64)
+    deslocamento = (np.arange(m) * n_bins)[None, :]
+
+    # lotes de até CELULAS_LOTE células; os arrays de um lote são soltos antes do próximo
+    lote = max(1, min(n_sims, CELULAS_LOTE // max(m, len(df))))
+    feitas = 0
+    while feitas < n_sims:
+        b = min(lote, n_sims - feitas)
+        S = simular_pontuacoes(df, b, rng, dist)
+        T = S[:, L[:, 0]].astype(np.float64)
+        for j in range(1, L.shape[1]):
+            T += S[:, L[:, j]]
+        del S
+        soma += T.sum(axis=0)
+        soma2 += np.einsum("ij,ij->j", T, T)
+        for k, x in enumerate(limiares):
+            acima[:, k] += (T > x).sum(axis=0)
+        T -= lo
+        T /= resolucao
+        bins = T.astype(np.int64)
+        del T
+        np.clip(bins, 0, n_bins - 1, out=bins)
+        bins += deslocamento
+        hist += np.bincount(bins.ravel(), minlength=m * n_bins)
+        del bins
+        feitas += b
+
+    media = soma / n_sims
+    resultado = pd.DataFrame({
+        "jogadores": [" / ".join(df["playerName"].to_numpy()[e]) for e in L],
+        "custo": pd.to_numeric(df["price"], errors="coerce").fillna(0).to_numpy()[L].sum(axis=1),
+        "pts_esperados": pd.to_numeric(df["expectedScore"], errors="coerce").fillna(0).to_numpy()[L].sum(axis=1),
+        "media": media,
+        "desvio": np.sqrt(np.maximum(soma2 / n_sims - media ** 2, 0)),
+    })
+    acumulado = hist.reshape(m, n_bins).cumsum(axis=1)
+    for q in percentis:
+        idx = np.argmax(acumulado >= q / 100 * n_sims, axis=1)
+        resultado[f"p{q}"] = lo + (idx + 0.5) * resolucao
+    for k, x in enumerate(limiares):
+        resultado[f"P(>{x:g})"] = acima[:, k] / n_sims
+    return resultado
+
+
+def escalacoes_do_otimizador(resultado: list) -> list:
+    """Converte a saída de montar_time_otimo em listas de proPlayerId."""
+    return [[j["proPlayerId"] for j in time_] for time_, *_ in resultado]
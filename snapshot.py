@@ -0,0 +1,343 @@
+# snapshot.py
+
+"""
+Snapshot colunar de uma rodada do cache.
+
+Compila market.json, as estatísticas da temporada e todos os
+player-<uuid>.json de um diretório numa pasta `snapshot/` com:
+  - um .npy por coluna (carregado com mmap, sem parse por jogador)
+  - uma tabela de strings (ids, nomes...) referenciada por índice
+  - meta.json com o esquema e a assinatura (tamanho/mtime) dos JSON de origem
+
+Listas de dicts (recentMatches, games, games[].details...) viram tabelas
+filhas, com a contagem de itens por linha da tabela mãe.
+
+carregar_modelo() lê as colunas direto nas tabelas planas do ModeloRodada
+(modelo.py): os números saem tipados do .npy e a linha do dono de cada
+item sai das contagens, sem remontar as listas de dicts. Quando algum
+JSON de origem muda, o snapshot deixa de valer e integrate_data o
+recompila na próxima leitura dos JSON.
+
+Uso: python snapshot.py [diretorio ...]
+"""
+
+import os
+import sys
+import json
+import numpy as np
+import pandas as pd
+
+from api_config import CACHE_DIR, listar_fontes, montar_linhas, integrate_data
+from modelo import ModeloRodada, CAMPOS_PROXIMA, CAMPOS_DETALHE
+from utils import CAMPOS_PARTIDA, CAMPOS_JOGO
+from instrumentacao import span, contar
+
+SNAPSHOT_DIR = "snapshot"
+VERSAO = 1
+
+# estado de cada célula, gravado só quando alguma célula não tem valor
+AUSENTE, NULO, VALOR = 0, 1, 2
+# contagem de itens numa coluna do tipo lista
+LISTA_AUSENTE, LISTA_NULA = -1, -2
+# estado do snapshot em relação aos JSON de origem
+ATUALIZADO, ANTIGO = "atualizado", "antigo"
+
+
+def _assinatura(diretorio):
+    """(tamanho, mtime_ns) de cada JSON de origem."""
+    assinatura = {}
+    for nome in listar_fontes(diretorio):
+        st = os.stat(os.path.join(diretorio, nome))
+        assinatura[nome] = [st.st_size, st.st_mtime_ns]
+    return assinatura
+
+
+def _tipo(valores):
+    """Tipo de armazenamento de uma coluna a partir dos valores presentes."""
+    tipos = {type(v) for v in valores if v is not None}
+    if not tipos:
+        return "float"
+    if tipos == {bool}:
+        return "bool"
+    if tipos == {int}:
+        return "int"
+    if tipos <= {int, float}:
+        return "float"
+    if tipos == {str}:
+        return "str"
+    if tipos == {list} and all(isinstance(x, dict) for v in valores if v is not None for x in v):
+        return "lista"
+    return "json"
+
+
+def _caminhos(itens):
+    """Colunas (caminhos de chaves, dicts aninhados achatados) na ordem em que aparecem."""
+    caminhos = {}
+
+    def _visitar(d, prefixo):
+        for chave, valor in d.items():
+            caminho = prefixo + (chave,)
+            if isinstance(valor, dict) and valor:
+                _visitar(valor, caminho)
+            else:
+                caminhos.setdefault(caminho, None)
+
+    for item in itens:
+        _visitar(item, ())
+    # um caminho que também é prefixo de outro (dict em uns itens, None em
+    # outros) fica só como dict aninhado
+    prefixos = {c[:i] for c in caminhos for i in range(1, len(c))}
+    return [c for c in caminhos if c not in prefixos]
+
+
+def _ler(item, caminho):
+    for chave in caminho:
+        if not isinstance(item, dict) or chave not in item:
+            return AUSENTE, None
+        item = item[chave]
+    return (NULO, None) if item is None else (VALOR, item)
+
+
+class _Escritor:
+    def __init__(self, destino):
+        self.destino = destino
+        self.strings = []
+        self.indice = {}
+        self.tabelas = {}
+
+    def string(self, s):
+        idx = self.indice.get(s)
+        if idx is None:
+            idx = self.indice[s] = len(self.strings)
+            self.strings.append(s)
+        return idx
+
+    def gravar(self, nome, arr):
+        np.save(os.path.join(self.destino, f"{nome}.npy"), arr, allow_pickle=False)
+
+    def tabela(self, nome, itens):
+        colunas = []
+        for caminho in _caminhos(itens):
+            estados, valores = zip(*(_ler(item, caminho) for item in itens)) if itens else ((), ())
+            tipo = _tipo(valores)
+            col = ".".join(caminho)
+            arquivo = f"{nome}.{col}"
+
+            if tipo == "lista":
+                filhos = [x for v in valores if v for x in v]
+                contagem = [
+                    len(v) if e == VALOR else (LISTA_NULA if e == NULO else LISTA_AUSENTE)
+                    for e, v in zip(estados, valores)
+                ]
+                self.gravar(arquivo, np.array(contagem, dtype=np.int32))
+                self.tabela(arquivo, filhos)
+                colunas.append({"caminho": list(caminho), "tipo": tipo})
+                continue
+
+            if tipo == "str":
+                arr = np.array([self.string(v) if v is not None else -1 for v in valores], dtype=np.int32)
+            elif tipo == "json":
+                arr = np.array([self.string(json.dumps(v)) if v is not None else -1 for v in valores], dtype=np.int32)
+            elif tipo in ("int", "bool"):
+                arr = np.array([v if v is not None else 0 for v in valores], dtype=np.int64 if tipo == "int" else np.int8)
+            else:
+                arr = np.array([v if v is not None else np.nan for v in valores], dtype=np.float64)
+            self.gravar(arquivo, arr)
+
+            completo = all(e == VALOR for e in estados)
+            if not completo:
+                self.gravar(arquivo + ".estado", np.array(estados, dtype=np.int8))
+            colunas.append({"caminho": list(caminho), "tipo": tipo, "completo": completo})
+
+        self.tabelas[nome] = {"linhas": len(itens), "colunas": colunas}
+
+
+def compilar_snapshot(diretorio=CACHE_DIR, linhas=None, assinatura=None):
+    """
+    Compila os JSON de `diretorio` em `diretorio/snapshot/`. Retorna o caminho.
+    `linhas` = (rows, market) já lidos por montar_linhas, com a `assinatura`
+    das fontes tirada antes da leitura, evita ler os JSON de novo.
+    """
+    if linhas is None:
+        assinatura = _assinatura(diretorio)
+        linhas = montar_linhas(diretorio)
+    rows, market = linhas
+
+    destino = os.path.join(diretorio, SNAPSHOT_DIR)
+    os.makedirs(destino, exist_ok=True)
+    for nome in os.listdir(destino):
+        os.remove(os.path.join(destino, nome))
+
+    escritor = _Escritor(destino)
+    escritor.tabela("jogadores", rows)
+    with open(os.path.join(destino, "strings.json"), "w", encoding="utf-8") as f:
+        json.dump(escritor.strings, f, ensure_ascii=False)
+    with open(os.path.join(destino, "market.json"), "w", encoding="utf-8") as f:
+        json.dump(market, f, ensure_ascii=False)
+    # meta por último: snapshot só vale depois de completo
+    with open(os.path.join(destino, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"versao": VERSAO, "fontes": assinatura, "tabelas": escritor.tabelas}, f)
+    return destino
+
+
+def _ler_meta(diretorio):
+    caminho = os.path.join(diretorio, SNAPSHOT_DIR, "meta.json")
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def estado_snapshot(diretorio=CACHE_DIR):
+    """
+    (estado, assinatura atual das fontes). estado: ATUALIZADO, ANTIGO (há
+    snapshot, mas algum JSON de origem mudou, entrou ou saiu desde a
+    compilação; recompile) ou None (sem snapshot).
+    """
+    meta = _ler_meta(diretorio)
+    if not meta:
+        return None, None
+    assinatura = _assinatura(diretorio)
+    if meta.get("versao") == VERSAO and meta["fontes"] == assinatura:
+        return ATUALIZADO, assinatura
+    return ANTIGO, assinatura
+
+
+def snapshot_atualizado(diretorio=CACHE_DIR):
+    """True se existe snapshot e nenhum JSON de origem mudou desde a compilação."""
+    return estado_snapshot(diretorio)[0] == ATUALIZADO
+
+
+class _Leitor:
+    """Colunas do snapshot como arrays NumPy (mmap), sem montar dicts por item."""
+
+    def __init__(self, origem, meta):
+        self.origem = origem
+        self.tabelas = meta["tabelas"]
+        with open(os.path.join(origem, "strings.json"), "r", encoding="utf-8") as f:
+            # o índice -1 (valor nulo) cai no None do fim
+            self.strings = np.array(json.load(f) + [None], dtype=object)
+
+    def abrir(self, nome):
+        return np.load(os.path.join(self.origem, f"{nome}.npy"), mmap_mode="r")
+
+    def _info(self, nome, caminho):
+        for col in self.tabelas.get(nome, {}).get("colunas", []):
+            if tuple(col["caminho"]) == tuple(caminho):
+                return col
+        return None
+
+    def escalares(self, nome) -> list:
+        """Caminhos das colunas de primeiro nível de `nome` que não são listas."""
+        return [tuple(col["caminho"]) for col in self.tabelas[nome]["colunas"]
+                if len(col["caminho"]) == 1 and col["tipo"] != "lista"]
+
+    def pais(self, nome, caminho) -> np.ndarray:
+        """Linha da tabela `nome` dona de cada item da coluna-lista `caminho`."""
+        info = self._info(nome, caminho)
+        if info is None or info["tipo"] != "lista":
+            return np.zeros(0, dtype=np.int64)
+        contagem = self.abrir(f"{nome}.{'.'.join(caminho)}")
+        return np.repeat(np.arange(len(contagem)), np.maximum(contagem, 0))
+
+    def coluna(self, nome, caminho, padrao=None) -> np.ndarray:
+        """
+        Coluna `caminho` da tabela `nome` com o dtype de origem: int64, float64
+        e bool saem direto do .npy; strings e json, como object. Item sem a
+        chave recebe `padrao` e chave nula vira None (NaN nos números), como
+        item.get(chave, padrao) em utils._achatar.
+        """
+        n = self.tabelas.get(nome, {}).get("linhas", 0)
+        info = self._info(nome, caminho)
+        if info is None or info["tipo"] == "lista":
+            return np.full(n, padrao, dtype=None if padrao is not None else object)
+
+        arquivo = f"{nome}.{'.'.join(caminho)}"
+        valores = self.abrir(arquivo)
+        tipo = info["tipo"]
+        if tipo in ("str", "json"):
+            valores = self.strings[valores]
+            if tipo == "json":
+                for i, v in enumerate(valores):
+                    valores[i] = json.loads(v) if v is not None else None
+        elif tipo == "bool":
+            valores = valores.astype(bool)
+        if info["completo"]:
+            return valores
+
+        estado = self.abrir(arquivo + ".estado")
+        ausente, nulo = estado == AUSENTE, estado == NULO
+        vazias = (nulo | ausente) if padrao is None else nulo
+        tem_valor = (estado == VALOR).any()
+        if not tem_valor and not vazias.any():
+            return np.full(n, padrao)
+        # nulos como o pandas os guarda: NaN nos números, None no resto
+        if tipo == "int" and vazias.any():
+            valores = valores.astype(np.float64)
+        elif (tipo == "bool" and vazias.any()) or not tem_valor:
+            valores = valores.astype(object)
+        else:
+            valores = np.array(valores)
+        valores[vazias] = np.nan if valores.dtype.kind == "f" else None
+        if padrao is not None:
+            valores[ausente] = padrao
+        return valores
+
+
+def _filha(leitor, mae, coluna, campos) -> pd.DataFrame:
+    """
+    Tabela plana de uma coluna-lista (`campos` no formato de utils._achatar),
+    com `linha` = posição do item dono na tabela `mae`.
+    """
+    nome = f"{mae}.{coluna}"
+    tabela = {"linha": leitor.pais(mae, (coluna,))}
+    for saida, (chave, padrao) in campos.items():
+        tabela[saida] = leitor.coluna(nome, chave if isinstance(chave, tuple) else (chave,), padrao)
+    return pd.DataFrame(tabela)
+
+
+def ler_snapshot(diretorio=CACHE_DIR):
+    """(ModeloRodada, market) direto das colunas do snapshot de `diretorio`."""
+    origem = os.path.join(diretorio, SNAPSHOT_DIR)
+    leitor = _Leitor(origem, _ler_meta(diretorio))
+    jogadores = pd.DataFrame({
+        caminho[0]: leitor.coluna("jogadores", caminho) for caminho in leitor.escalares("jogadores")
+    })
+    partidas = _filha(leitor, "jogadores", "recentMatches", CAMPOS_PARTIDA)
+    jogos = _filha(leitor, "jogadores", "games", CAMPOS_JOGO)
+    jogos["win"] = jogos["win"].astype(bool)
+    proximas = _filha(leitor, "jogadores", "upcomingMatches", CAMPOS_PROXIMA)
+    # games[].details: `jogo` é a posição na tabela de jogos
+    detalhes = _filha(leitor, "jogadores.games", "details", CAMPOS_DETALHE)
+    jogo = detalhes.pop("linha").to_numpy()
+    detalhes.insert(0, "linha", jogos["linha"].to_numpy()[jogo])
+    detalhes.insert(1, "jogo", jogo)
+    with open(os.path.join(origem, "market.json"), "r", encoding="utf-8") as f:
+        market = json.load(f)
+    modelo = ModeloRodada.de_tabelas(jogadores, partidas, jogos, proximas, detalhes, market)
+    print(f">> Snapshot carregado de {origem}: {len(modelo)} jogadores")
+    return modelo, market
+
+
+def carregar_modelo(diretorio=CACHE_DIR):
+    """
+    (modelo, market, df) de uma rodada. Com o snapshot atualizado, o
+    ModeloRodada sai direto das colunas e df é None; senão, df vem de
+    integrate_data (que recompila um snapshot antigo) e o modelo dele.
+    """
+    if snapshot_atualizado(diretorio):
+        contar("snapshot.acertos")
+        with span("carregar_snapshot"):
+            modelo, market = ler_snapshot(diretorio)
+        contar("jogadores.carregados", len(modelo))
+        return modelo, market, None
+    contar("snapshot.faltas")
+    df, market = integrate_data(diretorio)
+    with span("modelo"):
+        modelo = ModeloRodada(df, market)
+    return modelo, market, df
+
+
+if __name__ == "__main__":
+    for diretorio in sys.argv[1:] or [CACHE_DIR]:
+        print(">> Snapshot compilado em", compilar_snapshot(diretorio))
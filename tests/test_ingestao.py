@@ -0,0 +1,242 @@
+# tests/test_ingestao.py
+
+"""
+Ingestão contra um servidor HTTP local (http.server numa thread): repetição
+com 503 + Retry-After, ETag/304 na segunda rodada e gravação atômica.
+
+Rodar da raiz do projeto:
+    python -m pytest -q tests        (ou python -m unittest discover tests)
+"""
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ingestao  # noqa: E402
+
+JOGADORES = ["p1", "p2", "p3"]
+
+
+def _json(dados):
+    return json.dumps(dados).encode("utf-8")
+
+
+class _Api(BaseHTTPRequestHandler):
+    """Serve as rotas de ingestao.ROTAS a partir de `documentos`; `falhas` programa respostas de erro."""
+
+    documentos = {}
+    falhas = {}         # caminho -> lista de (status, cabeçalhos) a devolver antes do 200
+    requisicoes = []    # (caminho, If-None-Match)
+    trava = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        caminho = self.path.strip("/")
+        with self.trava:
+            self.requisicoes.append((caminho, self.headers.get("If-None-Match")))
+            pendentes = self.falhas.get(caminho)
+            falha = pendentes.pop(0) if pendentes else None
+        if falha:
+            status, cabecalhos = falha
+            self.send_response(status)
+            for nome, valor in cabecalhos.items():
+                self.send_header(nome, valor)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        corpo = self.documentos.get(caminho)
+        if corpo is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        etag = f'"{hash(corpo) & 0xffffffff:x}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        self.wfile.write(corpo)
+
+
+class TestIngestao(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _Api)
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+        cls.base_url = f"http://127.0.0.1:{cls.servidor.server_port}/"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+
+    def setUp(self):
+        self.diretorio = tempfile.mkdtemp(prefix="ingestao_")
+        self.addCleanup(shutil.rmtree, self.diretorio, ignore_errors=True)
+        market = {"data": {"round": {"indexInSplit": 2},
+                           "roundPlayers": [{"proPlayerId": p} for p in JOGADORES]}}
+        _Api.documentos = {
+            "market": _json(market),
+            "player-stats": _json({"data": []}),
+            **{f"pro-players/{p}": _json({"data": {"player": {"id": p}}}) for p in JOGADORES},
+        }
+        _Api.falhas = {}
+        _Api.requisicoes = []
+
+    def _ingerir(self):
+        return ingestao.ingerir(self.base_url, self.diretorio, concorrencia=4, tentativas=3, timeout=5)
+
+    def _requisicoes(self, caminho):
+        return [inm for c, inm in _Api.requisicoes if c == caminho]
+
+    def _temporarios(self):
+        return [os.path.join(raiz, nome) for raiz, _, nomes in os.walk(self.diretorio)
+                for nome in nomes if nome.startswith(".tmp-")]
+
+    def test_primeira_rodada_grava_cache_e_dump(self):
+        resultado = self._ingerir()
+
+        self.assertEqual(resultado.rodada, 3)
+        self.assertEqual(resultado.falhas, {})
+        self.assertEqual(len(resultado.baixados), len(JOGADORES) + 2)
+        rodada_dir = os.path.join(self.diretorio, "Rodada_3")
+        for p in JOGADORES:
+            with open(os.path.join(self.diretorio, f"player-{p}.json"), "rb") as f:
+                self.assertEqual(f.read(), _Api.documentos[f"pro-players/{p}"])
+            self.assertTrue(os.path.exists(os.path.join(rodada_dir, f"player-{p}.json")))
+        self.assertTrue(os.path.exists(os.path.join(rodada_dir, "season.json")))
+        with open(os.path.join(self.diretorio, ingestao.METADADOS), encoding="utf-8") as f:
+            metadados = json.load(f)
+        self.assertTrue(metadados["player-p1.json"]["etag"])
+        self.assertEqual(self._temporarios(), [])
+
+    def test_503_com_retry_after_e_repetido(self):
+        _Api.falhas["pro-players/p1"] = [(503, {"Retry-After": "0"}), (503, {"Retry-After": "0"})]
+
+        resultado = self._ingerir()
+
+        self.assertEqual(resultado.falhas, {})
+        self.assertIn("player-p1.json", resultado.baixados)
+        self.assertEqual(len(self._requisicoes("pro-players/p1")), 3)
+
+    def test_esgota_tentativas_e_nao_guarda_etag(self):
+        _Api.falhas["pro-players/p2"] = [(503, {"Retry-After": "0"})] * 3
+
+        resultado = self._ingerir()
+
+        self.assertEqual(list(resultado.falhas), ["player-p2.json"])
+        self.assertIn("HTTP 503", resultado.falhas["player-p2.json"])
+        self.assertEqual(len(self._requisicoes("pro-players/p2")), 3)
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, "player-p2.json")))
+        with open(os.path.join(self.diretorio, ingestao.METADADOS), encoding="utf-8") as f:
+            self.assertNotIn("player-p2.json", json.load(f))
+
+    def test_404_nao_e_repetido(self):
+        del _Api.documentos["pro-players/p3"]
+
+        resultado = self._ingerir()
+
+        self.assertIn("player-p3.json", resultado.falhas)
+        self.assertEqual(len(self._requisicoes("pro-players/p3")), 1)
+
+    def test_espera_respeita_retry_after_com_teto(self):
+        resposta = mock.Mock(headers={"Retry-After": "3"})
+        self.assertEqual(ingestao._espera(0, resposta), 3.0)
+        resposta.headers["Retry-After"] = "120"
+        self.assertEqual(ingestao._espera(0, resposta), ingestao.BACKOFF_MAX)
+
+    def test_segunda_rodada_usa_etag_e_304(self):
+        self._ingerir()
+        caminho = os.path.join(self.diretorio, "player-p1.json")
+        antes = os.stat(caminho).st_mtime_ns
+        _Api.requisicoes = []
+
+        resultado = self._ingerir()
+
+        self.assertEqual(resultado.falhas, {})
+        self.assertEqual(resultado.baixados, [])
+        self.assertCountEqual(
+            resultado.nao_modificados,
+            [f"player-{p}.json" for p in JOGADORES] + ["player-stats.json", "market.json"],
+        )
+        # todo GET da segunda rodada leva o ETag gravado na primeira
+        self.assertTrue(all(inm for _, inm in _Api.requisicoes))
+        self.assertEqual(os.stat(caminho).st_mtime_ns, antes)
+
+    def test_304_sem_arquivo_no_cache_baixa_de_novo(self):
+        self._ingerir()
+        os.remove(os.path.join(self.diretorio, "player-p2.json"))
+        _Api.requisicoes = []
+
+        resultado = self._ingerir()
+
+        self.assertEqual(self._requisicoes("pro-players/p2"), [None])
+        self.assertIn("player-p2.json", resultado.baixados)
+
+    def test_conteudo_novo_substitui_so_o_que_mudou(self):
+        self._ingerir()
+        _Api.documentos["pro-players/p1"] = _json({"data": {"player": {"id": "p1", "novo": True}}})
+
+        resultado = self._ingerir()
+
+        self.assertEqual(resultado.baixados, ["player-p1.json"])
+        for diretorio in (self.diretorio, os.path.join(self.diretorio, "Rodada_3")):
+            with open(os.path.join(diretorio, "player-p1.json"), "rb") as f:
+                self.assertEqual(f.read(), _Api.documentos["pro-players/p1"])
+
+    def test_json_invalido_nao_e_gravado(self):
+        _Api.documentos["pro-players/p1"] = b"{quebrado"
+
+        resultado = self._ingerir()
+
+        self.assertIn("JSON inválido", resultado.falhas["player-p1.json"])
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, "player-p1.json")))
+
+    def test_gravacao_atomica_preserva_o_arquivo_se_a_troca_falha(self):
+        caminho = os.path.join(self.diretorio, "player-p1.json")
+        ingestao.gravar_atomico(caminho, b'{"antigo": 1}')
+
+        with mock.patch("ingestao.os.replace", side_effect=OSError("disco cheio")):
+            with self.assertRaises(OSError):
+                ingestao.gravar_atomico(caminho, b'{"novo": 1}')
+
+        with open(caminho, "rb") as f:
+            self.assertEqual(f.read(), b'{"antigo": 1}')
+        self.assertEqual(self._temporarios(), [])
+
+    def test_falha_de_gravacao_vira_falha_do_jogador(self):
+        real = ingestao.gravar_atomico
+
+        def _gravar(caminho, conteudo):
+            if os.path.basename(caminho) == "player-p2.json":
+                raise OSError("disco cheio")
+            return real(caminho, conteudo)
+
+        with mock.patch("ingestao.gravar_atomico", side_effect=_gravar):
+            resultado = self._ingerir()
+
+        self.assertEqual(list(resultado.falhas), ["player-p2.json"])
+        self.assertFalse(os.path.exists(os.path.join(self.diretorio, "player-p2.json")))
+        # sem o arquivo, o ETag não pode ficar: a próxima rodada baixa de novo
+        with open(os.path.join(self.diretorio, ingestao.METADADOS), encoding="utf-8") as f:
+            self.assertNotIn("player-p2.json", json.load(f))
+
+
+if __name__ == "__main__":
+    unittest.main()
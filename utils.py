@@ -2,11 +2,256 @@
 
 import pandas as pd
 import numpy as np
-from itertools import product
-from collections import defaultdict
+import heapq
 
+from instrumentacao import span, contar, cronometrado
 
-def calcular_estatisticas(df: pd.DataFrame) -> pd.DataFrame:
+
+POSICOES = ["top", "jungle", "mid", "bottom", "support"]
+
+# colunas opcionais das médias com a forma recente (ver forma.py)
+COLUNA_FORMA = "forma_ewm_points"
+COLUNA_PESO_FORMA = "peso_forma"
+
+
+def _arredondar(valores, casas: int) -> np.ndarray:
+    """round() do Python elemento a elemento: np.round diverge em casos como 2.675."""
+    arr = np.asarray(valores, dtype=float)
+    return np.array([round(v, casas) for v in arr.ravel().tolist()]).reshape(arr.shape)
+
+
+# coluna de saída -> (chave no JSON, valor padrão); chave em tupla = campo aninhado
+CAMPOS_PARTIDA = {
+    "matchId": ("matchId", None),
+    "startsAt": ("startsAt", None),
+    "indiceRodada": (("round", "indexInSplit"), None),
+    "score": ("score", 0),
+    "adversario": (("opponentTeam", "name"), None),
+}
+CAMPOS_JOGO = {
+    "gameId": ("gameId", None),
+    "matchId": ("matchId", None),
+    "gameTimestamp": ("gameTimestamp", None),
+    "indiceNaPartida": ("indexInMatch", 0),
+    "win": ("win", False),
+    "points": ("points", 0),
+    "kills": ("kills", 0),
+    "deaths": ("deaths", 0),
+    "assists": ("assists", 0),
+    "cs": ("cs", 0),
+}
+
+
+def _achatar(coluna: pd.Series, campos: dict) -> pd.DataFrame:
+    """
+    Explode uma coluna de listas de dicts (recentMatches, games...) numa
+    tabela plana com uma linha por item, extraindo só os `campos` pedidos.
+    A coluna `linha` guarda a posição do jogador no DataFrame de origem.
+    """
+    listas = [lst or [] for lst in coluna]
+    linha = np.repeat(np.arange(len(listas)), [len(lst) for lst in listas])
+    itens = [item for lst in listas for item in lst]
+    tabela = {"linha": linha}
+    for nome, (chave, padrao) in campos.items():
+        if isinstance(chave, tuple):
+            externa, interna = chave
+            tabela[nome] = [item.get(externa, {}).get(interna, padrao) for item in itens]
+        else:
+            tabela[nome] = [item.get(chave, padrao) for item in itens]
+    return pd.DataFrame(tabela)
+
+
+def explodir_partidas(df: pd.DataFrame, campos=None) -> pd.DataFrame:
+    """recentMatches de todos os jogadores: uma linha por (jogador, partida)."""
+    campos = {c: CAMPOS_PARTIDA[c] for c in (campos or CAMPOS_PARTIDA)}
+    partidas = _achatar(df["recentMatches"], campos)
+    partidas.insert(1, "proPlayerId", df["proPlayerId"].to_numpy()[partidas["linha"]])
+    return partidas
+
+
+def explodir_jogos(df: pd.DataFrame, campos=None) -> pd.DataFrame:
+    """games de todos os jogadores: uma linha por (jogador, jogo)."""
+    campos = {c: CAMPOS_JOGO[c] for c in (campos or CAMPOS_JOGO)}
+    jogos = _achatar(df["games"], campos)
+    if "win" in jogos.columns:
+        jogos["win"] = jogos["win"].astype(bool)
+    jogos.insert(1, "proPlayerId", df["proPlayerId"].to_numpy()[jogos["linha"]])
+    return jogos
+
+
+def partidas_com_resultado(df: pd.DataFrame, partidas=None, jogos=None) -> pd.DataFrame:
+    """
+    recentMatches com o resultado da série (win do último jogo da partida
+    em games). Partidas sem jogo correspondente ficam de fora.
+    `partidas`/`jogos` já achatados (ver modelo.py) evitam explodir `df`.
+    """
+    if jogos is None:
+        jogos = explodir_jogos(df, ["matchId", "win"])
+    if partidas is None:
+        partidas = explodir_partidas(df, ["matchId", "score", "adversario"])
+    jogos = jogos[["linha", "matchId", "win"]].dropna(subset=["matchId"])
+    win_map = jogos.drop_duplicates(["linha", "matchId"], keep="last")
+    partidas = partidas[["linha", "matchId", "score", "adversario"]]
+    return partidas.merge(win_map, on=["linha", "matchId"], how="inner")
+
+
+def proximo_oponente(df: pd.DataFrame) -> pd.Series:
+    """Nome do adversário na próxima partida (upcomingMatches[0])."""
+    if "upcomingMatches" not in df.columns:
+        return df["proximoOponente"].astype(object)
+    return pd.Series(
+        [upc[0].get("opponentTeam", {}).get("name") if upc else None
+         for upc in df["upcomingMatches"]],
+        index=df.index, dtype=object
+    )
+
+
+def calcular_medias(df: pd.DataFrame, partidas=None, jogos=None, confrontos=None, jids=None) -> pd.DataFrame:
+    """
+    Etapa independente das odds: oponente da próxima partida e médias
+    brutas (sem arredondar) em vitória, derrota e contra esse oponente.
+    Só muda quando os dados dos jogadores mudam, então pode ficar em cache
+    entre ajustes de odds. Índice alinhado com `df`.
+    Com `confrontos` (IndiceConfrontos do modelo de `df`), a média contra o
+    oponente é lida do índice; `jids` são as linhas de `df` no modelo
+    (padrão: todas, na ordem).
+    """
+    n = len(df)
+    with span("medias.partidas"):
+        oponente = proximo_oponente(df)
+        partidas = partidas_com_resultado(df, partidas, jogos)
+
+    linha = partidas["linha"].to_numpy()
+    score = partidas["score"].to_numpy(dtype=float)
+    win = partidas["win"].to_numpy(dtype=bool)
+
+    def _media(mask):
+        soma = np.bincount(linha[mask], weights=score[mask], minlength=n)
+        cont = np.bincount(linha[mask], minlength=n)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(cont > 0, soma / cont, 0.0), cont
+
+    with span("medias.agregacao"):
+        media_v, _ = _media(win)
+        media_d, _ = _media(~win)
+        if confrontos is None:
+            adv = partidas["adversario"].to_numpy(dtype=object)
+            opp = oponente.to_numpy(dtype=object)[linha]
+            media_c, n_conf = _media((opp != None) & (adv == opp))  # noqa: E711
+        else:
+            jids = np.arange(n) if jids is None else np.asarray(jids)
+            media_c, n_conf, _ = confrontos.media_jogadores(jids, confrontos.id_time(oponente))
+
+    return pd.DataFrame({
+        "oponente": oponente,
+        "media_vitoria": media_v,
+        "media_derrota": media_d,
+        "media_confronto": media_c,
+        "n_confrontos": n_conf.astype(float),
+    }, index=df.index)
+
+
+def atualizar_medias(medias: pd.DataFrame, df: pd.DataFrame, linhas, confrontos=None) -> pd.DataFrame:
+    """
+    Refaz calcular_medias só para as `linhas` (máscara booleana) de `df`,
+    por exemplo jogadores cujo arquivo no cache mudou. As médias de cada
+    jogador só dependem das próprias partidas, então o resto é reaproveitado.
+    `confrontos` já deve estar atualizado com essas linhas.
+    """
+    linhas = np.asarray(linhas, dtype=bool)
+    medias = medias.copy()
+    if linhas.any():
+        novas = calcular_medias(df[linhas], confrontos=confrontos, jids=np.flatnonzero(linhas))
+        for col in novas.columns:
+            medias.loc[linhas, col] = novas[col].to_numpy()
+    return medias
+
+
+def _forma(medias: pd.DataFrame, linhas=None) -> dict:
+    """Argumentos forma/peso_forma de pontuacao_esperada, se `medias` tiver a forma."""
+    if COLUNA_FORMA not in medias.columns:
+        return {}
+    forma = medias[COLUNA_FORMA].to_numpy(dtype=float)
+    peso = medias[COLUNA_PESO_FORMA].to_numpy(dtype=float)
+    if linhas is not None:
+        forma, peso = forma[linhas], peso[linhas]
+    return {"forma": forma, "peso_forma": peso}
+
+
+def _aplicar_odds(df: pd.DataFrame, medias: pd.DataFrame, linhas: np.ndarray) -> None:
+    """
+    Etapa dependente das odds, só para as `linhas` (máscara booleana):
+    win_prob, base_exp, weight_confronto, expectedScore e custo_beneficio.
+    Escreve direto em `df`. O avg_n_conf sempre vem do dataset inteiro,
+    então o resultado é idêntico ao de um recálculo completo.
+    """
+    odd_map = df.groupby("teamName")["teamOdd"].first()
+    odd_t = pd.to_numeric(df["teamOdd"][linhas], errors="coerce").to_numpy(dtype=float)
+    oponente = medias["oponente"][linhas]
+    odd_a = pd.to_numeric(oponente.map(odd_map), errors="coerce").to_numpy(dtype=float, copy=True)
+    odd_a[~oponente.isin(odd_map.index).to_numpy()] = 0.0  # sem adversário na base
+    price = pd.to_numeric(df["price"][linhas], errors="coerce").to_numpy(dtype=float)
+    colunas = pontuacao_esperada(
+        odd_t, odd_a,
+        medias["media_vitoria"].to_numpy()[linhas],
+        medias["media_derrota"].to_numpy()[linhas],
+        medias["media_confronto"].to_numpy()[linhas],
+        medias["n_confrontos"].to_numpy()[linhas],
+        medias["n_confrontos"].mean(),
+        price,
+        **_forma(medias, linhas),
+    )
+    for col, valores in colunas.items():
+        df.loc[linhas, col] = valores
+
+
+def pontuacao_esperada(odd_t, odd_a, media_v, media_d, media_c, n_c, avg_n_conf, price,
+                       forma=None, peso_forma=0.0) -> dict:
+    """
+    Núcleo numérico da etapa das odds, sobre arrays NumPy com broadcasting:
+    com odd_t/odd_a de forma (cenários, jogadores) e o resto por jogador,
+    calcula vários cenários de odds de uma vez. Retorna win_prob, base_exp,
+    weight_confronto, expectedScore e custo_beneficio.
+    `forma` (EWMA dos points, ver forma.py) entra no expectedScore com
+    `peso_forma` onde não for NaN; com peso 0 o resultado não muda.
+    odd_a = 0 marca jogador sem adversário com odd (sem próxima partida ou
+    oponente fora da base): win_prob = 1/odd_t. Odd NaN (do time ou do
+    adversário) dá NaN, como no cálculo linha a linha original.
+    """
+    # 1) Juice removal
+    tem_adv = odd_a != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_t, p_a = 1 / odd_t, 1 / odd_a
+        win_prob = np.where(tem_adv, p_t / (p_t + p_a), np.clip(p_t, 0.0, 1.0))
+
+    base_exp = win_prob * media_v + (1 - win_prob) * media_d
+
+    # 2) Peso de confronto data-driven (sobre os valores arredondados)
+    wp   = _arredondar(win_prob, 3)
+    base = _arredondar(base_exp, 2)
+    media_c = _arredondar(media_c, 2)
+    den  = n_c + avg_n_conf
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight_conf = np.where(den > 0, wp * (n_c / den), 0.0)
+    expected = _arredondar((1 - weight_conf) * base + weight_conf * media_c, 2)
+    if forma is not None:
+        peso = np.where(np.isnan(forma), 0.0, peso_forma)
+        expected = _arredondar((1 - peso) * expected + peso * np.nan_to_num(forma), 2)
+
+    # 3) custo-benefício
+    with np.errstate(divide="ignore", invalid="ignore"):
+        custo_beneficio = np.where(price > 0, _arredondar(expected / price, 3), 0.0)
+
+    return {
+        "win_prob": wp,
+        "base_exp": base,
+        "weight_confronto": _arredondar(weight_conf, 3),
+        "expectedScore": expected,
+        "custo_beneficio": custo_beneficio,
+    }
+
+
+def calcular_estatisticas(df: pd.DataFrame, medias: pd.DataFrame | None = None) -> pd.DataFrame:
     """
     Calcula para cada jogador:
       - media_vitoria / media_derrota (brutas)
@@ -18,92 +263,79 @@ def calcular_estatisticas(df: pd.DataFrame) -> pd.DataFrame:
       - custo_beneficio = expectedScore / price
     smoothing do peso de confronto usa avg_n_conf calculado a partir do próprio dataset,
     tornando o balanceamento data-driven.
-    """
-    df = df.copy()
 
-    # 1) Juice removal
-    odd_map = df.groupby("teamName")["teamOdd"].first().to_dict()
-
-    # 2) Inicializa colunas
-    for col in [
-        "media_vitoria","media_derrota","media_confronto",
-        "n_confrontos","win_prob","base_exp",
-        "weight_confronto","expectedScore","oponente"
-    ]:
-        df[col] = 0.0 if col != "oponente" else None
-
-    # 3) Passagem 1: médias brutas + win_prob
-    for idx, row in df.iterrows():
-        recent = row.get("recentMatches", []) or []
-        games  = row.get("games", []) or []
-        upc    = row.get("upcomingMatches", []) or []
-
-        opponent = upc[0].get("opponentTeam",{}).get("name") if upc else None
-        odd_t    = row.get("teamOdd", 2.0)
-        odd_a    = odd_map.get(opponent)
-
-        # win_prob justa
-        if odd_a:
-            p_t = 1/odd_t; p_a = 1/odd_a
-            win_prob = p_t/(p_t+p_a)
-        else:
-            win_prob = min(max(1/odd_t,0.0),1.0)
-
-        # coleta scores
-        win_map = {g["matchId"]:g.get("win",False) for g in games if "matchId" in g}
-        vit, der, conf = [], [], []
-        for m in recent:
-            mid = m.get("matchId")
-            if mid not in win_map: continue
-            pts = m.get("score",0)
-            adv = m.get("opponentTeam",{}).get("name")
-            if win_map[mid]:
-                vit.append(pts)
-            else:
-                der.append(pts)
-            if opponent and adv==opponent:
-                conf.append(pts)
-
-        media_v = sum(vit)/len(vit) if vit else 0.0
-        media_d = sum(der)/len(der) if der else 0.0
-        media_c = sum(conf)/len(conf) if conf else 0.0
-        n_conf  = len(conf)
-        base_exp = win_prob*media_v + (1-win_prob)*media_d
+    recentMatches e games são explodidos uma única vez em tabelas planas
+    (explodir_partidas / explodir_jogos); as médias saem de bincount por
+    jogador, sem iterar linha a linha. Passe `medias` (de calcular_medias)
+    para reaproveitar a etapa que não depende das odds.
+    """
+    with span("calcular_estatisticas", jogadores=len(df)):
+        df = df.copy()
+        if medias is None:
+            with span("calcular_medias"):
+                medias = calcular_medias(df)
 
         # grava brutos
-        df.at[idx,"media_vitoria"]   = round(media_v,2)
-        df.at[idx,"media_derrota"]   = round(media_d,2)
-        df.at[idx,"media_confronto"] = round(media_c,2)
-        df.at[idx,"n_confrontos"]    = n_conf
-        df.at[idx,"win_prob"]        = round(win_prob,3)
-        df.at[idx,"base_exp"]        = round(base_exp,2)
-        df.at[idx,"oponente"]        = opponent
-
-    # 4) Cálculo data-driven do peso de confronto
-    avg_n_conf = df["n_confrontos"].mean()
-
-    # 5) Passagem 2: expectedScore
-    for idx, row in df.iterrows():
-        n_conf   = row["n_confrontos"]
-        wp       = row["win_prob"]
-        base     = row["base_exp"]
-        media_c  = row["media_confronto"]
-
-        weight_conf = wp * (n_conf / (n_conf + avg_n_conf)) if (n_conf + avg_n_conf) > 0 else 0.0
-        expected    = (1 - weight_conf) * base + weight_conf * media_c
-
-        df.at[idx,"weight_confronto"] = round(weight_conf,3)
-        df.at[idx,"expectedScore"]    = round(expected,2)
-
-    # 6) custo-benefício
-    df["custo_beneficio"] = df.apply(
-        lambda r: round(r["expectedScore"] / r["price"],3) if r["price"]>0 else 0.0,
-        axis=1
-    )
+        with span("brutos"):
+            df["media_vitoria"]   = _arredondar(medias["media_vitoria"], 2)
+            df["media_derrota"]   = _arredondar(medias["media_derrota"], 2)
+            df["media_confronto"] = _arredondar(medias["media_confronto"], 2)
+            df["n_confrontos"]    = medias["n_confrontos"].to_numpy()
+            for col in ["win_prob", "base_exp", "weight_confronto", "expectedScore"]:
+                df[col] = 0.0
+            df["oponente"]        = medias["oponente"]
+            df["custo_beneficio"] = 0.0
+            # forma recente (opcional, ver forma.py)
+            for col in medias.columns:
+                if col.startswith("forma_"):
+                    df[col] = medias[col].to_numpy()
+
+        with span("aplicar_odds"):
+            _aplicar_odds(df, medias, np.ones(len(df), dtype=bool))
+    return df
+
+
+def atualizar_odds(df: pd.DataFrame, medias: pd.DataFrame, odds: dict) -> pd.DataFrame:
+    """
+    Aplica novas odds (time -> odd) a um DataFrame já calculado, refazendo
+    a etapa dependente das odds só para jogadores cujo time ou oponente
+    teve a odd alterada. Resultado idêntico a calcular_estatisticas.
+    """
+    df = df.copy()
+    antes = df.groupby("teamName")["teamOdd"].first()
+    df["teamOdd"] = df["teamName"].map(odds)
+    depois = df.groupby("teamName")["teamOdd"].first()
 
+    iguais = (antes == depois) | (antes.isna() & depois.isna())
+    mudaram = set(antes.index[~iguais.to_numpy()])
+    if not mudaram:
+        return df
+    linhas = (df["teamName"].isin(mudaram) | df["oponente"].isin(mudaram)).to_numpy()
+    with span("atualizar_odds", times=len(mudaram)):
+        _aplicar_odds(df, medias, linhas)
+    contar("odds.linhas_recalculadas", int(linhas.sum()))
     return df
 
 
+def impressao_digital(df: pd.DataFrame, colunas=None) -> int:
+    """
+    Hash (uint64, estável entre processos) do conteúdo de `colunas` (padrão:
+    todas), ordem das linhas incluída. Colunas com listas/dicts são ignoradas.
+    """
+    partes = [len(df)]
+    for col in (df.columns if colunas is None else [c for c in colunas if c in df.columns]):
+        try:
+            hashes = pd.util.hash_pandas_object(df[col], index=False).to_numpy()
+        except TypeError:
+            continue
+        # soma com peso pela posição: trocar duas linhas muda a impressão
+        pesos = np.arange(1, len(hashes) + 1, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            partes.append(int((hashes * pesos).sum(dtype=np.uint64)))
+        partes.append(str(col))
+    return int(pd.util.hash_array(np.array([repr(partes)], dtype=object))[0])
+
+
 def top_jogadores_por_posicao(df: pd.DataFrame,
                               criterio: str = "expectedScore",
                               top_n: int = 5) -> dict:
@@ -117,58 +349,333 @@ def top_jogadores_por_posicao(df: pd.DataFrame,
     return resultado
 
 
-def montar_time_otimo(df: pd.DataFrame,
-                      criterio: str,
-                      orcamento: float) -> list:
+def _podar_dominados(preco: np.ndarray,
+                     pts: np.ndarray,
+                     times: np.ndarray,
+                     k: int,
+                     max_por_time: int | None) -> np.ndarray:
     """
-    Monta o time ótimo mesmo se o orçamento for muito baixo,
-    desde que cubra o jogador mais barato de cada posição.
+    Remove jogadores que nunca entram num top-k: se existem k jogadores
+    da mesma posição que custam <= e pontuam >=, qualquer escalação com
+    ele perde para k escalações obtidas trocando-o por esses dominantes.
+    Com limite por time, descontamos os dominantes dos times que podem
+    estar lotados pelos outros 4 titulares.
+    Retorna os índices mantidos, ordenados por preço.
+    """
+    ordem = np.lexsort((-pts, preco))
+    preco_o, pts_o, times_o = preco[ordem], pts[ordem], times[ordem]
+    n_times = int(times.max()) + 1 if len(times) else 0
+    lotaveis = 4 // max_por_time if max_por_time else 0
+
+    manter = []
+    for i in range(len(ordem)):
+        dominantes = pts_o[:i] >= pts_o[i]
+        if not lotaveis:
+            n_dom = int(dominantes.sum())
+        else:
+            por_time = np.bincount(times_o[:i][dominantes], minlength=n_times)
+            proprio = por_time[times_o[i]]
+            por_time[times_o[i]] = 0
+            n_dom = int(proprio + np.sort(por_time)[::-1][lotaveis:].sum())
+        if n_dom < k:
+            manter.append(ordem[i])
+    return np.array(manter, dtype=int)
+
+
+def _em_unidades(preco):
+    """Preço em décimos (granularidade do mercado), arredondado para baixo."""
+    return np.floor(np.asarray(preco, dtype=float) * 10 + 1e-6).astype(int)
+
+
+def _limites_por_sufixo(posicoes: list, teto_unid: int) -> list:
+    """
+    DP sobre o preço discretizado: limite[d][c] é a maior soma de pontos
+    escolhendo um jogador de cada posição a partir de d gastando no máximo
+    c décimos. Como os preços são arredondados para baixo, é um limite
+    superior válido mesmo se algum preço não for múltiplo de 0.1.
+    posicoes: lista de (precos, pontos) por posição.
+    """
+    limite = [np.zeros(teto_unid + 1)]
+    for preco, pontos in reversed(posicoes):
+        prox = limite[0]
+        atual = np.full(teto_unid + 1, -np.inf)
+        for c, p in zip(np.clip(_em_unidades(preco), 0, None), pontos):
+            if c <= teto_unid:
+                np.maximum(atual[c:], p + prox[:teto_unid + 1 - c], out=atual[c:])
+        limite.insert(0, atual)
+    return limite
+
+
+def _marcar(df: pd.DataFrame, ids) -> pd.Series:
+    """Linhas de df cujo playerName ou proPlayerId está em ids."""
+    ids = set(ids or [])
+    mask = df["playerName"].isin(ids)
+    if "proPlayerId" in df.columns:
+        mask |= df["proPlayerId"].isin(ids)
+    return mask
+
+
+def _membros(df: pd.DataFrame, evitar: list) -> np.ndarray:
+    """membro[linha, e]: o jogador da linha está na escalação evitar[e]."""
+    membro = np.zeros((len(df), len(evitar)), dtype=bool)
+    if evitar:
+        pares = pd.DataFrame([(j, e) for e, esc in enumerate(evitar) for j in esc], columns=["id", "e"])
+        for col in ("playerName", "proPlayerId"):
+            if col in df.columns:
+                achados = pd.DataFrame({"id": df[col].to_numpy(), "linha": np.arange(len(df))}).merge(pares, on="id")
+                membro[achados["linha"].to_numpy(), achados["e"].to_numpy()] = True
+    return membro
+
+
+def _preparar_candidatos(df: pd.DataFrame, criterio: str, fixos=None, excluidos=None):
+    """
+    Limpa df (preço e critério numéricos, sem os excluídos) e separa, na
+    ordem de POSICOES, (linhas, preços, pontos, times) de cada posição;
+    uma posição com fixo fica só com ele. Retorna (df, posicoes), com
+    posicoes None se alguma posição ficar vazia ou tiver dois fixos.
     """
     df = df.copy()
     df["price"] = pd.to_numeric(df["price"], errors="coerce").fillna(0)
+    df[criterio] = pd.to_numeric(df[criterio], errors="coerce").fillna(0)
+    df = df[~_marcar(df, excluidos)]
+    fixo_mask = _marcar(df, fixos).to_numpy()
+    times_cod = pd.factorize(df["teamName"])[0] if "teamName" in df.columns else np.zeros(len(df), dtype=int)
+    preco, pts = df["price"].to_numpy(dtype=float), df[criterio].to_numpy(dtype=float)
 
-    # 1) Prepara candidatos: top5 por criterio + jogador mais barato
-    por_pos = {}
-    cheapest_by_pos = {}
-    sum_cheapest = 0.0
-    for pos in ["top", "jungle", "mid", "bottom", "support"]:
-        subset = df[df["role"] == pos]
-        if subset.empty:
-            return []
-        top5 = subset.nlargest(5, criterio)
-        cheapest = subset.nsmallest(1, "price")
-        # adiciona o mais barato se não estiver no top5
-        combined = pd.concat([top5, cheapest]).drop_duplicates(subset=["playerName"])
-        por_pos[pos] = combined.to_dict("records")
-        cheapest_by_pos[pos] = cheapest.iloc[0]
-        sum_cheapest += cheapest.iloc[0]["price"]
-
-    # 2) Gera combinações sob orçamento
-    validos = []
-    for combo in product(*por_pos.values()):
-        time_ = list(combo)
+    posicoes = []
+    for pos in POSICOES:
+        na_pos = (df["role"] == pos).to_numpy()
+        if fixo_mask[na_pos].any():
+            na_pos = na_pos & fixo_mask
+            if na_pos.sum() > 1:
+                return df, None
+        idx = np.flatnonzero(na_pos)
+        if len(idx) == 0:
+            return df, None
+        posicoes.append((idx, preco[idx], pts[idx], times_cod[idx]))
+    return df, posicoes
+
+
+def _candidatos_posicao(idx, preco, pts, times, membro, k, max_por_time):
+    """
+    Candidatos de uma posição para a busca, ordenados por preço:
+    (linhas, preços, pontos, times, membro em int8). membro são as linhas
+    de _membros dessa posição.
+    """
+    # dominantes fora de `evitar` sempre podem substituir o dominado sem
+    # aumentar a sobreposição; jogadores de `evitar` ficam todos
+    livre = ~membro.any(axis=1)
+    keep = np.flatnonzero(livre)[_podar_dominados(preco[livre], pts[livre], times[livre], k, max_por_time)]
+    keep = np.union1d(keep, np.flatnonzero(~livre))
+    keep = keep[np.lexsort((-pts[keep], preco[keep]))]
+    return idx[keep], preco[keep], pts[keep], times[keep], membro[keep].astype(np.int8)
+
+
+def _limites(posicoes: list, orcamento: float):
+    """(teto_unid, limite) de _limites_por_sufixo para as posições nessa ordem."""
+    teto_unid = min(_em_unidades(orcamento), sum(int(_em_unidades(p[1]).max()) for p in posicoes))
+    return teto_unid, _limites_por_sufixo([(p[1], p[2]) for p in posicoes], teto_unid)
+
+
+def _branch_and_bound(cand: list,
+                      limite: list,
+                      teto_unid: int,
+                      orcamento: float,
+                      k: int,
+                      max_por_time: int | None = None,
+                      max_comuns: int = len(POSICOES)):
+    """
+    Busca em profundidade pelas k melhores escolhas, uma por posição de
+    `cand` (ver _candidatos_posicao). `limite` vem de _limites sobre as
+    mesmas posições ou sobre superconjuntos delas (um limite mais frouxo
+    só corta menos). Retorna (melhores, combos avaliados); melhores é o
+    heap de (pts, -seq, linhas escolhidas, custo).
+    """
+    n_pos = len(cand)
+    min_resto = np.concatenate([np.cumsum([c[1][0] for c in cand][::-1])[::-1], [0.0]])
+    if orcamento < min_resto[0]:
+        return [], 0
+    n_evitar = cand[0][4].shape[1]
+    comuns = np.zeros(n_evitar, dtype=np.int8)  # jogadores em comum com cada escalação de `evitar`
+
+    melhores = []  # heap de (pts, -seq, escolha, custo)
+    escolha = [0] * n_pos
+    # jogadores por código de time; a última casa recebe o código -1 (sem time)
+    contagem_times = np.zeros(max(int(c[3].max()) for c in cand) + 2, dtype=int)
+    seq = [0]
+    # opções de cada posição dos mais pontuados para os menos (argsort estável)
+    por_pontos = [np.argsort(-c[2], kind="stable") for c in cand]
+
+    def _buscar(d, custo, pts):
+        sobra = orcamento - custo
+        idx, preco, pontos, times, membros = cand[d]
+        n = np.searchsorted(preco, sobra - min_resto[d + 1] + 1e-9, side="right")
+        # mais pontuados primeiro para encher o heap cedo; fora ficam as
+        # opções que lotam um time ou repetem jogadores demais de `evitar`
+        opcoes = por_pontos[d][por_pontos[d] < n]
+        if max_por_time:
+            opcoes = opcoes[contagem_times[times[opcoes]] < max_por_time]
+        if n_evitar:
+            opcoes = opcoes[(comuns + membros[opcoes]).max(axis=1) <= max_comuns]
+
+        if d == n_pos - 1:
+            # última posição: os pontos das opções só caem, então a primeira
+            # que não entra no heap encerra o laço
+            for i in opcoes:
+                escolha[d] = idx[i]
+                item = (pts + pontos[i], -seq[0], tuple(escolha), custo + preco[i])
+                if len(melhores) < k:
+                    heapq.heappush(melhores, item)
+                elif item > melhores[0]:
+                    heapq.heapreplace(melhores, item)
+                else:
+                    break
+                seq[0] += 1
+            return
+
+        # limite superior de cada opção; o corte pelo k-ésimo melhor é
+        # refeito no laço porque ele sobe durante a busca
+        teto = (pts + pontos[:n]) + limite[d + 1][np.minimum(_em_unidades(sobra - preco[:n]), teto_unid)]
+        if len(melhores) == k:
+            opcoes = opcoes[teto[opcoes] > melhores[0][0]]
+        for i in opcoes:
+            if len(melhores) == k and teto[i] <= melhores[0][0]:
+                continue
+            contagem_times[times[i]] += 1
+            np.add(comuns, membros[i], out=comuns)
+            escolha[d] = idx[i]
+            _buscar(d + 1, custo + preco[i], pts + pontos[i])
+            np.subtract(comuns, membros[i], out=comuns)
+            contagem_times[times[i]] -= 1
+
+    _buscar(0, 0.0, 0.0)
+    return melhores, seq[0]
+
+
+def _escalacoes(df: pd.DataFrame, melhores: list, criterio: str) -> list:
+    """Heap de _branch_and_bound -> [(time_, custo, pts, eff)] por pts, posições na ordem de POSICOES."""
+    ordem_pos = {pos: i for i, pos in enumerate(POSICOES)}
+    resultado = []
+    for pts, _, escolhidos, _ in sorted(melhores, reverse=True):
+        linhas = df.iloc[list(escolhidos)]
+        time_ = sorted(linhas.to_dict("records"), key=lambda j: ordem_pos[j["role"]])
         custo = sum(j["price"] for j in time_)
-        if custo <= orcamento:
-            pts = sum(j[criterio] for j in time_)
-            eff = pts / custo if custo else 0
-            validos.append((time_, custo, pts, eff))
-
-    # 3) Se houver combos viáveis, retorna top5
-    if validos:
-        validos.sort(key=lambda x: x[2], reverse=True)
-        return validos[:5]
-
-    # 4) Sem combos sob orçamento,
-    #    se orçamento < soma dos mais baratos, não dá pra montar
-    if orcamento < sum_cheapest:
+        pts = sum(j[criterio] for j in time_)
+        eff = pts / custo if custo else 0
+        resultado.append((time_, custo, pts, eff))
+    return resultado
+
+
+@cronometrado("montar_time_otimo")
+def montar_time_otimo(df: pd.DataFrame,
+                      criterio: str,
+                      orcamento: float,
+                      k: int = 5,
+                      max_por_time: int | None = None,
+                      fixos=None,
+                      excluidos=None,
+                      evitar=None,
+                      min_diferentes: int = 1) -> list:
+    """
+    Busca exata (branch-and-bound) das k melhores escalações sob o orçamento.
+
+    Considera todos os jogadores de cada posição: primeiro descarta os
+    dominados (ver _podar_dominados), depois percorre as posições em
+    profundidade, cortando ramos cujo limite superior (DP das posições
+    restantes com a sobra do orçamento) não supera o k-ésimo melhor time.
+
+    Restrições opcionais:
+      - max_por_time: máximo de jogadores do mesmo time
+      - fixos: jogadores obrigatórios (playerName ou proPlayerId)
+      - excluidos: jogadores proibidos (playerName ou proPlayerId)
+      - evitar: escalações já escolhidas (listas de playerName ou
+        proPlayerId); cada time devolvido difere de todas elas em pelo
+        menos min_diferentes jogadores (ver portfolio.py)
+
+    Retorna lista de (time_, custo, pts, eff) ordenada por pts, como antes.
+    """
+    df, posicoes = _preparar_candidatos(df, criterio, fixos, excluidos)
+    if posicoes is None:
         return []
+    membro = _membros(df, [list(e) for e in (evitar or [])])
+
+    # 1) Candidatos por posição, ordenados por preço
+    cand = [_candidatos_posicao(idx, preco, pts, times, membro[idx], k, max_por_time)
+            for idx, preco, pts, times in posicoes]
+    # posições com menos opções primeiro: cortes acontecem mais cedo
+    cand.sort(key=lambda c: len(c[0]))
+    teto_unid, limite = _limites(cand, orcamento)
+
+    # 2) Branch-and-bound em profundidade guardando os k melhores
+    with span("busca", k=k, candidatos=sum(len(c[0]) for c in cand)):
+        melhores, avaliados = _branch_and_bound(cand, limite, teto_unid, orcamento, k, max_por_time,
+                                                len(POSICOES) - min_diferentes)
+    contar("otimizador.combos_avaliados", avaliados)
+
+    # 3) Monta a saída no formato antigo, na ordem original das posições
+    return _escalacoes(df, melhores, criterio)
+
+
+@cronometrado("fronteira_eficiente")
+def fronteira_eficiente(df: pd.DataFrame, criterio: str = "expectedScore") -> pd.DataFrame:
+    """
+    Curva de Pareto custo x pontos para todos os orçamentos numa única DP.
+
+    melhor[c] = maior soma de `criterio` com um jogador por posição e custo
+    exato de c décimos (granularidade do mercado; se algum preço não for
+    múltiplo de 0.1, usa centésimos). Cada ponto da fronteira é um custo
+    em que a pontuação máxima sobe em relação a todos os custos menores.
+
+    Retorna DataFrame ordenado por custo com custo, pts, eff e time_
+    (registros dos jogadores, como em montar_time_otimo). Consulte um
+    orçamento com consultar_fronteira.
+    """
+    preco = pd.to_numeric(df["price"], errors="coerce").fillna(0).to_numpy(dtype=float)
+    pontos = pd.to_numeric(df[criterio], errors="coerce").fillna(0).to_numpy(dtype=float)
+    escala = 10 if np.allclose(preco * 10, np.round(preco * 10)) else 100
+    unid = np.round(preco * escala).astype(int)
+
+    # DP posição a posição sobre o custo exato, guardando a escolha
+    melhor = np.zeros(1)
+    escolhas = []
+    for pos in POSICOES:
+        idx = np.flatnonzero((df["role"] == pos).to_numpy())
+        if len(idx) == 0:
+            return pd.DataFrame(columns=["custo", "pts", "eff", "time_"])
+        novo = np.full(len(melhor) + unid[idx].max(), -np.inf)
+        escolha = np.full(len(novo), -1)
+        for i in idx:
+            cand = melhor + pontos[i]
+            janela = novo[unid[i]:unid[i] + len(melhor)]
+            sobe = cand > janela
+            janela[sobe] = cand[sobe]
+            escolha[unid[i]:unid[i] + len(melhor)][sobe] = i
+        melhor = novo
+        escolhas.append(escolha)
+
+    # pontos de Pareto: custos em que o máximo acumulado sobe
+    anterior = np.concatenate([[-np.inf], np.maximum.accumulate(melhor)[:-1]])
+    quebras = np.flatnonzero(melhor > anterior)
+
+    ordem_pos = {pos: i for i, pos in enumerate(POSICOES)}
+    linhas = []
+    for c in quebras:
+        escolhidos, resto = [], c
+        for escolha in reversed(escolhas):
+            i = escolha[resto]
+            escolhidos.append(i)
+            resto -= unid[i]
+        time_ = sorted(df.iloc[escolhidos].to_dict("records"), key=lambda j: ordem_pos[j["role"]])
+        custo = c / escala
+        pts = float(melhor[c])
+        linhas.append({"custo": custo, "pts": pts, "eff": pts / custo if custo else 0, "time_": time_})
+    return pd.DataFrame(linhas, columns=["custo", "pts", "eff", "time_"])
+
 
-    # 5) Se orçamento >= soma dos mais baratos, retorna o combo de mais baratos
-    time_cheapest = [cheapest_by_pos[pos].to_dict() for pos in ["top","jungle","mid","bottom","support"]]
-    custo = sum(p["price"] for p in time_cheapest)
-    pts   = sum(p[criterio] for p in time_cheapest)
-    eff   = pts / custo if custo else 0
-    return [(time_cheapest, custo, pts, eff)]
+def consultar_fronteira(fronteira: pd.DataFrame, orcamento: float):
+    """Melhor ponto da fronteira que cabe no orçamento (busca binária), ou None."""
+    i = np.searchsorted(fronteira["custo"].to_numpy(), orcamento + 1e-9, side="right") - 1
+    return None if i < 0 else fronteira.iloc[i]
 
 
 def montar_times(df: pd.DataFrame, orcamento: float) -> dict: